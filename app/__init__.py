@@ -1,6 +1,15 @@
+import os
 from flask import Flask
+from config import config_by_name
 from app.extensions import db, migrate, bcrypt, jwt, scheduler, mail, cors
-import africastalking
+from app.services.sms_gateway import create_gateway
+from app.services.sms_outbox import sms_outbox
+from app.services.delivery_reports import delivery_reports
+from app.services.notification_gate import notification_gate
+from app.services.db_pool import engine_options
+from app.services.profiling import profiler
+from app.services import change_feed, entity_cache, http_cache
+from app.jobs import register_jobs
 
 # Import models in dependency order
 from app.models.hospital_model import Hospital
@@ -9,6 +18,9 @@ from app.models.blood_request_model import BloodRequest
 from app.models.donation_record_model import DonationRecord
 from app.models.donor_match_model import DonorMatch
 from app.models.notification_model import Notification
+from app.models.table_version_model import TableVersion
+from app.models.job_state_model import JobState
+from app.models.change_log_model import ChangeLog
 
 # Import controllers (blueprints) for each module
 from app.controllers.hospital_controller import hospital_bp
@@ -17,15 +29,23 @@ from app.controllers.blood_request_controller import blood_request_bp
 from app.controllers.donor_match_controller import donor_match_bp
 from app.controllers.notification_controller import notification_blueprint
 from app.controllers.donation_records_controller import donation_blueprint  # Added donation blueprint
+from app.controllers.change_feed_controller import change_feed_bp
+from app.controllers.internal_controller import internal_bp
 
-def create_app():
-    """Flask application factory"""
+def create_app(config_name=None, config_overrides=None):
+    """Flask application factory.
+
+    config_name selects a class from config.py (defaults to $APP_ENV, then 'development');
+    config_overrides is applied last, e.g. for benchmarks.
+    """
     app = Flask(__name__)
     
-    # Configuration (directly specified as in your original code)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:@localhost/reachout'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SECRET_KEY'] = 'your_secret_key'
+    # Configuration
+    app.config.from_object(config_by_name[config_name or os.environ.get('APP_ENV', 'development')])
+    if config_overrides:
+        app.config.update(config_overrides)
+    # Pool sizing, pre-ping, recycle and statement timeout come from the DB_* values
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     
     # Initialize extensions
     db.init_app(app)  # Use the db initialized in extensions
@@ -36,12 +56,20 @@ def create_app():
     mail.init_app(app)
     scheduler.init_app(app)
     
-    # Initialize Africa's Talking SDK
-    africastalking.initialize(
-        username='livewell_medical_app',
-        api_key='atsk_c6f2d52c6f637e9ff0183d8d802dc7b9771902b4009ed1dfdba398c1b4370c6e8565eece'
-    )
-    app.sms = africastalking.SMS  # Store SMS service in app for global access
+    entity_cache.init_app(app)  # Hospital and blood request lookups
+    http_cache.init_app(app)  # ETags and conditional GETs from per-table versions
+    change_feed.init_app(app)  # Change log rows written in the same commit as the change
+    
+    # Initialize the SMS gateway (Africa's Talking by default)
+    app.sms = create_gateway(app.config)  # Store SMS service in app for global access
+    if app.config['PROFILING_ENABLED']:
+        profiler.init_app(app)  # Wraps app.sms, so it runs before the outbox reads it
+    notification_gate.init_app(app)  # Dedupe and rate caps applied by the outbox before sending
+    sms_outbox.init_app(app)  # Background delivery of queued notifications
+    delivery_reports.init_app(app)  # Buffered, bulk-applied gateway delivery reports
+    
+    if app.config['SCHEDULER_ENABLED']:
+        register_jobs(app)
     
     # Register Blueprints in logical order (hospital first, then donors, etc.)
     app.register_blueprint(hospital_bp, url_prefix='/api/v1/hospitals')
@@ -50,6 +78,9 @@ def create_app():
     app.register_blueprint(donor_match_bp, url_prefix='/api/v1/donor_matches')
     app.register_blueprint(notification_blueprint, url_prefix='/api/v1/notifications')
     app.register_blueprint(donation_blueprint)  # Added donation blueprint
+    app.register_blueprint(change_feed_bp, url_prefix='/api/v1/changes')
+    if app.config['INTERNAL_ENDPOINTS_ENABLED']:
+        app.register_blueprint(internal_bp, url_prefix='/internal')
     
     return app
 
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app.models.blood_request_model import BloodRequest
 from app.models.donor_match_model import DonorMatch
-from app.models.hospital_model import Hospital
+from app.services.entity_cache import blood_request_cache, hospital_cache
+from app.services.http_cache import conditional
+from app.services.listing import ListQuery
+from app.services import notification_service, wave_notifier
 from app import db
 from werkzeug.exceptions import NotFound, BadRequest
 from sqlalchemy.exc import SQLAlchemyError
@@ -10,19 +13,23 @@ blood_request_bp = Blueprint('blood_request', __name__, url_prefix='/api/v1/bloo
 
 # GET all blood requests
 @blood_request_bp.route('/', methods=['GET'])
+@conditional('blood_request')
 def get_blood_requests():
 
     try:
-        blood_requests = BloodRequest.query.all()
-        return jsonify([request.to_dict() for request in blood_requests]), 200
+        return ListQuery(BloodRequest).response()
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError:
         return jsonify({'error': 'Database error occurred'}), 500
 
 # GET a specific blood request by ID
 @blood_request_bp.route('/<int:id>', methods=['GET'])
+@conditional('blood_request')
 def get_blood_request(id):
     try:
-        blood_request = BloodRequest.query.get(id)
+        # From the database, not the per-process cache: the ETag follows the shared table version
+        blood_request = db.session.get(BloodRequest, id)
         if not blood_request:
             raise NotFound('Blood request not found')
         return jsonify(blood_request.to_dict()), 200
@@ -45,8 +52,12 @@ def create_blood_request():
             if field not in data:
                 raise BadRequest(f'Missing required field: {field}')
         
+        notify_mode = data.get('notify_mode', wave_notifier.NOTIFY_ALL)
+        if notify_mode not in (wave_notifier.NOTIFY_ALL, wave_notifier.NOTIFY_WAVES):
+            raise BadRequest("notify_mode must be 'all' or 'waves'")
+        
         # Verify hospital exists
-        hospital = Hospital.query.get(data['hospital_id'])
+        hospital = hospital_cache.get(data['hospital_id'])
         if not hospital:
             raise BadRequest(f"Hospital with ID {data['hospital_id']} not found")
         
@@ -64,7 +75,12 @@ def create_blood_request():
         )
         
         db.session.add(new_request)
+        if notify_mode == wave_notifier.NOTIFY_WAVES:
+            db.session.flush()  # The first wave needs the request ID
+            wave_notifier.start_waves(new_request, wave_notifier.WaveSettings(current_app.config))
         db.session.commit()
+        if notify_mode == wave_notifier.NOTIFY_WAVES:
+            notification_service.dispatch()
         
         return jsonify(new_request.to_dict()), 201
     except BadRequest as e:
@@ -97,7 +113,7 @@ def update_blood_request(id):
             blood_request.contact_number = data['contact_number']
         if 'hospital_id' in data:
             # Verify hospital exists
-            hospital = Hospital.query.get(data['hospital_id'])
+            hospital = hospital_cache.get(data['hospital_id'])
             if not hospital:
                 raise BadRequest(f"Hospital with ID {data['hospital_id']} not found")
             blood_request.hospital_id = data['hospital_id']
@@ -111,6 +127,7 @@ def update_blood_request(id):
             blood_request.status = data['status']
         
         db.session.commit()
+        blood_request_cache.invalidate(id)
         
         return jsonify(blood_request.to_dict()), 200
     except BadRequest as e:
@@ -131,6 +148,7 @@ def delete_blood_request(id):
         
         db.session.delete(blood_request)
         db.session.commit()
+        blood_request_cache.invalidate(id)
         
         return jsonify({'message': 'Blood request deleted successfully'}), 200
     except NotFound as e:
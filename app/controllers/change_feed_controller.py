@@ -0,0 +1,78 @@
+import json
+import time
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from app.services import change_feed
+from app import db
+from werkzeug.exceptions import BadRequest
+from sqlalchemy.exc import SQLAlchemyError
+
+change_feed_bp = Blueprint('change_feed', __name__)
+
+
+def _feed_params():
+    # since: cursor returned by the previous call (0 = from the start, 'latest' = from now on)
+    since = request.headers.get('Last-Event-ID') or request.args.get('since', '0')
+    if since == 'latest':
+        since = change_feed.latest_cursor()
+    try:
+        since = int(since)
+        limit = int(request.args.get('limit', change_feed.DEFAULT_PAGE_SIZE))
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        raise BadRequest('since, limit and wait must be numbers')
+    if since < 0 or limit < 1 or wait < 0:
+        raise BadRequest('since and wait must be >= 0 and limit >= 1')
+    limit = min(limit, change_feed.MAX_PAGE_SIZE)
+    wait = min(wait, current_app.config.get('CHANGE_FEED_MAX_WAIT_SECONDS', 30))
+
+    tables = None
+    if request.args.get('tables'):
+        tables = set(request.args['tables'].split(','))
+        unknown = tables - set(change_feed.FEED_TABLES)
+        if unknown:
+            raise BadRequest(f"Unknown tables: {', '.join(sorted(unknown))}")
+    return since, limit, wait, tables
+
+
+def _event_stream(since, limit, tables):
+    # Ends after CHANGE_FEED_SSE_MAX_SECONDS so a connection never pins a worker for
+    # long; EventSource clients reconnect on their own and resume from Last-Event-ID
+    config = current_app.config
+    heartbeat = config.get('CHANGE_FEED_HEARTBEAT_SECONDS', 15)
+    ends_at = time.monotonic() + config.get('CHANGE_FEED_SSE_MAX_SECONDS', 300)
+    yield 'retry: 1000\n\n'
+    while time.monotonic() < ends_at:
+        entries, cursor = change_feed.wait_for_changes(since, min(heartbeat, ends_at - time.monotonic()), limit, tables)
+        for entry in entries:
+            yield f"id: {entry['id']}\nevent: {entry['table']}\ndata: {json.dumps(entry)}\n\n"
+        if cursor != since and (not entries or entries[-1]['id'] != cursor):
+            yield f'id: {cursor}\n: skipped\n\n'  # Move the client's cursor past filtered entries
+        elif not entries:
+            yield ': heartbeat\n\n'
+        since = cursor
+
+
+# GET changes to blood requests, donor matches and donation records after a cursor.
+# ?wait=<seconds> long-polls until something arrives; Accept: text/event-stream
+# (or ?stream=sse) keeps the connection open as a Server-Sent Events stream.
+@change_feed_bp.route('/', methods=['GET'])
+def get_changes():
+    try:
+        since, limit, wait, tables = _feed_params()
+        if request.args.get('stream') == 'sse' or request.accept_mimetypes.best == 'text/event-stream':
+            response = Response(stream_with_context(_event_stream(since, limit, tables)),
+                                mimetype='text/event-stream')
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+            return response
+
+        if wait:
+            entries, cursor = change_feed.wait_for_changes(since, wait, limit, tables)
+        else:
+            entries, cursor = change_feed.read_changes(since, limit, tables)
+        return jsonify({'changes': entries, 'next_cursor': cursor}), 200
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Database error occurred'}), 500
@@ -1,11 +1,17 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify
 from app.models.donation_record_model import DonationRecord
 from app.models.donor_model import Donor
 from app.models.hospital_model import Hospital
+from app.services.donor_index import donor_index
+from app.services.entity_cache import hospital_cache
+from app.services import donation_service
+from app.services.http_cache import conditional
+from app.services.listing import ListQuery
 from app import db
 from werkzeug.exceptions import NotFound, BadRequest
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from datetime import datetime, timedelta
+from datetime import datetime
 import traceback
 
 # Define Blueprint for the donation record controller
@@ -13,12 +19,14 @@ donation_blueprint = Blueprint('donation', __name__, url_prefix='/api/v1/donor_r
 
 # GET all donation records
 @donation_blueprint.route('/records', methods=['GET'])
+@conditional('donation_record')
 def get_donation_records():
     try:
-        donation_records = DonationRecord.query.all()
-        if not donation_records:
-            return jsonify({"message": "No donation records found", "data": []}), 200
-        return jsonify([record.to_dict() for record in donation_records]), 200
+        return ListQuery(DonationRecord).response(
+            empty_body={"message": "No donation records found", "data": []}
+        )
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError as e:
         db.session.rollback()
         error_message = str(e)
@@ -28,6 +36,7 @@ def get_donation_records():
 
 # GET donation records for a specific donor
 @donation_blueprint.route('/records/donor/<int:donor_id>', methods=['GET'])
+@conditional('donation_record', 'donor')
 def get_donor_donation_records(donor_id):
     try:
         # Check if donor exists
@@ -35,10 +44,11 @@ def get_donor_donation_records(donor_id):
         if not donor:
             raise NotFound(f'Donor with ID {donor_id} not found')
             
-        donation_records = DonationRecord.query.filter_by(donor_id=donor_id).all()
-        if not donation_records:
-            return jsonify({"message": f"No donation records found for donor ID {donor_id}", "data": []}), 200
-        return jsonify([record.to_dict() for record in donation_records]), 200
+        return ListQuery(DonationRecord, criteria=[DonationRecord.donor_id == donor_id]).response(
+            empty_body={"message": f"No donation records found for donor ID {donor_id}", "data": []}
+        )
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except NotFound as e:
         return jsonify({'error': str(e)}), 404
     except SQLAlchemyError as e:
@@ -50,17 +60,19 @@ def get_donor_donation_records(donor_id):
 
 # GET donation records for a specific hospital
 @donation_blueprint.route('/records/hospital/<int:hospital_id>', methods=['GET'])
+@conditional('donation_record', 'hospital')
 def get_hospital_donation_records(hospital_id):
     try:
-        # Check if hospital exists
-        hospital = Hospital.query.get(hospital_id)
+        # Check if hospital exists (in the database: a cached snapshot could outlive a delete)
+        hospital = db.session.get(Hospital, hospital_id)
         if not hospital:
             raise NotFound(f'Hospital with ID {hospital_id} not found')
             
-        donation_records = DonationRecord.query.filter_by(hospital_id=hospital_id).all()
-        if not donation_records:
-            return jsonify({"message": f"No donation records found for hospital ID {hospital_id}", "data": []}), 200
-        return jsonify([record.to_dict() for record in donation_records]), 200
+        return ListQuery(DonationRecord, criteria=[DonationRecord.hospital_id == hospital_id]).response(
+            empty_body={"message": f"No donation records found for hospital ID {hospital_id}", "data": []}
+        )
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except NotFound as e:
         return jsonify({'error': str(e)}), 404
     except SQLAlchemyError as e:
@@ -72,6 +84,7 @@ def get_hospital_donation_records(hospital_id):
 
 # GET a specific donation record by ID
 @donation_blueprint.route('/records/<int:id>', methods=['GET'])
+@conditional('donation_record')
 def get_donation_record(id):
     try:
         donation_record = DonationRecord.query.get(id)
@@ -115,7 +128,7 @@ def create_donation_record():
             raise NotFound(f"Donor with ID {data['donor_id']} not found")
         
         # Verify hospital exists
-        hospital = Hospital.query.get(data['hospital_id'])
+        hospital = hospital_cache.get(data['hospital_id'])
         if not hospital:
             raise NotFound(f"Hospital with ID {data['hospital_id']} not found")
         
@@ -124,67 +137,27 @@ def create_donation_record():
             raise BadRequest(f"Blood type {data['blood_type']} does not match donor's blood type {donor.blood_type}")
         
         # Check if donor is eligible to donate (not donated recently)
-        recent_donation = DonationRecord.query.filter_by(donor_id=data['donor_id']).order_by(
-            DonationRecord.donated_at.desc()
-        ).first()
-        
         current_time = datetime.utcnow()
-        if recent_donation:
-            # Make sure both datetimes are naive (no timezone info)
-            next_eligible_naive = recent_donation.next_eligible_donation.replace(tzinfo=None) if recent_donation.next_eligible_donation.tzinfo else recent_donation.next_eligible_donation
-            if next_eligible_naive > current_time:
-                return jsonify({
-                    'status': 'medical_restriction',
-                    'message': 'Donor is not medically eligible to donate at this time',
-                    'next_eligible_date': recent_donation.next_eligible_donation.isoformat(),
-                    'days_until_eligible': (next_eligible_naive - current_time).days,
-                    'info': 'Medical guidelines require a minimum waiting period between donations to ensure donor health'
-                }), 200  # Using 200 instead of 400 as this is a valid medical response, not an error
+        restriction = donation_service.check_eligibility(donor, current_time)
+        if restriction:
+            return jsonify(restriction), 200  # Using 200 instead of 400 as this is a valid medical response, not an error
         
-        # Calculate next eligible donation date (56 days later by default)
-        next_eligible = current_time + timedelta(days=56)
-        date_adjusted = False
+        # Calculate next eligible donation date (56 days later by default),
+        # overridden by the provided date when it respects the guideline
         provided_date = None
-        
-        # Override with provided date if it exists
         if 'next_eligible_donation' in data:
             try:
-                if isinstance(data['next_eligible_donation'], str):
-                    # Parse the string to datetime, ensuring it's naive (no timezone)
-                    provided_date = datetime.fromisoformat(data['next_eligible_donation'].replace('Z', ''))
-                    if provided_date.tzinfo:
-                        provided_date = provided_date.replace(tzinfo=None)
-                else:
-                    provided_date = data['next_eligible_donation']
-                    if provided_date.tzinfo:
-                        provided_date = provided_date.replace(tzinfo=None)
-                
-                # Check if date is less than medical guideline
-                min_date = current_time + timedelta(days=56)
-                
-                if provided_date < min_date:
-                    # Auto-adjust to comply with medical guidelines
-                    next_eligible = min_date
-                    date_adjusted = True
-                else:
-                    next_eligible = provided_date
-                    
+                provided_date = donation_service.parse_eligible_date(data['next_eligible_donation'])
             except ValueError:
                 raise BadRequest('Invalid date format for next_eligible_donation. Use ISO format (YYYY-MM-DDTHH:MM:SS)')
+        next_eligible, date_adjusted = donation_service.next_eligible_date(current_time, provided_date)
         
-        # Create donation record
-        donation_record = DonationRecord(
-            donor_id=data['donor_id'],
-            hospital_id=data['hospital_id'],
-            blood_type=data['blood_type'],
-            next_eligible_donation=next_eligible
+        # Create donation record and update donor availability status
+        donation_record = donation_service.record_donation(
+            donor, data['hospital_id'], data['blood_type'], next_eligible
         )
-        
-        # Update donor availability status
-        donor.availability_status = False
-        
-        db.session.add(donation_record)
         db.session.commit()
+        donor_index.upsert(donor)  # Donor is no longer available for matching
         
         # Prepare response
         response_data = {
@@ -194,7 +167,7 @@ def create_donation_record():
         
         # Add medical note if date was adjusted
         if date_adjusted:
-            response_data['medical_note'] = 'The next eligible donation date was adjusted to comply with the medical guideline of 56 days between donations.'
+            response_data['medical_note'] = donation_service.MEDICAL_NOTE
             response_data['provided_date'] = provided_date.isoformat() if provided_date else None
             response_data['adjusted_date'] = next_eligible.isoformat()
         
@@ -216,6 +189,44 @@ def create_donation_record():
         traceback_str = traceback.format_exc()
         return jsonify({'error': f'Unexpected error: {str(e)}', 'traceback': traceback_str}), 500
 
+# POST a batch of donation records (hospital end-of-day logs)
+@donation_blueprint.route('/records/batch', methods=['POST'])
+def create_donation_records_batch():
+    try:
+        # Accept a JSON array, {"records": [...]} or one JSON object per line (NDJSON)
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            records = []
+            for line in request.get_data(as_text=True).splitlines():
+                if line.strip():
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        records.append(None)  # Reported as an invalid record
+        else:
+            data = request.get_json(silent=True)
+            records = data.get('records') if isinstance(data, dict) else data
+        if not isinstance(records, list) or not records:
+            raise BadRequest('Provide a non-empty list of donation records')
+        if len(records) > donation_service.MAX_BATCH_RECORDS:
+            raise BadRequest(f'At most {donation_service.MAX_BATCH_RECORDS} records per batch')
+        
+        results, donor_ids = donation_service.ingest_donations(records)
+        if donor_ids:
+            donor_index.invalidate()  # Availability changed for many donors at once
+        
+        # One result per record, in input order
+        created = sum(1 for result in results if result['status'] == 'created')
+        body = (json.dumps(result) + '\n' for result in results)
+        response = Response(body, status=201 if created else 200, mimetype='application/x-ndjson')
+        response.headers['X-Records-Created'] = str(created)
+        return response
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        error_message = str(e)
+        return jsonify({'error': f'Database error occurred: {error_message}'}), 500
+
 # PUT to update an existing donation record
 @donation_blueprint.route('/records/<int:id>', methods=['PUT'])
 def update_donation_record(id):
@@ -241,53 +252,33 @@ def update_donation_record(id):
             
             donation_record.blood_type = data['blood_type']
             
+        adjustment = None
         if 'next_eligible_donation' in data:
             try:
-                current_time = datetime.utcnow()
-                
-                if isinstance(data['next_eligible_donation'], str):
-                    # Parse the string to datetime, ensuring it's naive (no timezone)
-                    provided_date = datetime.fromisoformat(data['next_eligible_donation'].replace('Z', ''))
-                    if provided_date.tzinfo:
-                        provided_date = provided_date.replace(tzinfo=None)
-                else:
-                    provided_date = data['next_eligible_donation']
-                    if provided_date.tzinfo:
-                        provided_date = provided_date.replace(tzinfo=None)
-                
-                # Ensure donated_at is naive for comparison
-                donated_at = donation_record.donated_at
-                if donated_at.tzinfo:
-                    donated_at = donated_at.replace(tzinfo=None)
-                
-                # Ensure next_eligible is at least 56 days after donation date
-                min_date = donated_at + timedelta(days=56)
-                date_adjusted = False
-                
-                if provided_date < min_date:
-                    # Auto-adjust to comply with medical guidelines
-                    next_eligible = min_date
-                    date_adjusted = True
-                else:
-                    next_eligible = provided_date
-                
-                donation_record.next_eligible_donation = next_eligible
-                
-                # Prepare response data for after commit
-                response_data = {
-                    'message': 'Donation record updated successfully',
-                    'data': None  # Will be populated after commit
-                }
-                
-                if date_adjusted:
-                    response_data['medical_note'] = 'The next eligible donation date was adjusted to comply with the medical guideline of 56 days between donations.'
-                    response_data['provided_date'] = provided_date.isoformat()
-                    response_data['adjusted_date'] = next_eligible.isoformat()
-                
+                provided_date = donation_service.parse_eligible_date(data['next_eligible_donation'])
             except ValueError:
                 raise BadRequest('Invalid date format for next_eligible_donation. Use ISO format (YYYY-MM-DDTHH:MM:SS)')
+            
+            # Ensure next_eligible is at least 56 days after donation date
+            next_eligible, date_adjusted = donation_service.next_eligible_date(
+                donation_service.naive(donation_record.donated_at), provided_date
+            )
+            donation_record.next_eligible_donation = next_eligible
+            
+            # Keep the donor's cached eligibility in line with their latest donation
+            donor = Donor.query.get(donation_record.donor_id)
+            donation_service.refresh_availability(donor, datetime.utcnow())
+            
+            if date_adjusted:
+                adjustment = {
+                    'medical_note': donation_service.MEDICAL_NOTE,
+                    'provided_date': provided_date.isoformat(),
+                    'adjusted_date': next_eligible.isoformat()
+                }
         
         db.session.commit()
+        if 'next_eligible_donation' in data:
+            donor_index.upsert(donor)  # Keep the matching index in sync
         
         # Get updated data after commit
         response_data = {
@@ -295,11 +286,9 @@ def update_donation_record(id):
             'data': donation_record.to_dict()
         }
         
-        # Add medical note if date was adjusted (defined in the if block above)
-        if 'medical_note' in locals().get('response_data', {}):
-            response_data['medical_note'] = locals()['response_data']['medical_note']
-            response_data['provided_date'] = locals()['response_data']['provided_date']
-            response_data['adjusted_date'] = locals()['response_data']['adjusted_date']
+        # Add medical note if date was adjusted
+        if adjustment:
+            response_data.update(adjustment)
         
         return jsonify(response_data), 200
     except BadRequest as e:
@@ -328,29 +317,12 @@ def delete_donation_record(id):
             
         db.session.delete(donation_record)
             
-        # Check if this was the donor's most recent donation
-        # If so, update their availability status
-        most_recent_donation = DonationRecord.query.filter_by(donor_id=donor_id).order_by(
-            DonationRecord.donated_at.desc()
-        ).first()
-        
-        # Get the donor
+        # Update donor availability based on their most recent remaining donation
         donor = Donor.query.get(donor_id)
-        
-        # Update donor availability based on most recent donation
-        if most_recent_donation:
-            current_time = datetime.utcnow()
-            next_eligible_naive = most_recent_donation.next_eligible_donation
-            if next_eligible_naive.tzinfo:
-                next_eligible_naive = next_eligible_naive.replace(tzinfo=None)
-                
-            # If the next eligible date is in the future, donor is not available
-            donor.availability_status = next_eligible_naive <= current_time
-        else:
-            # If no donations left, donor is available
-            donor.availability_status = True
+        donation_service.refresh_availability(donor, datetime.utcnow())
             
         db.session.commit()
+        donor_index.upsert(donor)  # Keep the matching index in sync
         
         return jsonify({
             'message': f'Donation record with ID {id} successfully deleted',
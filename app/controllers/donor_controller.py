@@ -1,5 +1,10 @@
+import csv
 from flask import Blueprint, request, jsonify
 from app.models.donor_model import Donor
+from app.services.donor_index import donor_index
+from app.services.donor_import import DonorImport, iter_rows, open_text
+from app.services.http_cache import conditional
+from app.services.listing import ListQuery
 from app import db
 from werkzeug.exceptions import NotFound, BadRequest
 from sqlalchemy.exc import SQLAlchemyError
@@ -8,15 +13,19 @@ donor_bp = Blueprint('donor', __name__, url_prefix='/api/v1/donors')
 
 # GET all donors
 @donor_bp.route('/', methods=['GET'])
+@conditional('donor')
 def get_donors():
     try:
-        donors = Donor.query.all()  # Fetch all donors
-        return jsonify([donor.to_dict() for donor in donors]), 200  # Return as JSON
+        # One page of donors (or an NDJSON stream), see ListQuery for the query arguments
+        return ListQuery(Donor).response()
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400  # Invalid paging arguments
     except SQLAlchemyError:
         return jsonify({'error': 'Database error occurred'}), 500  # Handle database errors
 
 # GET a specific donor by ID
 @donor_bp.route('/<int:id>', methods=['GET'])
+@conditional('donor')
 def get_donor(id):
     try:
         donor = Donor.query.get(id)  # Fetch donor by ID
@@ -56,6 +65,7 @@ def create_donor():
         
         db.session.add(new_donor)
         db.session.commit()  # Commit the transaction
+        donor_index.upsert(new_donor)  # Keep the matching index in sync
         
         return jsonify(new_donor.to_dict()), 201  # Return the new donor record as JSON
     except BadRequest as e:
@@ -64,6 +74,44 @@ def create_donor():
         db.session.rollback()  # Rollback in case of DB error
         return jsonify({'error': 'Database error occurred'}), 500  
 
+# POST a CSV or NDJSON file of donors (bulk registration for donor drives)
+@donor_bp.route('/import', methods=['POST'])
+def import_donors():
+    try:
+        # Accept a multipart upload (field "file") or the raw request body
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+        stream = upload.stream if upload else request.stream
+        content_type = upload.mimetype if upload else request.mimetype
+        filename = (upload.filename or '') if upload else ''
+
+        fmt = request.args.get('format')
+        if fmt is None:
+            if content_type == 'text/csv' or filename.endswith('.csv'):
+                fmt = 'csv'
+            elif content_type in ('application/x-ndjson', 'application/jsonl') or filename.endswith(('.ndjson', '.jsonl')):
+                fmt = 'ndjson'
+        if fmt not in ('csv', 'ndjson'):
+            raise BadRequest('Upload a CSV or NDJSON file, or pass ?format=csv|ndjson')
+
+        text = open_text(stream)
+        importer = DonorImport()
+        try:
+            report = importer.run(iter_rows(text, fmt))
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Earlier batches are committed; report them along with the line that broke the upload
+            report = importer.report()
+            report.update({'error': f'Could not read upload: {str(e)}', 'line': text.line_number})
+            return jsonify(report), 400
+        finally:
+            if importer.imported:
+                donor_index.invalidate()  # Rebuilt on the next match lookup
+        return jsonify(report), 201 if report['imported'] else 200
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400  # Handle bad request error
+    except SQLAlchemyError:
+        db.session.rollback()  # Rollback in case of DB error
+        return jsonify({'error': 'Database error occurred'}), 500  # Handle DB error
+
 # PUT to update an existing donor
 @donor_bp.route('/<int:id>', methods=['PUT'])
 def update_donor(id):
@@ -96,6 +144,7 @@ def update_donor(id):
             donor.availability_status = data['availability_status']
 
         db.session.commit()  # Commit the changes
+        donor_index.upsert(donor)  # Keep the matching index in sync
         
         return jsonify(donor.to_dict()), 200  # Return updated donor record as JSON
     except BadRequest as e:
@@ -116,6 +165,7 @@ def delete_donor(id):
         
         db.session.delete(donor)  # Delete the donor record
         db.session.commit()  # Commit the changes
+        donor_index.remove(id)  # Keep the matching index in sync
         
         return jsonify({'message': 'Donor deleted successfully'}), 200
     except NotFound as e:
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app.models.hospital_model import Hospital
+from app.services.entity_cache import hospital_cache
+from app.services.http_cache import conditional
+from app.services.listing import ListQuery
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.exceptions import NotFound, BadRequest
@@ -15,12 +18,14 @@ hospital_bp = Blueprint('hospital_bp', __name__, url_prefix='/api/v1/hospitals')
 
 # GET all hospitals
 @hospital_bp.route('/get_hospitals', methods=['GET'])
+@conditional('hospital')
 def get_hospitals():
     try:
-        logger.info("Attempting to fetch all hospitals")
-        hospitals = Hospital.query.all()  # Fetch all hospitals
-        logger.info(f"Successfully retrieved {len(hospitals)} hospitals")
-        return jsonify([hospital.to_dict() for hospital in hospitals]), 200  # Return as JSON
+        logger.info("Attempting to fetch hospitals")
+        return ListQuery(Hospital).response()  # One page of hospitals (or an NDJSON stream)
+    except BadRequest as e:
+        logger.warning(f"Bad request error: {str(e)}")
+        return jsonify({'error': str(e)}), 400  # Invalid paging arguments
     except SQLAlchemyError as e:
         error_msg = f"Database error in get_hospitals: {str(e)}"
         logger.error(error_msg)
@@ -29,10 +34,12 @@ def get_hospitals():
 
 # GET a specific hospital by ID
 @hospital_bp.route('/hospitals/<int:id>', methods=['GET'])
+@conditional('hospital')
 def get_hospital(id):
     try:
         logger.info(f"Attempting to fetch hospital with ID: {id}")
-        hospital = Hospital.query.get(id)  # Fetch hospital by ID
+        # From the database, not the per-process cache: the ETag follows the shared table version
+        hospital = db.session.get(Hospital, id)
         if not hospital:
             logger.warning(f"Hospital with ID {id} not found")
             raise NotFound(f'Hospital with ID {id} not found')
@@ -137,6 +144,7 @@ def update_hospital(id):
         
         logger.info("Committing update transaction")
         db.session.commit()  # Commit the changes
+        hospital_cache.invalidate(id)
         
         logger.info(f"Successfully updated hospital with ID: {id}")
         return jsonify(hospital.to_dict()), 200  # Return updated hospital record as JSON
@@ -178,6 +186,7 @@ def delete_hospital(id):
         db.session.delete(hospital)  # Delete the hospital record
         logger.info("Committing delete transaction")
         db.session.commit()  # Commit the changes
+        hospital_cache.invalidate(id)
         
         logger.info(f"Successfully deleted hospital with ID: {id}")
         return jsonify({'message': 'Hospital deleted successfully'}), 200
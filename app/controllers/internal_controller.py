@@ -0,0 +1,63 @@
+from flask import Blueprint, jsonify
+from app.services.db_pool import pool_status
+from app.services.entity_cache import cache_stats
+from app.services.http_cache import response_cache
+from app.services import incremental_matcher
+from app.services.priority import priority_class, queue_delay
+from app.services.sms_outbox import sms_outbox
+from app.services.delivery_reports import delivery_reports
+from app.services.notification_gate import notification_gate
+from app.models.notification_model import Notification
+from app import db
+from sqlalchemy.exc import SQLAlchemyError
+
+# Operational endpoints; registered only when INTERNAL_ENDPOINTS_ENABLED is set
+internal_bp = Blueprint('internal_bp', __name__)
+
+# GET live connection pool statistics
+@internal_bp.route('/pool', methods=['GET'])
+def get_pool_status():
+    try:
+        return jsonify(pool_status(db.engine)), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred'}), 500
+
+# GET hit/miss counters of the entity caches and the rendered-response cache
+@internal_bp.route('/cache', methods=['GET'])
+def get_cache_status():
+    stats = cache_stats()
+    stats['responses'] = response_cache.stats()
+    return jsonify(stats), 200
+
+# GET incremental matcher state: watermark, lease, last run and backlog
+@internal_bp.route('/jobs', methods=['GET'])
+def get_job_status():
+    try:
+        return jsonify({incremental_matcher.JOB_NAME: incremental_matcher.job_status()}), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred'}), 500
+
+# GET outbox backlog and queueing delay per urgency class
+@internal_bp.route('/queues', methods=['GET'])
+def get_queue_status():
+    try:
+        backlog = {
+            priority_class(row.priority): {
+                'queued': row.queued,
+                'oldest_queued_at': row.oldest.isoformat() if row.oldest else None
+            }
+            for row in db.session.query(
+                Notification.priority,
+                db.func.count(Notification.id).label('queued'),
+                db.func.min(Notification.queued_at).label('oldest')
+            ).filter(Notification.status == 'Queued').group_by(Notification.priority).all()
+        }
+        return jsonify({
+            'backlog': backlog,
+            'delay': queue_delay.to_dict(),
+            'preemptions': sms_outbox.preemptions,
+            'delivery_reports': delivery_reports.stats(),
+            'gate': notification_gate.stats()
+        }), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred'}), 500
@@ -1,22 +1,31 @@
-from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, current_app, request, jsonify
 from app.models.notification_model import Notification
 from app.models.donor_model import Donor
-from app.models.blood_request_model import BloodRequest
 from app.models.donor_match_model import DonorMatch
+from app.services import notification_service
+from app.services.delivery_reports import delivery_reports, parse_report
+from app.services.entity_cache import blood_request_cache
+from app.services.listing import ListQuery
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import NotFound, BadRequest
+from werkzeug.exceptions import NotFound, BadRequest, Forbidden
 
 # Define the Blueprint for handling notifications
 notification_blueprint = Blueprint('notification_blueprint', __name__, url_prefix='/api/v1/notifications')
 
+# Keep projected timestamps in the same format as Notification.to_dict
+NOTIFICATION_FORMATTERS = {
+    'sent_at': lambda value: value.strftime('%Y-%m-%d %H:%M:%S') if value else None,
+    'delivered_at': lambda value: value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+}
+
 # GET all notifications
 @notification_blueprint.route('/', methods=['GET'])
 def get_notifications():
     try:
-        notifications = Notification.query.all()
-        return jsonify([notification.to_dict() for notification in notifications]), 200
+        return ListQuery(Notification, formatters=NOTIFICATION_FORMATTERS).response()
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError as e:
         return jsonify({'error': 'Database error occurred'}), 500
 
@@ -50,25 +59,10 @@ def create_notification():
         if not donor:
             raise NotFound('Donor not found')
             
-        new_notification = Notification(
-            donor_id=data['donor_id'],
-            request_id=data.get('request_id'),
-            message=data['message'],
-            status='Pending'
-        )
-        
-        # Send SMS using Africa's Talking API
-        recipient = donor.phone
-        response = current_app.sms.send(new_notification.message, [recipient])
-        
-        # Update status based on SMS response
-        if response['SMSMessageData']['Recipients'][0]['status'] == 'Success':
-            new_notification.status = 'Sent'
-        else:
-            new_notification.status = 'Failed'
-            
-        db.session.add(new_notification)
+        # Queue the SMS; the outbox workers deliver it in the background
+        new_notification = notification_service.queue_notification(donor.id, data.get('request_id'), data['message'])
         db.session.commit()
+        notification_service.dispatch()
             
         return jsonify(new_notification.to_dict()), 201
     except BadRequest as e:
@@ -79,7 +73,34 @@ def create_notification():
         db.session.rollback()
         return jsonify({'error': 'Database error occurred'}), 500
     except Exception as e:
-        return jsonify({'error': f'SMS sending failed: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to queue notification: {str(e)}'}), 500
+
+# POST gateway delivery reports (Africa's Talking posts one form-encoded report per
+# message; a JSON object or list is accepted too). Reports are buffered and applied
+# in bulk by app.services.delivery_reports, so this never waits on the database.
+@notification_blueprint.route('/delivery-reports', methods=['POST'])
+def receive_delivery_reports():
+    try:
+        token = current_app.config.get('DELIVERY_REPORT_TOKEN')
+        if token and request.args.get('token') != token:
+            raise Forbidden('Invalid callback token')
+        
+        if request.is_json:
+            data = request.get_json(silent=True)
+            payloads = data if isinstance(data, list) else [data]
+        else:
+            payloads = [request.form]
+        if not all(isinstance(payload, dict) for payload in payloads):
+            raise BadRequest('Each delivery report must be an object')
+        
+        reports = [report for report in map(parse_report, payloads) if report]
+        if reports:
+            delivery_reports.add(reports)
+        return jsonify({'accepted': len(reports)}), 200
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Forbidden as e:
+        return jsonify({'error': str(e)}), 403
 
 # PUT to update an existing notification
 @notification_blueprint.route('/<int:id>', methods=['PUT'])
@@ -134,41 +155,15 @@ def notify_match(match_id):
             raise NotFound('Donor match not found')
             
         donor = Donor.query.get(match.donor_id)
-        blood_request = BloodRequest.query.get(match.request_id)
+        blood_request = blood_request_cache.get(match.request_id)
         
         if not donor or not blood_request:
             raise NotFound('Donor or blood request not found')
             
-        # Create message
-        message = f"Hello {donor.name}, you have been matched with a blood request. " \
-                  f"Blood type needed: {blood_request.blood_type}, " \
-                  f"Urgency: {blood_request.urgency_level}. " \
-                  f"Please respond if you can donate."
-        
-        # Create notification record
-        new_notification = Notification(
-            donor_id=donor.id,
-            request_id=blood_request.id,
-            message=message,
-            status='Pending'
-        )
-        
-        # Send SMS using Africa's Talking API
-        # recipient = donor.phone
-        recipient = f'+256{donor.phone[1:]}'  # Converts '0771234567' to '+256771234567'
-
-        response = current_app.sms.send(message, [recipient])
-        
-        # Update status based on response
-        if response['SMSMessageData']['Recipients'][0]['status'] == 'Success':
-            new_notification.status = 'Sent'
-            match.status = 'Notified'
-            match.notified_at = datetime.utcnow()
-        else:
-            new_notification.status = 'Failed'
-            
-        db.session.add(new_notification)
+        # Queue the SMS; the match is marked 'Notified' once the gateway accepts it
+        new_notification = notification_service.queue_match_notification(donor.id, donor.name, blood_request)
         db.session.commit()
+        notification_service.dispatch()
         
         return jsonify(new_notification.to_dict()), 201
         
@@ -179,62 +174,36 @@ def notify_match(match_id):
         return jsonify({'error': 'Database error occurred'}), 500
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'SMS sending failed: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to queue notification: {str(e)}'}), 500
 
 # Batch notify all donors for a specific blood request
 @notification_blueprint.route('/batch-notify-request/<int:request_id>', methods=['POST'])
 def batch_notify_request(request_id):
     try:
-        blood_request = BloodRequest.query.get(request_id)
+        blood_request = blood_request_cache.get(request_id)
         if not blood_request:
             raise NotFound('Blood request not found')
             
-        pending_matches = DonorMatch.query.filter_by(
-            request_id=request_id,
-            status='Pending'
-        ).all()
+        # Load the pending matches together with their donors in one query
+        donor_ids = [
+            row.donor_id for row in
+            db.session.query(DonorMatch.donor_id)
+            .join(Donor, Donor.id == DonorMatch.donor_id)
+            .filter(DonorMatch.request_id == request_id, DonorMatch.status == 'Pending')
+            .all()
+        ]
         
-        if not pending_matches:
+        if not donor_ids:
             return jsonify({'message': 'No pending matches to notify'}), 200
             
-        notifications_sent = 0
-        notifications_failed = 0
-        
-        for match in pending_matches:
-            donor = Donor.query.get(match.donor_id)
-            if not donor:
-                continue
-                
-            message = f"Hello {donor.name}, you have been matched with a blood request. " \
-                      f"Blood type needed: {blood_request.blood_type}, " \
-                      f"Urgency: {blood_request.urgency_level}. " \
-                      f"Please respond if you can donate."
-            
-            new_notification = Notification(
-                donor_id=donor.id,
-                request_id=blood_request.id,
-                message=message,
-                status='Pending'
-            )
-            
-            recipient = donor.phone
-            response = current_app.sms.send(message, [recipient])
-            
-            if response['SMSMessageData']['Recipients'][0]['status'] == 'Success':
-                new_notification.status = 'Sent'
-                match.status = 'Notified'
-                match.notified_at = datetime.utcnow()
-                notifications_sent += 1
-            else:
-                new_notification.status = 'Failed'
-                notifications_failed += 1
-                
-            db.session.add(new_notification)
-            
+        # Every donor receives the same text, so the outbox can send it in bulk gateway calls
+        notifications_queued = notification_service.queue_broadcast(blood_request, donor_ids)
         db.session.commit()
+        notification_service.dispatch()
         
         return jsonify({
-            'message': f'Sent {notifications_sent} notifications, {notifications_failed} failed',
+            'message': f'Queued {notifications_queued} notifications',
+            'queued': notifications_queued,
             'request_id': request_id
         }), 200
         
@@ -245,4 +214,4 @@ def batch_notify_request(request_id):
         return jsonify({'error': 'Database error occurred'}), 500
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'SMS sending failed: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Failed to queue notification: {str(e)}'}), 500
\ No newline at end of file
@@ -0,0 +1,102 @@
+import logging
+from app.extensions import scheduler
+from app.services import change_feed, donation_service, incremental_matcher, notification_service, wave_notifier
+from app.services.donor_index import donor_index
+
+logger = logging.getLogger(__name__)
+
+# Minutes between eligibility sweeps, overridable with ELIGIBILITY_SWEEP_MINUTES
+DEFAULT_ELIGIBILITY_SWEEP_MINUTES = 15
+
+# Seconds between incremental matcher runs, overridable with INCREMENTAL_MATCH_SECONDS
+DEFAULT_INCREMENTAL_MATCH_SECONDS = 30
+
+# Seconds between checks for due notification waves, overridable with WAVE_CHECK_SECONDS
+DEFAULT_WAVE_CHECK_SECONDS = 30
+
+
+def sweep_eligibility():
+    """Scheduled job: make donors available again once their 56-day window has passed"""
+    with scheduler.app.app_context():
+        reenabled = donation_service.sweep_eligibility()
+        if reenabled:
+            donor_index.invalidate()  # Pick the re-enabled donors up on the next lookup
+            logger.info(f"Eligibility sweep re-enabled {reenabled} donors")
+
+
+def incremental_match():
+    """Scheduled job: match blood requests created or changed since the last run"""
+    with scheduler.app.app_context():
+        config = scheduler.app.config
+        result = incremental_matcher.run_incremental_match(
+            batch_size=config.get('INCREMENTAL_MATCH_BATCH_SIZE', incremental_matcher.DEFAULT_BATCH_SIZE),
+            max_batches=config.get('INCREMENTAL_MATCH_MAX_BATCHES', incremental_matcher.DEFAULT_MAX_BATCHES),
+            lease_seconds=config.get('INCREMENTAL_MATCH_LEASE_SECONDS', incremental_matcher.DEFAULT_LEASE_SECONDS),
+            settle_seconds=config.get('INCREMENTAL_MATCH_SETTLE_SECONDS', incremental_matcher.DEFAULT_SETTLE_SECONDS)
+        )
+        if result is None:
+            return  # Another worker holds the lease
+        if result['matches_created']:
+            notification_service.dispatch()
+        if result['requests_processed']:
+            logger.info(f"Incremental matcher processed {result['requests_processed']} requests, "
+                        f"created {result['matches_created']} matches in {result['duration_seconds']}s "
+                        f"(backlog {result['backlog']})")
+
+
+def advance_waves():
+    """Scheduled job: widen the donor pool of wave-mode requests whose timer expired"""
+    with scheduler.app.app_context():
+        summary = wave_notifier.advance_waves(wave_notifier.WaveSettings(scheduler.app.config))
+        if summary['waves_sent']:
+            notification_service.dispatch()
+            logger.info(f"Sent {summary['waves_sent']} notification waves to "
+                        f"{summary['donors_contacted']} donors ({summary['stopped']} requests stopped)")
+
+
+def prune_change_log():
+    """Scheduled job: drop change feed entries past CHANGE_LOG_RETENTION_DAYS"""
+    with scheduler.app.app_context():
+        removed = change_feed.prune(
+            scheduler.app.config.get('CHANGE_LOG_RETENTION_DAYS', change_feed.DEFAULT_RETENTION_DAYS)
+        )
+        if removed:
+            logger.info(f"Pruned {removed} change log entries")
+
+
+def register_jobs(app):
+    """Register the periodic jobs on the shared APScheduler instance and start it"""
+    scheduler.add_job(
+        id='sweep_eligibility',
+        func=sweep_eligibility,
+        trigger='interval',
+        minutes=app.config.get('ELIGIBILITY_SWEEP_MINUTES', DEFAULT_ELIGIBILITY_SWEEP_MINUTES),
+        replace_existing=True
+    )
+    scheduler.add_job(
+        id='incremental_match',
+        func=incremental_match,
+        trigger='interval',
+        seconds=app.config.get('INCREMENTAL_MATCH_SECONDS', DEFAULT_INCREMENTAL_MATCH_SECONDS),
+        max_instances=1,  # Never overlap within a worker; the job lease covers other workers
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        id='advance_waves',
+        func=advance_waves,
+        trigger='interval',
+        seconds=app.config.get('WAVE_CHECK_SECONDS', DEFAULT_WAVE_CHECK_SECONDS),
+        max_instances=1,  # Each wave is also claimed with a conditional UPDATE across workers
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.add_job(
+        id='prune_change_log',
+        func=prune_change_log,
+        trigger='interval',
+        hours=1,
+        replace_existing=True
+    )
+    if not scheduler.running:
+        scheduler.start()
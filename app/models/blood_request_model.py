@@ -1,11 +1,21 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from app.extensions import db
+from app.services.geo import parse_location
 
 class BloodRequest(db.Model):
+    __table_args__ = (
+        db.Index('ix_blood_request_status', 'status'),  # Batch matching scans by status
+        db.Index('ix_blood_request_updated_at_id', 'updated_at', 'id'),  # Incremental matcher watermark
+        db.Index('ix_blood_request_next_wave_at', 'next_wave_at'),  # Due notification waves
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     city = db.Column(db.String(50), nullable=False)
     location = db.Column(db.String(100))  # Optional GPS coordinates
+    latitude = db.Column(db.Float)  # Parsed from location for proximity search
+    longitude = db.Column(db.Float)
     contact_number = db.Column(db.String(20), nullable=False)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospital.id'), nullable=False)
     
@@ -15,6 +25,19 @@ class BloodRequest(db.Model):
     urgency_level = db.Column(db.String(20), nullable=False)
     status = db.Column(db.String(20), default='Open')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 'all' notifies every compatible donor at once; 'waves' notifies the best-ranked
+    # few and widens on a timer (app.services.wave_notifier)
+    notify_mode = db.Column(db.String(10), nullable=False, default='all')
+    wave_count = db.Column(db.Integer, nullable=False, default=0)
+    next_wave_at = db.Column(db.DateTime)  # None once the waves have stopped
+    
+    @validates('location')
+    def _parse_location(self, key, location):
+        # Keep the numeric coordinates in step with the free-text GPS string
+        self.latitude, self.longitude = parse_location(location)
+        return location
     
     def __repr__(self):
         return f'<BloodRequest {self.name}>'
@@ -31,5 +54,7 @@ class BloodRequest(db.Model):
             'units_needed': self.units_needed,
             'urgency_level': self.urgency_level,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'notify_mode': self.notify_mode
         }
\ No newline at end of file
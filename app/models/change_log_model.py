@@ -0,0 +1,31 @@
+import json
+from datetime import datetime
+from app.extensions import db
+
+class ChangeLog(db.Model):
+    """Transactional outbox: one row per change to a tracked table, written in the
+    same commit as the change itself. The feed cursor is ``seq``, numbered in
+    commit order by change_feed.assign_sequence() (NULL until then)."""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_created_at', 'created_at'),  # Retention pruning
+        db.Index('ix_change_log_seq', 'seq', unique=True),  # Feed reads, and finding unsequenced rows
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    row_id = db.Column(db.Integer)  # None for bulk changes described by the payload
+    operation = db.Column(db.String(10), nullable=False)  # insert / update / delete
+    payload = db.Column(db.Text)  # JSON: the row's columns after the change
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'))
+
+    def to_dict(self):
+        return {
+            'id': self.seq,  # The cursor clients pass back as since / Last-Event-ID
+            'table': self.table_name,
+            'row_id': self.row_id,
+            'operation': self.operation,
+            'data': json.loads(self.payload) if self.payload else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -2,6 +2,11 @@ from datetime import datetime
 from app.extensions import db
 
 class DonationRecord(db.Model):
+    __table_args__ = (
+        # Eligibility checks read a donor's most recent donation
+        db.Index('ix_donation_record_donor_donated_at', 'donor_id', 'donated_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospital.id'), nullable=False)
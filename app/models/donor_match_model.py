@@ -3,11 +3,15 @@ from app.extensions import db
 
 class DonorMatch(db.Model):
     __tablename__ = 'donor_match'  # Optionally set a custom table name
+    __table_args__ = (
+        # Existence checks and per-request status filters
+        db.Index('ix_donor_match_request_donor_status', 'request_id', 'donor_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     request_id = db.Column(db.Integer, db.ForeignKey('blood_request.id'), nullable=False)
     donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
-    status = db.Column(db.Enum('Notified', 'Accepted', 'Rejected', 'Completed', name='match_status'), default='Notified')
+    status = db.Column(db.Enum('Pending', 'Notified', 'Accepted', 'Rejected', 'Completed', name='match_status'), default='Notified')
     notified_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     donor = db.relationship('Donor', backref='matches')
@@ -32,4 +36,41 @@ class DonorMatch(db.Model):
             'urgency_level': self.request.urgency_level,
             'status': self.request.status
         } if self.request else None
-    }
\ No newline at end of file
+    }
+
+    @classmethod
+    def flat_query(cls):
+        """Query matches with their donor and request columns in a single joined SELECT"""
+        from app.models.donor_model import Donor
+        from app.models.blood_request_model import BloodRequest
+        return db.session.query(
+            cls.id, cls.request_id, cls.donor_id, cls.status, cls.notified_at,
+            Donor.id.label('donor_pk'), Donor.name.label('donor_name'), Donor.email.label('donor_email'),
+            BloodRequest.id.label('request_pk'), BloodRequest.blood_type.label('request_blood_type'),
+            BloodRequest.units_needed.label('request_units_needed'),
+            BloodRequest.urgency_level.label('request_urgency_level'),
+            BloodRequest.status.label('request_status')
+        ).outerjoin(Donor, Donor.id == cls.donor_id).outerjoin(BloodRequest, BloodRequest.id == cls.request_id)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Same shape as to_dict, built from a flat_query() row without touching the ORM"""
+        return {
+            'id': row.id,
+            'request_id': row.request_id,
+            'donor_id': row.donor_id,
+            'status': row.status,
+            'notified_at': row.notified_at.isoformat() if row.notified_at else None,
+            'donor': {
+                'id': row.donor_pk,
+                'name': row.donor_name,
+                'email': row.donor_email
+            } if row.donor_pk is not None else None,
+            'request': {
+                'id': row.request_pk,
+                'blood_type': row.request_blood_type,
+                'units_needed': row.request_units_needed,
+                'urgency_level': row.request_urgency_level,
+                'status': row.request_status
+            } if row.request_pk is not None else None
+        }
@@ -1,7 +1,16 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from app.extensions import db
+from app.services.geo import parse_location
 
 class Donor(db.Model):
+    __table_args__ = (
+        # Matching filters on compatible blood type, availability and city
+        db.Index('ix_donor_blood_type_availability_city', 'blood_type', 'availability_status', 'city'),
+        # Eligibility sweep re-enables unavailable donors whose waiting period is over
+        db.Index('ix_donor_availability_next_eligible', 'availability_status', 'next_eligible_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False)
@@ -10,11 +19,20 @@ class Donor(db.Model):
     email = db.Column(db.String(100), unique=True)
     city = db.Column(db.String(50), nullable=False)
     location = db.Column(db.String(100))  # Optional GPS coordinates
+    latitude = db.Column(db.Float)  # Parsed from location for proximity search
+    longitude = db.Column(db.Float)
     availability_status = db.Column(db.Boolean, default=True)  # True = Available
+    next_eligible_at = db.Column(db.DateTime)  # Materialized from the latest donation record
     
     # Use string-based relationship to avoid circular imports
     donations = db.relationship('DonationRecord', backref='donor', lazy=True)
     
+    @validates('location')
+    def _parse_location(self, key, location):
+        # Keep the numeric coordinates in step with the free-text GPS string
+        self.latitude, self.longitude = parse_location(location)
+        return location
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -25,5 +43,8 @@ class Donor(db.Model):
             'email': self.email,
             'city': self.city,
             'location': self.location,
-            'availability_status': self.availability_status
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'availability_status': self.availability_status,
+            'next_eligible_at': self.next_eligible_at.isoformat() if self.next_eligible_at else None
         }
\ No newline at end of file
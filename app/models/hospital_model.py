@@ -1,14 +1,24 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from app.extensions import db
+from app.services.geo import parse_location
 
 class Hospital(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     city = db.Column(db.String(50), nullable=False)
     location = db.Column(db.String(100))  # Optional GPS coordinates
+    latitude = db.Column(db.Float)  # Parsed from location for proximity search
+    longitude = db.Column(db.Float)
     contact_number = db.Column(db.String(20), nullable=False)
     blood_requests = db.relationship('BloodRequest', backref='hospital', lazy=True)
     
+    @validates('location')
+    def _parse_location(self, key, location):
+        # Keep the numeric coordinates in step with the free-text GPS string
+        self.latitude, self.longitude = parse_location(location)
+        return location
+    
     def __repr__(self):
         return f"Hospital('{self.name}', '{self.city}', '{self.location}', '{self.contact_number}')"
     
@@ -0,0 +1,30 @@
+from app.extensions import db
+
+class JobState(db.Model):
+    """Watermark, lease lock and last-run bookkeeping for one scheduled job.
+
+    Every Gunicorn worker runs the scheduler; the lease columns make sure only
+    one of them executes a given job at a time.
+    """
+    __tablename__ = 'job_state'
+
+    name = db.Column(db.String(64), primary_key=True)
+    watermark_at = db.Column(db.DateTime)  # Last (updated_at, id) fully processed
+    watermark_id = db.Column(db.Integer)
+    locked_by = db.Column(db.String(128))
+    locked_until = db.Column(db.DateTime)
+    last_run_at = db.Column(db.DateTime)
+    last_duration_seconds = db.Column(db.Float)
+    last_error = db.Column(db.String(255))
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'watermark_at': self.watermark_at.isoformat() if self.watermark_at else None,
+            'watermark_id': self.watermark_id,
+            'locked_by': self.locked_by,
+            'locked_until': self.locked_until.isoformat() if self.locked_until else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_duration_seconds': self.last_duration_seconds,
+            'last_error': self.last_error
+        }
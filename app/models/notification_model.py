@@ -1,13 +1,30 @@
 from datetime import datetime
 from app.extensions import db
 class Notification(db.Model):
+    __table_args__ = (
+        db.Index('ix_notification_request_status', 'request_id', 'status'),
+        db.Index('ix_notification_status_next_attempt', 'status', 'next_attempt_at'),
+        db.Index('ix_notification_status_priority', 'status', 'priority', 'next_attempt_at'),  # Outbox claim query
+        db.Index('ix_notification_provider_message_id', 'provider_message_id'),  # Delivery reports
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('donor.id'), nullable=False)
     request_id = db.Column(db.Integer, db.ForeignKey('blood_request.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    status = db.Column(db.Enum('Sent', 'Delivered', 'Failed', name='notification_status'), default='Sent')
+    status = db.Column(db.Enum('Queued', 'Sent', 'Delivered', 'Failed', 'Suppressed', name='notification_status'), default='Sent')
+    template = db.Column(db.String(32))  # Message kind, part of the notification gate's dedupe key
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Outbox bookkeeping used by the background SMS workers
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(255))
+    priority = db.Column(db.SmallInteger, nullable=False, default=2)  # app.services.priority class, 0 = critical
+    queued_at = db.Column(db.DateTime, default=datetime.utcnow)  # For queueing delay per urgency class
+    provider_message_id = db.Column(db.String(64))  # Gateway messageId, matched by delivery reports
+    delivered_at = db.Column(db.DateTime)
+    
      # Add this method
     def to_dict(self):
         return {
@@ -16,5 +33,7 @@ class Notification(db.Model):
             "request_id": self.request_id,
             "message": self.message,
             "status": self.status,
-            "sent_at": self.sent_at.strftime('%Y-%m-%d %H:%M:%S') if self.sent_at else None
+            "priority": self.priority,
+            "sent_at": self.sent_at.strftime('%Y-%m-%d %H:%M:%S') if self.sent_at else None,
+            "delivered_at": self.delivered_at.strftime('%Y-%m-%d %H:%M:%S') if self.delivered_at else None
         }
\ No newline at end of file
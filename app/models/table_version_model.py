@@ -0,0 +1,21 @@
+from datetime import datetime
+from app.extensions import db
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the same transaction as every write.
+
+    Conditional GETs derive their ETag from these versions, so a poll only has to
+    read one small row per table instead of serializing the whole listing.
+    """
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'table_name': self.table_name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1 @@
+# Service layer shared by the blueprint controllers
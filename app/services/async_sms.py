@@ -0,0 +1,165 @@
+import asyncio
+import atexit
+import threading
+from app.services.sms_gateway import FakeSmsGateway
+
+# Defaults, overridable through the SMS_ASYNC_* config values
+DEFAULT_CONCURRENCY = 32  # Gateway calls in flight at once
+DEFAULT_TIMEOUT_SECONDS = 10.0  # Per call, connection included
+DEFAULT_KEEPALIVE_SECONDS = 60
+
+LIVE_SMS_URL = 'https://api.africastalking.com/version1/messaging'
+SANDBOX_SMS_URL = 'https://api.sandbox.africastalking.com/version1/messaging'
+
+
+class SmsGatewayError(Exception):
+    """The gateway answered with an HTTP error"""
+
+
+class AsyncAfricasTalkingClient:
+    """Africa's Talking SMS API over one pooled aiohttp session; requires the aiohttp package.
+
+    send() mirrors ``africastalking.SMS.send`` and returns the same response
+    shape. At most ``concurrency`` calls run at once and each is bounded by
+    ``timeout`` seconds. The session, and its keep-alive connections, is created
+    on the event loop of the first call and reused afterwards.
+    """
+
+    def __init__(self, username, api_key, sender_id=None, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT_SECONDS, url=None):
+        import aiohttp  # Optional dependency, only needed for the async gateway
+        self._aiohttp = aiohttp
+        self.username = username
+        self.api_key = api_key
+        self.sender_id = sender_id
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.url = url or (SANDBOX_SMS_URL if username == 'sandbox' else LIVE_SMS_URL)
+        self._session = None
+        self._semaphore = None
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            aiohttp = self._aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=DEFAULT_KEEPALIVE_SECONDS),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'apiKey': self.api_key, 'Accept': 'application/json'}
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def send(self, message, recipients, sender_id=None, enqueue=False):
+        session = self._ensure_session()
+        data = {'username': self.username, 'to': ','.join(recipients), 'message': message}
+        if sender_id or self.sender_id:
+            data['from'] = sender_id or self.sender_id
+        if enqueue:
+            data['enqueue'] = 1
+        async with self._semaphore:
+            async with session.post(self.url, data=data) as response:
+                if response.status >= 300:
+                    raise SmsGatewayError(f'HTTP {response.status}: {(await response.text())[:200]}')
+                return await response.json(content_type=None)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class FakeAsyncSmsGateway(FakeSmsGateway):
+    """FakeSmsGateway with a coroutine send(): calls overlap while they 'wait' on the network"""
+
+    def __init__(self, latency=0.0, failing_numbers=(), concurrency=DEFAULT_CONCURRENCY):
+        super().__init__(latency=0.0, failing_numbers=failing_numbers)
+        self.network_latency = latency
+        self.concurrency = concurrency
+        self._semaphore = None
+
+    async def send(self, message, recipients, sender_id=None, enqueue=False):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            if self.network_latency:
+                await asyncio.sleep(self.network_latency)
+            return FakeSmsGateway.send(self, message, recipients, sender_id, enqueue)
+
+    async def close(self):
+        pass
+
+
+class AsyncGatewayBridge:
+    """Runs an async client on a private event loop thread for synchronous callers.
+
+    send() blocks the calling thread (a Flask handler or outbox worker) until
+    its call completes, so the bridge can stand in for ``app.sms``. send_many()
+    submits several calls at once and waits for all of them, which is how the
+    outbox fans a batch out concurrently. Safe to use from any number of threads.
+    """
+
+    concurrent = True  # Tells the outbox to use send_many()
+
+    def __init__(self, client, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.client = client
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['client'], name)  # e.g. FakeSmsGateway.sent
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='sms-async-loop', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def send(self, message, recipients, sender_id=None, enqueue=False):
+        # Slack over the client's own timeout covers time spent queued on the semaphore
+        return self._submit(self.client.send(message, recipients, sender_id, enqueue)).result(self.timeout * 2)
+
+    def send_many(self, calls):
+        """Send [(message, recipients)] concurrently; returns a response or exception per call, in order"""
+        async def gather():
+            return await asyncio.gather(
+                *(self.client.send(message, recipients) for message, recipients in calls),
+                return_exceptions=True
+            )
+        # Every call may wait for a semaphore slot behind the others
+        waves = -(-len(calls) // max(getattr(self.client, 'concurrency', 1), 1))
+        return self._submit(gather()).result(self.timeout * (waves + 1))
+
+    def close(self):
+        if self._thread is None:
+            return
+        try:
+            self._submit(self.client.close()).result(self.timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(self.timeout)
+            self._thread = None
+
+
+def create_async_gateway(config, fake=False):
+    """Bridge around the async client, for SMS_GATEWAY 'africastalking_async' or 'fake_async'"""
+    concurrency = config.get('SMS_ASYNC_CONCURRENCY', DEFAULT_CONCURRENCY)
+    timeout = config.get('SMS_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)
+    if fake:
+        client = FakeAsyncSmsGateway(latency=config.get('SMS_FAKE_LATENCY', 0.0), concurrency=concurrency)
+    else:
+        client = AsyncAfricasTalkingClient(
+            config['AFRICASTALKING_USERNAME'],
+            config['AFRICASTALKING_API_KEY'],
+            sender_id=config.get('AFRICASTALKING_SENDER_ID'),
+            concurrency=concurrency,
+            timeout=timeout
+        )
+    bridge = AsyncGatewayBridge(client, timeout)
+    atexit.register(bridge.close)
+    return bridge
@@ -0,0 +1,116 @@
+import time
+from datetime import datetime
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_match_model import DonorMatch
+from app.services import notification_service
+from app.services.donor_index import donor_index
+from app.services.priority import order_requests
+
+# Number of rows sent per multi-row INSERT / IN (...) lookup
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_existing_pairs(request_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return the set of (request_id, donor_id) pairs that already have a match"""
+    existing = set()
+    for chunk in _chunks(list(request_ids), chunk_size):
+        existing.update(
+            db.session.query(DonorMatch.request_id, DonorMatch.donor_id)
+            .filter(DonorMatch.request_id.in_(chunk))
+            .all()
+        )
+    return existing
+
+
+def run_batch_match(blood_requests=None, chunk_size=DEFAULT_CHUNK_SIZE, status='Pending'):
+    """Create matches for every compatible (request, donor) pair in one pass.
+
+    Candidates come from the donor index (computed once per blood type), existing
+    matches are loaded once into a set, and new rows are bulk inserted in chunks
+    inside a single transaction. Requests are processed most urgent (then oldest)
+    first. The caller is responsible for committing.
+    """
+    started = time.perf_counter()
+    if blood_requests is None:
+        blood_requests = BloodRequest.query.filter_by(status='Pending').all()
+    # Wave-mode requests are notified a few donors at a time by wave_notifier instead
+    blood_requests = [r for r in order_requests(blood_requests) if r.notify_mode != 'waves']
+
+    existing = load_existing_pairs([r.id for r in blood_requests], chunk_size)
+    candidates_by_type = {}
+    new_pairs = {}  # request_id -> [donor dicts] for the rows inserted
+    requests_with_no_matches = []
+    candidate_pairs = 0
+    matches_created = 0
+    pending_rows = []
+    now = datetime.utcnow()
+
+    for blood_request in blood_requests:
+        if blood_request.blood_type not in candidates_by_type:
+            candidates_by_type[blood_request.blood_type] = donor_index.candidates(blood_request.blood_type)
+        donors = candidates_by_type[blood_request.blood_type]
+
+        if not donors:
+            requests_with_no_matches.append(blood_request.id)
+            continue
+
+        candidate_pairs += len(donors)
+        for donor in donors:
+            if (blood_request.id, donor['id']) in existing:
+                continue
+            pending_rows.append({
+                'request_id': blood_request.id,
+                'donor_id': donor['id'],
+                'status': status,
+                'notified_at': now
+            })
+            new_pairs.setdefault(blood_request.id, []).append(donor)
+
+        if len(pending_rows) >= chunk_size:
+            db.session.execute(DonorMatch.__table__.insert(), pending_rows)
+            matches_created += len(pending_rows)
+            pending_rows = []
+
+    if pending_rows:
+        db.session.execute(DonorMatch.__table__.insert(), pending_rows)
+        matches_created += len(pending_rows)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'requests_scanned': len(blood_requests),
+        'candidate_pairs': candidate_pairs,
+        'matches_created': matches_created,
+        'requests_with_no_matches': requests_with_no_matches,
+        'new_pairs': new_pairs,
+        'elapsed_seconds': round(elapsed, 4),
+        'pairs_per_second': round(candidate_pairs / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+def match_and_queue(blood_requests, chunk_size=DEFAULT_CHUNK_SIZE):
+    """run_batch_match plus the SMS fan-out: one shared message per request for its
+    new matches, and a note to requesters when no donor could be found.
+
+    Returns the stats of run_batch_match; the caller commits and dispatches.
+    """
+    stats = run_batch_match(blood_requests, chunk_size)
+    requests_by_id = {r.id: r for r in blood_requests}
+
+    # new_pairs keeps run_batch_match's urgency order, so critical requests are queued first
+    for request_id, donors in stats['new_pairs'].items():
+        notification_service.queue_broadcast(requests_by_id[request_id], [donor['id'] for donor in donors])
+
+    for request_id in stats['requests_with_no_matches']:
+        blood_request = requests_by_id[request_id]
+        notification_service.queue_requester_notification(
+            blood_request,
+            notification_service.NO_MATCH_MESSAGE.format(blood_type=blood_request.blood_type),
+            notification_service.NO_MATCH_TEMPLATE
+        )
+    return stats
@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.change_log_model import ChangeLog
+from app.models.table_version_model import TableVersion
+
+# Tables whose changes are published on the feed
+FEED_TABLES = ('blood_request', 'donor_match', 'donation_record')
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+DEFAULT_RETENTION_DAYS = 7
+# table_version row holding the last feed sequence number handed out
+SEQUENCE_COUNTER = 'change_log'
+
+# Signalled after every commit that wrote feed entries (wakes long-polls in this process)
+_new_entries = threading.Condition()
+
+
+def _payload(values):
+    return json.dumps(values, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+
+
+def _columns(obj):
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _write(session, entries):
+    if entries:
+        session.connection().execute(ChangeLog.__table__.insert(), entries)
+        session.info['change_feed_written'] = True
+
+
+def _entry(table_name, operation, row_id, values, now):
+    return {
+        'table_name': table_name,
+        'row_id': row_id,
+        'operation': operation,
+        'payload': _payload(values),
+        'created_at': now
+    }
+
+
+def _after_flush(session, flush_context):
+    now = datetime.utcnow()
+    entries = []
+    for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            table = getattr(obj, '__table__', None)
+            if table is None or table.name not in FEED_TABLES:
+                continue
+            if operation == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            values = _columns(obj)
+            entries.append(_entry(table.name, operation, values.get('id'), values, now))
+    _write(session, entries)
+
+
+def _do_orm_execute(state):
+    # Multi-row Core INSERTs bypass the unit of work and MySQL has no RETURNING:
+    # run the INSERT here, then read back the rows above the previous highest ID.
+    # Under REPEATABLE READ the transaction's snapshot hides other writers' new
+    # rows, so those are exactly the rows this statement inserted.
+    if not state.is_insert:
+        return None
+    table = getattr(state.statement, 'table', None)
+    if getattr(table, 'name', None) not in FEED_TABLES:
+        return None
+    connection = state.session.connection()
+    highest = connection.execute(select(func.max(table.c.id))).scalar() or 0
+    result = state.invoke_statement()
+    now = datetime.utcnow()
+    rows = connection.execute(select(table).where(table.c.id > highest).order_by(table.c.id)).mappings()
+    _write(state.session, [_entry(table.name, 'insert', row['id'], dict(row), now) for row in rows])
+    return result
+
+
+def _after_commit(session):
+    if session.info.pop('change_feed_written', False):
+        with _new_entries:
+            _new_entries.notify_all()
+
+
+def _after_rollback(session):
+    session.info.pop('change_feed_written', None)
+
+
+def record_bulk_update(table_name, values, criteria):
+    """Log a bulk UPDATE made outside the unit of work (the caller's transaction commits it).
+
+    ``criteria`` describes the rows affected, e.g. {'request_id': 3, 'donor_ids': [...]}.
+    """
+    now = datetime.utcnow()
+    _write(db.session, [_entry(table_name, 'update', None, dict(criteria, **values), now)])
+
+
+def register_session_events(session):
+    if not event.contains(session, 'after_flush', _after_flush):
+        event.listen(session, 'after_flush', _after_flush)
+        event.listen(session, 'do_orm_execute', _do_orm_execute)
+        event.listen(session, 'after_commit', _after_commit)
+        event.listen(session, 'after_rollback', _after_rollback)
+
+
+def _lock_counter():
+    """Last sequence number handed out, with its row locked until the caller commits"""
+    query = (select(TableVersion.version).where(TableVersion.table_name == SEQUENCE_COUNTER)
+             .with_for_update())
+    counter = db.session.execute(query).scalar()
+    if counter is not None:
+        return counter
+    try:
+        # First use (the migration creates the row; create_all() does not)
+        db.session.add(TableVersion(table_name=SEQUENCE_COUNTER, version=0, updated_at=datetime.utcnow()))
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()  # Another sequencer created it first; nothing else is pending yet
+    return db.session.execute(query).scalar()
+
+
+def assign_sequence(limit=MAX_PAGE_SIZE):
+    """Give committed entries that have no sequence number yet the next ones, in ID order.
+
+    IDs are allocated at INSERT but become visible at COMMIT, so an entry from a
+    long transaction can show up below IDs a consumer has already passed. The feed
+    cursor is therefore the sequence number, handed out here only to committed
+    entries; a late entry simply gets a later number. Sequencers take turns on the
+    counter row and commit before the next one reads, so numbers become visible in
+    order. Returns the number of entries sequenced.
+    """
+    table = ChangeLog.__table__
+    if db.session.execute(select(table.c.id).where(table.c.seq.is_(None)).limit(1)).first() is None:
+        db.session.rollback()
+        return 0
+    db.session.rollback()  # Start a fresh snapshot once the counter row is locked
+    counter = _lock_counter()
+    ids = db.session.execute(
+        select(table.c.id).where(table.c.seq.is_(None)).order_by(table.c.id).limit(limit)
+    ).scalars().all()
+    if ids:
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('entry_id')).values(seq=db.bindparam('new_seq')),
+            [{'entry_id': entry_id, 'new_seq': counter + i} for i, entry_id in enumerate(ids, 1)]
+        )
+        versions = TableVersion.__table__
+        db.session.execute(
+            versions.update().where(versions.c.table_name == SEQUENCE_COUNTER)
+            .values(version=counter + len(ids), updated_at=datetime.utcnow())
+        )
+    db.session.commit()
+    return len(ids)
+
+
+def read_changes(since, limit=DEFAULT_PAGE_SIZE, tables=None):
+    """Entries after the ``since`` cursor (a sequence number), in sequence order.
+
+    Returns (entries, next_cursor). Ends the read transaction so the next call
+    sees newly committed entries.
+    """
+    assign_sequence()
+    rows = ChangeLog.query.filter(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit).all()
+    db.session.rollback()
+
+    entries = []
+    cursor = since
+    for row in rows:
+        cursor = row.seq
+        if tables is None or row.table_name in tables:
+            entries.append(row.to_dict())
+    return entries, cursor
+
+
+def wait_for_changes(since, timeout, limit=DEFAULT_PAGE_SIZE, tables=None, poll_seconds=1.0):
+    """Long-poll: return as soon as there are entries after ``since``, or after ``timeout`` seconds.
+
+    Commits in this process wake the waiter at once; commits made by other workers
+    are picked up by re-reading every ``poll_seconds``.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        entries, cursor = read_changes(since, limit, tables)
+        remaining = deadline - time.monotonic()
+        if entries or remaining <= 0:
+            return entries, cursor
+        since = cursor  # Skip over entries filtered out by ``tables``
+        with _new_entries:
+            _new_entries.wait(min(poll_seconds, remaining))
+
+
+def latest_cursor():
+    """Cursor of the newest entry, for consumers that only want changes from now on"""
+    assign_sequence()
+    latest = db.session.query(db.func.max(ChangeLog.seq)).scalar() or 0
+    db.session.rollback()
+    return latest
+
+
+def prune(retention_days=DEFAULT_RETENTION_DAYS):
+    """Delete entries older than the retention window; returns the number removed"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = ChangeLog.query.filter(ChangeLog.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def init_app(app):
+    register_session_events(db.session)
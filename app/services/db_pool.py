@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from collections import deque
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Checkouts slower than this are logged, so pool exhaustion is never silent
+SLOW_CHECKOUT_SECONDS = 1.0
+
+# Number of recent checkout waits kept for the percentiles
+WAIT_SAMPLE_SIZE = 1000
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._slow_checkouts = 0
+        self._timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            logger.warning(f'Connection pool exhausted: no connection within {self.timeout()}s ({self.status()})')
+            raise
+        finally:
+            self._record_wait(time.perf_counter() - started)
+
+    def _record_wait(self, waited):
+        with self._stats_lock:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._waits.append(waited)
+            if waited >= SLOW_CHECKOUT_SECONDS:
+                self._slow_checkouts += 1
+                logger.warning(f'Waited {waited:.2f}s for a database connection ({self.status()})')
+
+    def wait_stats(self):
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            checkouts = self._checkouts
+            stats = {
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'slow_checkouts': self._slow_checkouts,
+                'wait_ms_total': round(self._total_wait * 1000, 3),
+                'wait_ms_avg': round(self._total_wait * 1000 / checkouts, 3) if checkouts else 0.0,
+                'wait_ms_max': round(self._max_wait * 1000, 3),
+            }
+        for name, fraction in (('wait_ms_p50', 0.5), ('wait_ms_p99', 0.99)):
+            stats[name] = round(waits[min(len(waits) - 1, int(len(waits) * fraction))] * 1000, 3) if waits else 0.0
+        return stats
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the DB_* config values.
+
+    Pool sizing only applies to server databases; SQLite keeps the pool
+    Flask-SQLAlchemy picks for it.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    timeout_ms = config.get('DB_STATEMENT_TIMEOUT_MS')
+    if timeout_ms and uri.startswith('mysql'):
+        # Abort runaway SELECTs server-side instead of letting them hold a connection
+        options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={int(timeout_ms)}'}
+    return options
+
+
+def pool_status(engine):
+    """Live statistics for the engine's connection pool"""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout_seconds': pool.timeout(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        status.update(pool.wait_stats())
+    return status
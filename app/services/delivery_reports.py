@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from app.extensions import db
+from app.models.notification_model import Notification
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the DELIVERY_REPORT_* config values
+DEFAULT_FLUSH_SECONDS = 2.0
+DEFAULT_MAX_BUFFERED = 5000  # Flush early once this many reports are waiting
+DEFAULT_UNMATCHED_RETRY_SECONDS = 60.0
+DEFAULT_CHUNK_SIZE = 1000  # Message IDs per IN (...) list
+
+# Gateway delivery statuses; intermediate ones ('Sent', 'Submitted', 'Buffered') are ignored
+DELIVERED_STATUSES = ('Success', 'Delivered')
+FAILED_STATUSES = ('Failed', 'Rejected', 'Expired', 'AbsentSubscriber', 'UserInBlackList', 'DeliveryFailure')
+
+# Only notifications the gateway accepted can move on; a later report never overrides a final one
+UPDATABLE_STATUSES = ('Sent',)
+
+
+def parse_report(data):
+    """(message_id, status, reason) from one callback payload, or None when it is not final"""
+    message_id = data.get('id') or data.get('messageId')
+    status = data.get('status')
+    if not message_id or status is None:
+        return None
+    if status in DELIVERED_STATUSES:
+        return message_id, 'Delivered', None
+    if status in FAILED_STATUSES:
+        return message_id, 'Failed', (data.get('failureReason') or status)[:255]
+    return None
+
+
+class DeliveryReportBuffer:
+    """Collects delivery reports in memory and applies them in periodic bulk UPDATEs.
+
+    Callbacks only touch the in-process buffer, so a burst after a broadcast costs
+    one UPDATE per status (and failure reason) per chunk of message IDs instead of a
+    transaction per report. Reports whose message ID is not in the table yet (the
+    callback beat the outbox's commit) are retried for a while, then dropped.
+    Buffered reports are lost if the process dies before the next flush.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self.max_buffered = DEFAULT_MAX_BUFFERED
+        self.retry_seconds = DEFAULT_UNMATCHED_RETRY_SECONDS
+        self._pending = {}  # message_id -> (status, reason, first_seen)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.applied = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush_seconds = None
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_seconds = app.config.get('DELIVERY_REPORT_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+        self.max_buffered = app.config.get('DELIVERY_REPORT_MAX_BUFFERED', DEFAULT_MAX_BUFFERED)
+        self.retry_seconds = app.config.get('DELIVERY_REPORT_RETRY_SECONDS', DEFAULT_UNMATCHED_RETRY_SECONDS)
+        app.extensions['delivery_reports'] = self
+
+    def add(self, reports):
+        """Buffer [(message_id, status, reason)]; the latest report for an ID wins"""
+        now = time.monotonic()
+        with self._lock:
+            for message_id, status, reason in reports:
+                first_seen = self._pending.get(message_id, (None, None, now))[2]
+                self._pending[message_id] = (status, reason, first_seen)
+            self.received += len(reports)
+            full = len(self._pending) >= self.max_buffered
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._thread is not None or self.app is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='delivery-reports', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                logger.exception('Applying delivery reports failed')
+
+    def flush(self):
+        """Apply everything buffered so far; returns the number of notifications updated"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                updated, unmatched = self._apply(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._requeue(batch)
+                raise
+
+            # Keep reports for unknown IDs until the retry window runs out
+            now = time.monotonic()
+            retry = {i: batch[i] for i in unmatched if now - batch[i][2] < self.retry_seconds}
+            self._requeue(retry)
+            self.applied += updated
+            self.dropped += len(unmatched) - len(retry)
+            self.flushes += 1
+            self.last_flush_seconds = round(time.perf_counter() - started, 4)
+            return updated
+
+    def _requeue(self, reports):
+        with self._lock:
+            for message_id, report in reports.items():
+                self._pending.setdefault(message_id, report)  # A newer report wins
+
+    def _apply(self, batch):
+        table = Notification.__table__
+        ids = list(batch)
+        known = set()
+        for start in range(0, len(ids), DEFAULT_CHUNK_SIZE):
+            known.update(
+                row.provider_message_id for row in
+                db.session.execute(
+                    db.select(table.c.provider_message_id)
+                    .where(table.c.provider_message_id.in_(ids[start:start + DEFAULT_CHUNK_SIZE]))
+                )
+            )
+
+        # One UPDATE per (status, reason) per chunk of message IDs
+        groups = {}
+        for message_id in known:
+            status, reason, _ = batch[message_id]
+            groups.setdefault((status, reason), []).append(message_id)
+        now = datetime.utcnow()
+        updated = 0
+        for (status, reason), message_ids in groups.items():
+            values = {'status': status, 'next_attempt_at': None}
+            if status == 'Delivered':
+                values['delivered_at'] = now
+            else:
+                values['last_error'] = reason
+            for start in range(0, len(message_ids), DEFAULT_CHUNK_SIZE):
+                updated += db.session.execute(
+                    table.update()
+                    .where(table.c.provider_message_id.in_(message_ids[start:start + DEFAULT_CHUNK_SIZE]),
+                           table.c.status.in_(UPDATABLE_STATUSES))
+                    .values(**values)
+                ).rowcount
+        return updated, [message_id for message_id in ids if message_id not in known]
+
+    def stats(self):
+        return {
+            'buffered': len(self._pending),
+            'received': self.received,
+            'applied': self.applied,
+            'dropped_unmatched': self.dropped,
+            'flushes': self.flushes,
+            'last_flush_seconds': self.last_flush_seconds
+        }
+
+
+# Process-wide buffer, initialized by create_app
+delivery_reports = DeliveryReportBuffer()
@@ -0,0 +1,236 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case
+from app.extensions import db
+from app.models.donation_record_model import DonationRecord
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+
+# Medical guideline: minimum waiting period between two donations
+MIN_DAYS_BETWEEN_DONATIONS = 56
+
+# Largest batch accepted by ingest_donations, and rows per multi-row INSERT
+MAX_BATCH_RECORDS = 5000
+INSERT_CHUNK_SIZE = 1000
+
+MEDICAL_NOTE = 'The next eligible donation date was adjusted to comply with the medical guideline of 56 days between donations.'
+
+
+def naive(value):
+    """Drop timezone info so datetimes compare against utcnow()"""
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def parse_eligible_date(value):
+    """Parse a next_eligible_donation value (ISO string or datetime); raises ValueError"""
+    if isinstance(value, str):
+        return naive(datetime.fromisoformat(value.replace('Z', '')))
+    return naive(value)
+
+
+def medical_restriction(next_eligible, now):
+    """Build the response body returned when a donor donated too recently"""
+    next_eligible_naive = naive(next_eligible)
+    return {
+        'status': 'medical_restriction',
+        'message': 'Donor is not medically eligible to donate at this time',
+        'next_eligible_date': next_eligible.isoformat(),
+        'days_until_eligible': (next_eligible_naive - now).days,
+        'info': 'Medical guidelines require a minimum waiting period between donations to ensure donor health'
+    }
+
+
+def check_eligibility(donor, now):
+    """Return a medical_restriction body if the donor cannot donate yet, otherwise None.
+
+    Reads the donor's materialized next_eligible_at instead of their donation history.
+    """
+    if donor.next_eligible_at and naive(donor.next_eligible_at) > now:
+        return medical_restriction(donor.next_eligible_at, now)
+    return None
+
+
+def next_eligible_date(donated_at, provided_date=None):
+    """Return (next_eligible, adjusted) honouring the minimum waiting period"""
+    min_date = donated_at + timedelta(days=MIN_DAYS_BETWEEN_DONATIONS)
+    if provided_date is None:
+        return min_date, False
+    if provided_date < min_date:
+        # Auto-adjust to comply with medical guidelines
+        return min_date, True
+    return provided_date, False
+
+
+def record_donation(donor, hospital_id, blood_type, next_eligible):
+    """Add a donation record and mark the donor unavailable; the caller commits"""
+    donation_record = DonationRecord(
+        donor_id=donor.id,
+        hospital_id=hospital_id,
+        blood_type=blood_type,
+        next_eligible_donation=next_eligible
+    )
+    donor.availability_status = False
+    donor.next_eligible_at = next_eligible
+    db.session.add(donation_record)
+    return donation_record
+
+
+def refresh_availability(donor, now):
+    """Recompute a donor's availability from their most recent remaining donation"""
+    most_recent_donation = DonationRecord.query.filter_by(donor_id=donor.id).order_by(
+        DonationRecord.donated_at.desc()
+    ).first()
+    if most_recent_donation and naive(most_recent_donation.next_eligible_donation) > now:
+        # The next eligible date is in the future, donor is not available
+        donor.availability_status = False
+        donor.next_eligible_at = most_recent_donation.next_eligible_donation
+    else:
+        # No donations left, or the waiting period is over: donor is available
+        donor.availability_status = True
+        donor.next_eligible_at = None
+
+
+def sweep_eligibility(now=None):
+    """Re-enable every donor whose waiting period has ended, in one bulk UPDATE.
+
+    Returns the number of donors made available again.
+    """
+    now = now or datetime.utcnow()
+    updated = Donor.query.filter(
+        Donor.availability_status == False,
+        Donor.next_eligible_at.isnot(None),
+        Donor.next_eligible_at <= now
+    ).update({'availability_status': True, 'next_eligible_at': None}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def _validate_record(record):
+    """Return (donor_id, hospital_id, blood_type, donated_at, provided_date) or raise ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError('Each record must be a JSON object')
+    missing = [field for field in ('donor_id', 'hospital_id', 'blood_type') if field not in record]
+    if missing:
+        raise ValueError(f'Missing required fields: {", ".join(missing)}')
+    if not isinstance(record['donor_id'], int):
+        raise ValueError('donor_id must be an integer')
+    if not isinstance(record['hospital_id'], int):
+        raise ValueError('hospital_id must be an integer')
+    if not isinstance(record['blood_type'], str):
+        raise ValueError('blood_type must be a string')
+    try:
+        donated_at = parse_eligible_date(record['donated_at']) if record.get('donated_at') else None
+    except ValueError:
+        raise ValueError('Invalid date format for donated_at. Use ISO format (YYYY-MM-DDTHH:MM:SS)')
+    try:
+        provided = parse_eligible_date(record['next_eligible_donation']) if record.get('next_eligible_donation') else None
+    except ValueError:
+        raise ValueError('Invalid date format for next_eligible_donation. Use ISO format (YYYY-MM-DDTHH:MM:SS)')
+    return record['donor_id'], record['hospital_id'], record['blood_type'], donated_at, provided
+
+
+def ingest_donations(records, now=None):
+    """Record a batch of donations (e.g. a hospital's end-of-day log) in a fixed number of queries.
+
+    Donors and hospitals are resolved with one IN query each, eligibility is
+    checked in memory against each donor's next_eligible_at (so two donations
+    by the same donor in one batch are caught), rows are written with
+    multi-row INSERTs and donors still resting are marked unavailable with one UPDATE.
+    Commits, and returns (results, donor_ids_updated) with one result per
+    input record, in order.
+    """
+    now = now or datetime.utcnow()
+    parsed = []
+    for record in records:
+        try:
+            parsed.append(_validate_record(record))
+        except ValueError as e:
+            parsed.append(e)
+
+    valid = [entry for entry in parsed if not isinstance(entry, ValueError)]
+    donor_ids = {entry[0] for entry in valid}
+    hospital_ids = {entry[1] for entry in valid}
+    donors = {
+        row.id: row for row in
+        db.session.query(Donor.id, Donor.blood_type, Donor.availability_status, Donor.next_eligible_at)
+        .filter(Donor.id.in_(donor_ids)).all()
+    } if donor_ids else {}
+    known_hospitals = {
+        row.id for row in db.session.query(Hospital.id).filter(Hospital.id.in_(hospital_ids)).all()
+    } if hospital_ids else set()
+
+    # Each donor's eligibility as the batch is applied in order
+    next_eligible_by_donor = {donor_id: row.next_eligible_at for donor_id, row in donors.items()}
+    touched = set()
+    results, rows = [], []
+    for index, entry in enumerate(parsed):
+        if isinstance(entry, ValueError):
+            results.append({'index': index, 'status': 'error', 'error': str(entry)})
+            continue
+        donor_id, hospital_id, blood_type, donated_at, provided = entry
+        donor = donors.get(donor_id)
+        if donor is None:
+            results.append({'index': index, 'status': 'error', 'error': f'Donor with ID {donor_id} not found'})
+            continue
+        if hospital_id not in known_hospitals:
+            results.append({'index': index, 'status': 'error', 'error': f'Hospital with ID {hospital_id} not found'})
+            continue
+        if blood_type != donor.blood_type:
+            results.append({'index': index, 'status': 'error',
+                            'error': f"Blood type {blood_type} does not match donor's blood type {donor.blood_type}"})
+            continue
+
+        donated_at = donated_at or now
+        current = next_eligible_by_donor.get(donor_id)
+        if current and naive(current) > donated_at:
+            result = medical_restriction(current, donated_at)
+            result.update({'index': index, 'donor_id': donor_id})
+            results.append(result)
+            continue
+
+        next_eligible, adjusted = next_eligible_date(donated_at, provided)
+        next_eligible_by_donor[donor_id] = next_eligible
+        touched.add(donor_id)
+        rows.append({
+            'donor_id': donor_id,
+            'hospital_id': hospital_id,
+            'blood_type': blood_type,
+            'donated_at': donated_at,
+            'next_eligible_donation': next_eligible
+        })
+        result = {
+            'index': index,
+            'status': 'created',
+            'donor_id': donor_id,
+            'hospital_id': hospital_id,
+            'blood_type': blood_type,
+            'donated_at': donated_at.isoformat(),
+            'next_eligible_donation': next_eligible.isoformat()
+        }
+        if adjusted:
+            result.update({
+                'medical_note': MEDICAL_NOTE,
+                'provided_date': provided.isoformat(),
+                'adjusted_date': next_eligible.isoformat()
+            })
+        results.append(result)
+
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(DonationRecord.__table__.insert(), rows[start:start + INSERT_CHUNK_SIZE])
+    # One UPDATE: each donor still resting after their latest donation in the batch is
+    # marked unavailable until then. Back-dated donations whose rest period is already
+    # over leave the donor alone; re-enabling donors is sweep_eligibility's job only.
+    resting = {
+        donor_id: next_eligible_by_donor[donor_id] for donor_id in touched
+        if naive(next_eligible_by_donor[donor_id]) > now
+    }
+    if resting:
+        db.session.execute(
+            Donor.__table__.update()
+            .where(Donor.id.in_(resting))
+            .values(
+                next_eligible_at=case(resting, value=Donor.__table__.c.id),
+                availability_status=False
+            )
+        )
+    db.session.commit()
+    return results, touched
@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.donor_model import Donor
+from app.services.donor_index import COMPATIBLE_BLOOD_TYPES
+from app.services.geo import parse_location
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000  # Keeps the report bounded for badly broken files
+
+REQUIRED_FIELDS = ('name', 'age', 'blood_type', 'phone', 'city')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+
+class UploadText:
+    """Iterates a binary upload as UTF-8 lines, counting them so a read error can be located.
+
+    Lines are decoded one at a time, so line_number is the line that failed to
+    decode (or that the csv module choked on) rather than the end of a buffer.
+    """
+
+    def __init__(self, stream):
+        if not isinstance(stream, io.BufferedIOBase):
+            stream = io.BufferedReader(stream)
+        self._stream = stream
+        self.line_number = 0
+
+    def __iter__(self):
+        for raw in self._stream:
+            self.line_number += 1
+            yield raw.decode('utf-8-sig' if self.line_number == 1 else 'utf-8')
+
+
+def open_text(stream):
+    """Wrap a binary upload stream so it can be read line by line as UTF-8"""
+    return UploadText(stream)
+
+
+def iter_rows(text, fmt):
+    """Yield (line_number, row, error) for every record of a CSV or NDJSON upload"""
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, row, None
+
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def validate_row(row):
+    """Return (values, errors) for one upload row; values are ready for Donor.__table__.insert()"""
+    row = {key.strip(): _clean(value) for key, value in row.items() if key}
+    errors = [f'Missing required field: {field}' for field in REQUIRED_FIELDS if row.get(field) is None]
+    if errors:
+        return None, errors
+
+    try:
+        age = int(row['age'])
+        if age <= 0:
+            errors.append('age must be a positive integer')
+    except (TypeError, ValueError):
+        age = None
+        errors.append('age must be an integer')
+
+    blood_type = str(row['blood_type']).upper()
+    if blood_type not in COMPATIBLE_BLOOD_TYPES:
+        errors.append(f'Unknown blood type: {row["blood_type"]}')
+
+    phone = str(row['phone'])
+    if len(phone) > 20:
+        errors.append('phone must be at most 20 characters')
+    email = row.get('email')
+    if email is not None and len(str(email)) > 100:
+        errors.append('email must be at most 100 characters')
+
+    availability = row.get('availability_status', True)
+    if isinstance(availability, str):
+        if availability.lower() in TRUE_VALUES:
+            availability = True
+        elif availability.lower() in FALSE_VALUES:
+            availability = False
+        else:
+            errors.append('availability_status must be true or false')
+    elif availability is None:
+        availability = True
+
+    location = row.get('location')
+    latitude, longitude = parse_location(location)
+    if location is not None and latitude is None:
+        errors.append('location must be "latitude,longitude"')
+
+    if errors:
+        return None, errors
+    return {
+        'name': str(row['name'])[:100],
+        'age': age,
+        'blood_type': blood_type,
+        'phone': phone,
+        'email': str(email) if email is not None else None,
+        'city': str(row['city'])[:50],
+        'location': location,
+        'latitude': latitude,
+        'longitude': longitude,
+        'availability_status': bool(availability),
+        'next_eligible_at': None
+    }, []
+
+
+class DonorImport:
+    """Streams donor rows into the database in multi-row INSERT batches.
+
+    Duplicate phones and emails are rejected against sets preloaded from the
+    donor table (and extended as the upload is read), so no per-row queries
+    are issued. Each batch is committed on its own; the report lists every
+    rejected row by line number.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._batch = []  # [(line_number, values)]
+        phones, emails = set(), set()
+        for phone, email in db.session.query(Donor.phone, Donor.email):
+            phones.add(phone)
+            if email:
+                emails.add(email.lower())
+        self._phones, self._emails = phones, emails
+
+    def _reject(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def add(self, line_number, row):
+        self.received += 1
+        values, errors = validate_row(row)
+        if values is not None:
+            email = values['email'].lower() if values['email'] else None
+            if values['phone'] in self._phones:
+                errors.append(f'Duplicate phone: {values["phone"]}')
+            if email and email in self._emails:
+                errors.append(f'Duplicate email: {values["email"]}')
+        if errors:
+            self._reject(line_number, errors)
+            return
+        self._phones.add(values['phone'])
+        if email:
+            self._emails.add(email)
+        self._batch.append((line_number, values))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        try:
+            db.session.execute(Donor.__table__.insert(), [values for _, values in batch])
+            db.session.commit()
+            self.imported += len(batch)
+        except IntegrityError:
+            # A concurrent writer took one of the phones/emails; retry row by row to isolate it
+            db.session.rollback()
+            for line_number, values in batch:
+                try:
+                    db.session.execute(Donor.__table__.insert(), values)
+                    db.session.commit()
+                    self.imported += 1
+                except IntegrityError:
+                    db.session.rollback()
+                    self._reject(line_number, ['Phone or email already registered'])
+
+    def run(self, rows):
+        try:
+            for line_number, row, error in rows:
+                if error:
+                    self.received += 1
+                    self._reject(line_number, [error])
+                else:
+                    self.add(line_number, row)
+        finally:
+            self.flush()  # Rows read before an unreadable line are still imported
+        return self.report()
+
+    def report(self):
+        return {
+            'received': self.received,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
@@ -0,0 +1,180 @@
+import threading
+import time
+from app.models.donor_model import Donor
+from app.services.geo import cell_of, haversine_km, ring_cells, ring_reach_km, rings_to_cover, smallest
+
+# Blood types each recipient type can safely receive
+COMPATIBLE_BLOOD_TYPES = {
+    'O-': ('O-',),
+    'O+': ('O-', 'O+'),
+    'A-': ('O-', 'A-'),
+    'A+': ('O-', 'O+', 'A-', 'A+'),
+    'B-': ('O-', 'B-'),
+    'B+': ('O-', 'O+', 'B-', 'B+'),
+    'AB-': ('O-', 'A-', 'B-', 'AB-'),
+    'AB+': ('O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+')
+}
+
+# How often (seconds) the index is rebuilt from the database so that writes
+# made by other worker processes are picked up
+DEFAULT_REFRESH_SECONDS = 300
+
+# Furthest a proximity search looks for donors, in kilometres
+DEFAULT_MAX_KM = 200
+# Upper bounds for caller-supplied search parameters; the ring scan grows with max_km squared
+MAX_SEARCH_KM = 1000
+MAX_K = 100
+
+
+def get_compatible_blood_types(blood_type):
+    """Return list of blood types compatible with the given blood type"""
+    return list(COMPATIBLE_BLOOD_TYPES.get(blood_type, ()))
+
+
+class DonorIndex:
+    """In-memory index of available donors bucketed by blood type and city"""
+
+    def __init__(self, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._buckets = {}  # blood_type -> city -> {donor_id: donor dict}
+        self._grid = {}  # blood_type -> grid cell -> {donor_id: (lat, lng)}
+        self._positions = {}  # donor_id -> (blood_type, city, grid cell or None)
+        self._loaded_at = None
+
+    @staticmethod
+    def _add(buckets, grid, positions, donor):
+        buckets.setdefault(donor.blood_type, {}).setdefault(donor.city, {})[donor.id] = donor.to_dict()
+        cell = None
+        if donor.latitude is not None and donor.longitude is not None:
+            cell = cell_of(donor.latitude, donor.longitude)
+            grid.setdefault(donor.blood_type, {}).setdefault(cell, {})[donor.id] = (donor.latitude, donor.longitude)
+        positions[donor.id] = (donor.blood_type, donor.city, cell)
+
+    def load(self):
+        """Rebuild the index from the donor table (needs an app context)"""
+        donors = Donor.query.filter(Donor.availability_status == True).all()
+        buckets, grid, positions = {}, {}, {}
+        for donor in donors:
+            self._add(buckets, grid, positions, donor)
+        with self._lock:
+            self._buckets = buckets
+            self._grid = grid
+            self._positions = positions
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        """Load the index on first use and rebuild it once it goes stale"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+            self.load()
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup"""
+        with self._lock:
+            self._loaded_at = None
+
+    def upsert(self, donor):
+        """Add, move or drop a donor after it was created or changed"""
+        with self._lock:
+            self._discard(donor.id)
+            if donor.availability_status:
+                self._add(self._buckets, self._grid, self._positions, donor)
+
+    def remove(self, donor_id):
+        """Drop a donor after it was deleted"""
+        with self._lock:
+            self._discard(donor_id)
+
+    def _discard(self, donor_id):
+        position = self._positions.pop(donor_id, None)
+        if position is None:
+            return
+        blood_type, city, cell = position
+        for index, key in ((self._buckets, city), (self._grid, cell)):
+            group = index.get(blood_type, {})
+            bucket = group.get(key)
+            if bucket is not None:
+                bucket.pop(donor_id, None)
+                if not bucket:
+                    del group[key]
+
+    def candidates(self, blood_type, city=None, exclude_ids=()):
+        """Return available donors compatible with blood_type, ordered by ID"""
+        self.ensure_loaded()
+        exclude_ids = set(exclude_ids)
+        found = []
+        with self._lock:
+            for donor_type in COMPATIBLE_BLOOD_TYPES.get(blood_type, ()):
+                cities = self._buckets.get(donor_type, {})
+                buckets = [cities.get(city, {})] if city is not None else cities.values()
+                for bucket in buckets:
+                    found.extend(d for donor_id, d in bucket.items() if donor_id not in exclude_ids)
+        found.sort(key=lambda d: d['id'])
+        return found
+
+    def nearest(self, blood_type, lat, lng, k=10, max_km=DEFAULT_MAX_KM, exclude_ids=()):
+        """Return the k closest available compatible donors to (lat, lng).
+
+        Searches the grid ring by ring outwards from the target cell and stops as
+        soon as k donors are found inside the radius the scanned rings fully cover,
+        so only the neighbourhood of the target is visited. When covering max_km
+        would take more ring cells than there are occupied cells (few donors, or
+        near the poles where cells shrink), every occupied cell is scanned instead.
+        Each result is the donor dict plus ``distance_km``.
+
+        The scan runs outside the index lock. Cells are read with single dict
+        operations (atomic under the GIL), so a concurrent upsert() only decides
+        whether a donor that just moved is seen.
+        """
+        self.ensure_loaded()
+        exclude_ids = set(exclude_ids)
+        max_km = min(max_km, MAX_SEARCH_KM)
+        with self._lock:
+            grids = [self._grid.get(t, {}) for t in COMPATIBLE_BLOOD_TYPES.get(blood_type, ())]
+
+        ids, lats, lngs = [], [], []
+
+        def collect(cells):
+            for cell in cells:
+                if not cell:
+                    continue
+                for donor_id, (donor_lat, donor_lng) in dict(cell).items():
+                    if donor_id not in exclude_ids:
+                        ids.append(donor_id)
+                        lats.append(donor_lat)
+                        lngs.append(donor_lng)
+
+        rings = rings_to_cover(lat, max_km)
+        if (2 * rings + 1) ** 2 > sum(len(grid) for grid in grids):
+            collect(cell for grid in grids for cell in list(grid.values()))
+            distances = haversine_km(lat, lng, lats, lngs) if ids else []
+        else:
+            center = cell_of(lat, lng)
+            distances = []
+            for radius in range(rings + 1):
+                collect(grid.get(cell) for cell in ring_cells(center, radius) for grid in grids)
+                if len(ids) >= k:
+                    distances = haversine_km(lat, lng, lats, lngs)
+                    if distances[smallest(distances, k)[-1]] <= ring_reach_km(lat, radius):
+                        break
+            else:
+                distances = haversine_km(lat, lng, lats, lngs) if ids else []
+
+        results = []
+        with self._lock:
+            for i in smallest(distances, k):
+                if distances[i] > max_km:
+                    break
+                position = self._positions.get(ids[i])
+                if position is None:
+                    continue  # Became unavailable while the scan ran
+                blood_type_of, city, _ = position
+                donor = dict(self._buckets[blood_type_of][city][ids[i]])
+                donor['distance_km'] = round(float(distances[i]), 3)
+                results.append(donor)
+        return results
+
+
+# Process-wide index shared by the controllers
+donor_index = DonorIndex()
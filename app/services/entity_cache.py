@@ -0,0 +1,228 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import DateTime
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.hospital_model import Hospital
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the ENTITY_CACHE_* config values
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_HOSPITAL_TTL_SECONDS = 3600  # Hospital data almost never changes
+DEFAULT_BLOOD_REQUEST_TTL_SECONDS = 60  # Requests change status as they are matched
+DEFAULT_KEY_PREFIX = 'reachout:entity'
+
+
+class Snapshot:
+    """Read-only copy of a row's columns, detached from any session.
+
+    Exposes the columns as attributes and reuses the model's to_dict(), so it can
+    stand in for the model wherever a handler only reads the entity.
+    """
+
+    def __init__(self, model, values):
+        self._model = model
+        self._values = values
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_values'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_dict(self):
+        return self._model.to_dict(self)
+
+    def __repr__(self):
+        return f'<Snapshot {self._model.__name__} {self._values.get("id")}>'
+
+
+class LRUBackend:
+    """In-process cache: least recently used entries are evicted past max_entries"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, values)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, values, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache shared by every worker process; requires the redis package"""
+
+    def __init__(self, url):
+        import redis  # Optional dependency, only needed for the shared backend
+        self.client = redis.Redis.from_url(url)
+        self.evictions = 0  # Expiry and eviction are handled by Redis
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, values, ttl):
+        self.client.setex(key, max(1, int(ttl)), json.dumps(values, default=str))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def clear(self):
+        pass  # Entries expire on their own; other processes may still be using them
+
+    def size(self):
+        return None
+
+
+def create_backend(config):
+    """Build the backend selected by ENTITY_CACHE_BACKEND ('memory' or 'redis')"""
+    if config.get('ENTITY_CACHE_BACKEND', 'memory') == 'redis':
+        return RedisBackend(config['ENTITY_CACHE_URL'])
+    return LRUBackend(config.get('ENTITY_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+
+
+class EntityCache:
+    """Read-through cache of one model's rows by primary key.
+
+    get() returns a Snapshot, loading the row on a miss; misses for unknown IDs
+    are not cached. Handlers that change or delete a row call invalidate(id)
+    after committing. Entries also expire after a TTL, which bounds staleness
+    for writes made by other processes when the in-process backend is used.
+    """
+
+    def __init__(self, model, default_ttl):
+        self.model = model
+        self.default_ttl = default_ttl
+        self.ttl = default_ttl
+        self.backend = LRUBackend()
+        self.prefix = DEFAULT_KEY_PREFIX
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._datetime_columns = {
+            column.key for column in model.__table__.columns if isinstance(column.type, DateTime)
+        }
+
+    def init_app(self, app, backend=None):
+        name = self.model.__tablename__.upper()
+        self.ttl = app.config.get(f'ENTITY_CACHE_{name}_TTL_SECONDS', self.default_ttl)
+        self.backend = backend or create_backend(app.config)
+        self.prefix = app.config.get('ENTITY_CACHE_KEY_PREFIX', DEFAULT_KEY_PREFIX)
+        self.enabled = app.config.get('ENTITY_CACHE_ENABLED', True)
+
+    def _key(self, id):
+        return f'{self.prefix}:{self.model.__tablename__}:{id}'
+
+    def _decode(self, values):
+        # Shared backends hand back JSON, so restore the datetime columns
+        for key in self._datetime_columns:
+            if isinstance(values.get(key), str):
+                values[key] = datetime.fromisoformat(values[key])
+        return values
+
+    def get(self, id):
+        """Snapshot of the row with this ID, or None if it does not exist"""
+        if not self.enabled:
+            row = db.session.get(self.model, id)
+            return Snapshot(self.model, self._values(row)) if row else None
+        key = self._key(id)
+        try:
+            values = self.backend.get(key)
+        except Exception:
+            logger.exception(f'{self.model.__name__} cache read failed')
+            self.errors += 1
+            values = None
+        if values is not None:
+            self.hits += 1
+            return Snapshot(self.model, self._decode(dict(values)))
+
+        self.misses += 1
+        row = db.session.get(self.model, id)
+        if row is None:
+            return None
+        values = self._values(row)
+        try:
+            self.backend.set(key, values, self.ttl)
+        except Exception:
+            logger.exception(f'{self.model.__name__} cache write failed')
+            self.errors += 1
+        return Snapshot(self.model, values)
+
+    def _values(self, row):
+        return {column.key: getattr(row, column.key) for column in self.model.__table__.columns}
+
+    def invalidate(self, id):
+        try:
+            self.backend.delete(self._key(id))
+        except Exception:
+            logger.exception(f'{self.model.__name__} cache invalidation failed')
+            self.errors += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl_seconds': self.ttl,
+            'entries': self.backend.size(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.backend.evictions,
+            'errors': self.errors
+        }
+
+
+# Process-wide caches, initialized by create_app
+hospital_cache = EntityCache(Hospital, DEFAULT_HOSPITAL_TTL_SECONDS)
+blood_request_cache = EntityCache(BloodRequest, DEFAULT_BLOOD_REQUEST_TTL_SECONDS)
+
+
+def init_app(app):
+    # Both caches share one backend (and one Redis connection pool)
+    backend = create_backend(app.config)
+    hospital_cache.init_app(app, backend)
+    blood_request_cache.init_app(app, backend)
+
+
+def cache_stats():
+    return {
+        'hospital': hospital_cache.stats(),
+        'blood_request': blood_request_cache.stats()
+    }
@@ -0,0 +1,85 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; ranking falls back to pure Python
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Grid cell size in degrees (~11 km at the equator)
+CELL_DEGREES = 0.1
+
+
+def parse_location(location):
+    """Parse a free-text 'lat,lng' GPS string; returns (lat, lng) or (None, None)"""
+    if not location:
+        return None, None
+    parts = location.replace(';', ',').split(',')
+    if len(parts) != 2:
+        return None, None
+    try:
+        lat, lng = float(parts[0].strip()), float(parts[1].strip())
+    except ValueError:
+        return None, None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None, None
+    return lat, lng
+
+
+def cell_of(lat, lng):
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lng / CELL_DEGREES))
+
+
+def ring_cells(center, radius):
+    """Grid cells at exactly `radius` steps (Chebyshev distance) from center"""
+    cx, cy = center
+    if radius == 0:
+        yield center
+        return
+    for dx in range(-radius, radius + 1):
+        yield cx + dx, cy - radius
+        yield cx + dx, cy + radius
+    for dy in range(-radius + 1, radius):
+        yield cx - radius, cy + dy
+        yield cx + radius, cy + dy
+
+
+def ring_reach_km(lat, radius):
+    """Distance every point within `radius` rings is guaranteed to cover"""
+    return radius * CELL_DEGREES * KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+
+
+def rings_to_cover(lat, km):
+    """Number of rings around a cell at `lat` needed to cover every point within `km`"""
+    return int(math.ceil(km / ring_reach_km(lat, 1)))
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distances from (lat, lng) to every point in lats/lngs"""
+    if np is not None:
+        lat1, lng1 = np.radians(lat), np.radians(lng)
+        lat2, lng2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lngs, dtype=float))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    distances = []
+    for other_lat, other_lng in zip(lats, lngs):
+        lat2, lng2 = math.radians(other_lat), math.radians(other_lng)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)))
+    return distances
+
+
+def smallest(values, k):
+    """Indices of the k smallest values in ascending order"""
+    if np is not None:
+        values = np.asarray(values)
+        if k < len(values):
+            candidates = np.argpartition(values, k - 1)[:k]
+        else:
+            candidates = np.arange(len(values))
+        return candidates[np.argsort(values[candidates], kind='stable')].tolist()
+    return sorted(range(len(values)), key=lambda i: values[i])[:k]
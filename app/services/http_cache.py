@@ -0,0 +1,191 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from app.extensions import db
+from app.models.table_version_model import TableVersion
+from app.services.entity_cache import LRUBackend
+
+# Tables whose writes bump a version (the ones behind conditional GET endpoints)
+TRACKED_TABLES = ('hospital', 'donor', 'blood_request', 'donation_record')
+
+# Defaults, overridable through the HTTP_RESPONSE_CACHE_* config values
+DEFAULT_RESPONSE_CACHE_ENTRIES = 256
+DEFAULT_RESPONSE_CACHE_TTL_SECONDS = 300
+
+
+def _changed_tables(session):
+    return session.info.setdefault('changed_tables', set())
+
+
+def _after_flush(session, flush_context):
+    changed = _changed_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None and table.name in TRACKED_TABLES:
+            changed.add(table.name)
+
+
+def _do_orm_execute(state):
+    # Bulk INSERT/UPDATE/DELETE statements bypass the unit of work
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    table = getattr(state.statement, 'table', None)
+    name = getattr(table, 'name', None)
+    if name in TRACKED_TABLES:
+        _changed_tables(state.session).add(name)
+
+
+def _before_commit(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()  # Record pending changes now; the commit's own flush comes after this hook
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        bump_versions(session, changed)
+
+
+def _after_rollback(session):
+    session.info.pop('changed_tables', None)
+
+
+def bump_versions(session, tables):
+    """Increment the version of each table inside the session's current transaction"""
+    now = datetime.utcnow()
+    connection = session.connection()
+    table = TableVersion.__table__
+    for name in sorted(tables):  # Fixed order so concurrent commits lock rows alike
+        result = connection.execute(
+            table.update().where(table.c.table_name == name).values(version=table.c.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            connection.execute(table.insert().values(table_name=name, version=1, updated_at=now))
+
+
+def register_session_events(session):
+    if not event.contains(session, 'before_commit', _before_commit):
+        event.listen(session, 'after_flush', _after_flush)
+        event.listen(session, 'do_orm_execute', _do_orm_execute)
+        event.listen(session, 'before_commit', _before_commit)
+        event.listen(session, 'after_rollback', _after_rollback)
+
+
+def current_versions(tables):
+    """(versions, last_modified) for the given tables, read with one query"""
+    rows = {
+        row.table_name: row for row in
+        db.session.query(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .filter(TableVersion.table_name.in_(tables)).all()
+    }
+    versions = tuple(rows[name].version if name in rows else 0 for name in tables)
+    updated = [rows[name].updated_at for name in tables if name in rows]
+    return versions, max(updated) if updated else None
+
+
+class ResponseCache:
+    """Optional server-side cache of rendered GET responses.
+
+    Entries remember the ETag they were rendered for; once a write bumps one
+    of the versions the ETag changes, so stale entries are never served.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = DEFAULT_RESPONSE_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend = LRUBackend(app.config.get('HTTP_RESPONSE_CACHE_ENTRIES', DEFAULT_RESPONSE_CACHE_ENTRIES))
+        self.ttl = app.config.get('HTTP_RESPONSE_CACHE_TTL_SECONDS', DEFAULT_RESPONSE_CACHE_TTL_SECONDS)
+
+    def get(self, key, etag):
+        entry = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if entry is not None and entry[0] == etag:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        return None
+
+    def set(self, key, etag, response):
+        if self.backend:
+            headers = [(name, value) for name, value in response.headers if name.lower() != 'content-length']
+            self.backend.set(key, (etag, response.status_code, headers, response.get_data()), self.ttl)
+
+    def stats(self):
+        return {
+            'entries': self.backend.size() if self.backend else 0,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+response_cache = ResponseCache()
+
+
+def _make_etag(versions):
+    path = hashlib.sha1(request.full_path.encode()).hexdigest()[:12]
+    return '-'.join(str(version) for version in versions) + f'-{path}'
+
+
+def _not_modified_since(last_modified):
+    since = request.if_modified_since
+    if since is None or last_modified is None:
+        return False
+    # Last-Modified has one-second granularity: only trust it once that second is over
+    if datetime.utcnow() - last_modified < timedelta(seconds=1):
+        return False
+    return last_modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+
+
+def conditional(*tables):
+    """Add ETag/Last-Modified to a GET view and answer 304 when nothing changed.
+
+    The ETag combines the versions of ``tables`` (one small query) with the
+    request path and query string. With HTTP_RESPONSE_CACHE_ENABLED the rendered
+    response is also kept in memory and replayed while the versions stay the same.
+    NDJSON streams are passed through untouched. Views must render from the
+    database, not from a per-process cache such as entity_cache: another worker's
+    write changes the ETag without refreshing this process's snapshot.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('HTTP_CACHE_ENABLED', True) or request.args.get('format') == 'ndjson':
+                return view(*args, **kwargs)
+
+            versions, last_modified = current_versions(tables)
+            etag = _make_etag(versions)
+            if request.if_none_match.contains_weak(etag) or (
+                not request.if_none_match and _not_modified_since(last_modified)
+            ):
+                response = make_response('', 304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            use_cache = current_app.config.get('HTTP_RESPONSE_CACHE_ENABLED', False)
+            if use_cache:
+                cached = response_cache.get(request.full_path, etag)
+                if cached is not None:
+                    _, status, headers, body = cached
+                    return current_app.response_class(body, status=status, headers=headers)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                if last_modified is not None:
+                    response.last_modified = last_modified.replace(microsecond=0)
+                response.headers['Cache-Control'] = 'no-cache'  # Clients revalidate on every poll
+                if use_cache:
+                    response_cache.set(request.full_path, etag, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    register_session_events(db.session)
+    response_cache.init_app(app)
@@ -0,0 +1,197 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, true
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.job_state_model import JobState
+from app.services.batch_matching import match_and_queue
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'incremental_match'
+
+# Defaults, overridable through the INCREMENTAL_MATCH_* config values
+DEFAULT_BATCH_SIZE = 500  # Requests matched (and committed) per step
+DEFAULT_MAX_BATCHES = 20  # Steps per run; the rest is picked up on the next run
+DEFAULT_LEASE_SECONDS = 120
+# Only requests changed at least this long ago are scanned, so a transaction that
+# commits a slightly older updated_at is not skipped by the watermark
+DEFAULT_SETTLE_SECONDS = 5
+
+# Requests that batch matching works on (as in POST /batch-match)
+MATCHABLE_STATUSES = ('Pending',)
+
+# Identifies this process as the lease holder
+OWNER = f'{socket.gethostname()}:{os.getpid()}'
+
+
+class MatcherStats:
+    """In-process counters for the runs executed by this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.skipped = 0  # Another worker held the lease
+        self.failures = 0
+        self.requests_processed = 0
+        self.matches_created = 0
+        self.last_duration_seconds = None
+        self.last_backlog = None
+
+    def record(self, duration, processed, created, backlog):
+        with self._lock:
+            self.runs += 1
+            self.requests_processed += processed
+            self.matches_created += created
+            self.last_duration_seconds = round(duration, 4)
+            self.last_backlog = backlog
+
+    def to_dict(self):
+        return {
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'failures': self.failures,
+            'requests_processed': self.requests_processed,
+            'matches_created': self.matches_created,
+            'last_duration_seconds': self.last_duration_seconds,
+            'last_backlog': self.last_backlog
+        }
+
+
+stats = MatcherStats()
+
+
+def acquire_lease(now, lease_seconds, owner=OWNER):
+    """Take (or renew) the job lease with one conditional UPDATE; returns True if held"""
+    table = JobState.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.name == JOB_NAME)
+        .where(or_(table.c.locked_until.is_(None), table.c.locked_until < now, table.c.locked_by == owner))
+        .values(locked_by=owner, locked_until=now + timedelta(seconds=lease_seconds))
+    )
+    if not result.rowcount:
+        if db.session.get(JobState, JOB_NAME) is not None:
+            db.session.rollback()
+            return False
+        # First run anywhere: create the row holding the lease
+        db.session.add(JobState(name=JOB_NAME, locked_by=owner,
+                                locked_until=now + timedelta(seconds=lease_seconds)))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # Another worker created it first
+        return False
+    return True
+
+
+def release_lease(duration, error=None, owner=OWNER):
+    table = JobState.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.name == JOB_NAME, table.c.locked_by == owner)
+        .values(locked_by=None, locked_until=None, last_run_at=datetime.utcnow(),
+                last_duration_seconds=round(duration, 4), last_error=error[:255] if error else None)
+    )
+    db.session.commit()
+
+
+def _after_watermark(state):
+    if state.watermark_at is None:
+        return true()
+    return or_(
+        BloodRequest.updated_at > state.watermark_at,
+        and_(BloodRequest.updated_at == state.watermark_at, BloodRequest.id > state.watermark_id)
+    )
+
+
+def changed_requests(state, cutoff, limit):
+    """Requests changed since the watermark (and before cutoff), oldest change first"""
+    return (
+        BloodRequest.query
+        .filter(_after_watermark(state), BloodRequest.updated_at <= cutoff)
+        .order_by(BloodRequest.updated_at, BloodRequest.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def backlog(state):
+    """Number of changed requests still behind the watermark"""
+    return db.session.query(func.count(BloodRequest.id)).filter(_after_watermark(state)).scalar()
+
+
+def run_incremental_match(batch_size=DEFAULT_BATCH_SIZE, max_batches=DEFAULT_MAX_BATCHES,
+                          lease_seconds=DEFAULT_LEASE_SECONDS, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """Match the blood requests created or changed since the last run.
+
+    Runs only while this process holds the job lease. Each step reads the next
+    batch after the (updated_at, id) watermark, creates the missing matches and
+    queues their SMS, and commits them together with the advanced watermark, so
+    a crash never loses or repeats a step. Returns a summary dict, or None when
+    another worker holds the lease.
+    """
+    started = time.perf_counter()
+    if not acquire_lease(datetime.utcnow(), lease_seconds):
+        stats.skipped += 1
+        return None
+
+    processed = created = 0
+    try:
+        for _ in range(max_batches):
+            state = db.session.get(JobState, JOB_NAME)
+            cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+            changed = changed_requests(state, cutoff, batch_size)
+            if not changed:
+                break
+
+            matchable = [r for r in changed if r.status in MATCHABLE_STATUSES]
+            batch_created = match_and_queue(matchable)['matches_created'] if matchable else 0
+            # Advance the watermark and renew the lease, unless another worker took it over
+            table = JobState.__table__
+            advanced = db.session.execute(
+                table.update()
+                .where(table.c.name == JOB_NAME, table.c.locked_by == OWNER)
+                .values(watermark_at=changed[-1].updated_at, watermark_id=changed[-1].id,
+                        locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+            ).rowcount
+            if not advanced:
+                db.session.rollback()
+                logger.warning('Incremental matcher lost its lease; leaving the batch to the new holder')
+                break
+            db.session.commit()
+            processed += len(matchable)
+            created += batch_created
+            if len(changed) < batch_size:
+                break
+
+        remaining = backlog(db.session.get(JobState, JOB_NAME))
+    except Exception as e:
+        db.session.rollback()
+        stats.failures += 1
+        release_lease(time.perf_counter() - started, error=str(e))
+        raise
+
+    duration = time.perf_counter() - started
+    release_lease(duration)
+    stats.record(duration, processed, created, remaining)
+    return {
+        'requests_processed': processed,
+        'matches_created': created,
+        'backlog': remaining,
+        'duration_seconds': round(duration, 4)
+    }
+
+
+def job_status():
+    state = db.session.get(JobState, JOB_NAME)
+    return {
+        'state': state.to_dict() if state else None,
+        'backlog': backlog(state) if state else db.session.query(func.count(BloodRequest.id)).scalar(),
+        'worker': dict(stats.to_dict(), owner=OWNER)
+    }
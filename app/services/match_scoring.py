@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, func
+from app.extensions import db
+from app.models.donation_record_model import DonationRecord
+from app.models.donor_match_model import DonorMatch
+from app.models.notification_model import Notification
+from app.services.geo import haversine_km, np, smallest
+
+# Relative weight of each ranking signal
+DEFAULT_WEIGHTS = {
+    'exact_type': 1.0,  # Prefer exact blood type, keeping universal O- donors for when they are needed
+    'distance': 2.0,  # Closer donors can get to the hospital sooner
+    'rested': 0.5,  # Longer since the last donation
+    'acceptance': 2.0,  # Share of past matches the donor accepted
+    'load': 1.0  # Fewer SMS received recently
+}
+
+# Distance (km) at which the distance score halves
+DISTANCE_HALF_KM = 10.0
+# Window for counting the SMS a donor received recently
+RECENT_NOTIFICATION_DAYS = 7
+# Only the best SHORTLIST_FACTOR * top_n donors on the cheap signals get history lookups
+SHORTLIST_FACTOR = 5
+MIN_SHORTLIST = 200
+QUERY_CHUNK_SIZE = 1000
+
+ACCEPTED_STATUSES = ('Accepted', 'Completed')
+RESPONDED_STATUSES = ('Accepted', 'Completed', 'Rejected', 'Declined')
+
+
+def _array(values):
+    return np.asarray(values, dtype=float) if np is not None else list(values)
+
+
+def _negate(values):
+    return -values if np is not None else [-value for value in values]
+
+
+def _take(values, indices):
+    return values[indices] if np is not None else [values[i] for i in indices]
+
+
+def _weighted_sum(signals, weights):
+    names = list(signals)
+    if np is not None:
+        return sum(weights.get(name, 0.0) * signals[name] for name in names)
+    size = len(signals[names[0]]) if names else 0
+    return [sum(weights.get(name, 0.0) * signals[name][i] for name in names) for i in range(size)]
+
+
+def _chunked_group_query(query_for_chunk, donor_ids):
+    results = {}
+    for start in range(0, len(donor_ids), QUERY_CHUNK_SIZE):
+        for row in query_for_chunk(donor_ids[start:start + QUERY_CHUNK_SIZE]):
+            results[row[0]] = row[1:]
+    return results
+
+
+def load_history(donor_ids, now):
+    """Fetch last donation, match acceptance and recent SMS counts for the donors in grouped queries"""
+    last_donations = _chunked_group_query(lambda ids: db.session.query(
+        DonationRecord.donor_id, func.max(DonationRecord.donated_at)
+    ).filter(DonationRecord.donor_id.in_(ids)).group_by(DonationRecord.donor_id).all(), donor_ids)
+
+    responses = _chunked_group_query(lambda ids: db.session.query(
+        DonorMatch.donor_id,
+        func.sum(case((DonorMatch.status.in_(ACCEPTED_STATUSES), 1), else_=0)),
+        func.sum(case((DonorMatch.status.in_(RESPONDED_STATUSES), 1), else_=0))
+    ).filter(DonorMatch.donor_id.in_(ids)).group_by(DonorMatch.donor_id).all(), donor_ids)
+
+    since = now - timedelta(days=RECENT_NOTIFICATION_DAYS)
+    recent_load = _chunked_group_query(lambda ids: db.session.query(
+        Notification.donor_id, func.count(Notification.id)
+    ).filter(Notification.donor_id.in_(ids), Notification.sent_at >= since).group_by(Notification.donor_id).all(), donor_ids)
+
+    return last_donations, responses, recent_load
+
+
+def _cheap_signals(blood_request, donors, lat, lng):
+    exact = _array([1.0 if d['blood_type'] == blood_request.blood_type else 0.0 for d in donors])
+    if lat is None:
+        distance = _array([0.5] * len(donors))
+    else:
+        located = [d['latitude'] is not None and d['longitude'] is not None for d in donors]
+        km = haversine_km(lat, lng, [d['latitude'] if ok else lat for d, ok in zip(donors, located)],
+                          [d['longitude'] if ok else lng for d, ok in zip(donors, located)])
+        distance = _array([1.0 / (1.0 + k / DISTANCE_HALF_KM) if ok else 0.5 for k, ok in zip(km, located)])
+    return {'exact_type': exact, 'distance': distance}
+
+
+def rank_donors(blood_request, donors, top_n=10, lat=None, lng=None, weights=None, now=None):
+    """Rank candidate donors for a request and return the best top_n with their score.
+
+    Stage one scores every candidate on the signals held in memory (blood type
+    match and distance); stage two loads donation, acceptance and notification
+    history for a shortlist only and computes the final weighted score. All
+    scoring is done on whole arrays at once.
+    """
+    if not donors:
+        return []
+    weights = weights or DEFAULT_WEIGHTS
+    now = now or datetime.utcnow()
+
+    cheap = _cheap_signals(blood_request, donors, lat, lng)
+    shortlist_size = max(top_n * SHORTLIST_FACTOR, MIN_SHORTLIST)
+    if len(donors) > shortlist_size:
+        cheap_scores = _weighted_sum(cheap, weights)
+        keep = smallest(_negate(cheap_scores), shortlist_size)
+        donors = [donors[i] for i in keep]
+        cheap = {name: _take(values, keep) for name, values in cheap.items()}
+
+    donor_ids = [d['id'] for d in donors]
+    last_donations, responses, recent_load = load_history(donor_ids, now)
+
+    rested, acceptance, load = [], [], []
+    for donor_id in donor_ids:
+        last = last_donations.get(donor_id)
+        rested.append(min((now - last[0]).days / 365.0, 1.0) if last and last[0] else 0.5)
+        accepted, responded = responses.get(donor_id, (0, 0))
+        acceptance.append(((accepted or 0) + 1.0) / ((responded or 0) + 2.0))  # Laplace-smoothed rate
+        load.append(1.0 / (1.0 + (recent_load.get(donor_id, (0,))[0] or 0)))
+
+    signals = dict(cheap, rested=_array(rested), acceptance=_array(acceptance), load=_array(load))
+    scores = _weighted_sum(signals, weights)
+    ranked = []
+    for i in smallest(_negate(scores), top_n):
+        donor = dict(donors[i])
+        donor['score'] = round(float(scores[i]), 4)
+        ranked.append(donor)
+    return ranked
@@ -0,0 +1,91 @@
+from datetime import datetime
+from app.extensions import db
+from app.models.donor_match_model import DonorMatch
+from app.services import notification_service
+from app.services.donor_index import donor_index
+from app.services.entity_cache import hospital_cache
+from app.services.match_scoring import rank_donors
+
+# Match statuses that mean the donor turned the request down
+DECLINED_STATUSES = ('Declined', 'Rejected')
+
+
+def create_match(blood_request, donor_id, donor_name, status='Pending'):
+    """Create a match and queue the donor's SMS in the same transaction.
+
+    The caller commits and then calls notification_service.dispatch(); the
+    outbox marks the match 'Notified' once the gateway accepts the message.
+    """
+    match = DonorMatch(
+        request_id=blood_request.id,
+        donor_id=donor_id,
+        status=status,
+        notified_at=datetime.utcnow()
+    )
+    db.session.add(match)
+    notification_service.queue_match_notification(donor_id, donor_name, blood_request)
+    return match
+
+
+def request_coordinates(blood_request):
+    """Coordinates to search around: the hospital's, else the request's own location"""
+    hospital = hospital_cache.get(blood_request.hospital_id)
+    if hospital and hospital.latitude is not None:
+        return hospital.latitude, hospital.longitude
+    return blood_request.latitude, blood_request.longitude
+
+
+def rank_candidates(blood_request, candidates, top_n):
+    """Best top_n candidate donors for a request, scored against its location"""
+    lat, lng = request_coordinates(blood_request)
+    return rank_donors(blood_request, candidates, top_n=top_n, lat=lat, lng=lng)
+
+
+def find_replacement(blood_request, exclude_ids):
+    """Return the best-ranked remaining candidate donor for a request, or None"""
+    candidates = donor_index.candidates(blood_request.blood_type, exclude_ids=exclude_ids)
+    ranked = rank_candidates(blood_request, candidates, 1)
+    return ranked[0] if ranked else None
+
+
+def apply_status_change(match, donor, blood_request, new_status):
+    """Queue the notifications and follow-up work for a match status change.
+
+    Returns the replacement match created after a decline, if any. The caller commits.
+    """
+    from app.services import wave_notifier  # Imports this module for ranking
+    replacement = None
+    in_waves = blood_request.notify_mode == wave_notifier.NOTIFY_WAVES
+
+    if new_status == 'Accepted':
+        notification_service.queue_requester_notification(
+            blood_request, notification_service.REQUESTER_MESSAGES['Accepted'],
+            notification_service.requester_template('Accepted')
+        )
+        blood_request.status = 'Matched'
+        if in_waves and wave_notifier.is_filled(blood_request):
+            wave_notifier.stop_waves(blood_request)  # Enough donors accepted
+
+    elif new_status in DECLINED_STATUSES and in_waves:
+        # The next wave replaces decliners; send it early if too few donors are left to answer
+        wave_notifier.expedite(blood_request)
+
+    elif new_status in DECLINED_STATUSES:
+        # Try to find another match for this request
+        already_matched = {m.donor_id for m in blood_request.matches}
+        new_donor = find_replacement(blood_request, already_matched | {donor.id})
+        if new_donor:
+            replacement = create_match(blood_request, new_donor['id'], new_donor['name'])
+
+    elif new_status == 'Completed':
+        notification_service.queue_requester_notification(
+            blood_request, notification_service.REQUESTER_MESSAGES['Completed'],
+            notification_service.requester_template('Completed')
+        )
+        blood_request.status = 'Completed'
+
+    notification_service.queue_notification(
+        donor.id, blood_request.id, notification_service.status_message(new_status),
+        template=notification_service.status_template(new_status)
+    )
+    return replacement
@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the NOTIFICATION_* config values
+DEFAULT_DEDUPE_SECONDS = 86400  # Same (donor, request, template) at most once a day
+DEFAULT_DONOR_MAX = 3  # SMS per donor per donor window
+DEFAULT_DONOR_WINDOW_SECONDS = 3600
+DEFAULT_GLOBAL_MAX = 6000  # SMS per global window, below the provider's throttling threshold
+DEFAULT_GLOBAL_WINDOW_SECONDS = 60
+DEFAULT_KEY_PREFIX = 'reachout:gate'
+
+ADMIT = 'admit'
+DUPLICATE = 'duplicate'
+THROTTLED = 'throttled'
+
+
+def dedupe_key(notification):
+    """(donor, request, template); messages without a template are keyed by their text"""
+    template = notification.template or 'text:' + hashlib.sha1(notification.message.encode()).hexdigest()[:16]
+    return f'{notification.donor_id}:{notification.request_id}:{template}'
+
+
+def _bucket(now, window):
+    """(current bucket index, weight of the previous bucket) for a two-bucket sliding window"""
+    index = int(now // window)
+    return index, 1.0 - (now % window) / window
+
+
+class MemoryGateStore:
+    """Per-process store: a TTL map for dedupe keys and two-bucket sliding-window counters.
+
+    Every dedupe key gets the same TTL, so keys expire in insertion order and are
+    pruned from the front of an OrderedDict. Each counter keeps only its current
+    and previous fixed-window counts (O(1) memory per donor); the sliding count is
+    the current bucket plus the previous one weighted by how much of it still
+    overlaps the window.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dedupe = OrderedDict()  # key -> (expires_at, owner)
+        self._counters = {}  # (window, key) -> [bucket index, current, previous]
+        self._last_prune = 0.0
+
+    def claim_dedupe(self, entries, ttl, now):
+        """Reserve [(key, owner)]; True where the key was free or already held by owner"""
+        results = []
+        with self._lock:
+            while self._dedupe:
+                key, (expires_at, _) = next(iter(self._dedupe.items()))
+                if expires_at > now:
+                    break
+                del self._dedupe[key]
+            for key, owner in entries:
+                held = self._dedupe.get(key)
+                if held is not None and held[1] != owner:
+                    results.append(False)
+                    continue
+                if held is None:
+                    self._dedupe[key] = (now + ttl, owner)
+                results.append(True)
+        return results
+
+    def release_dedupe(self, entries):
+        with self._lock:
+            for key, owner in entries:
+                held = self._dedupe.get(key)
+                if held is not None and held[1] == owner:
+                    del self._dedupe[key]
+
+    def _roll(self, counter, index):
+        if counter[0] == index - 1:
+            counter[:] = [index, 0, counter[1]]
+        elif counter[0] != index:
+            counter[:] = [index, 0, 0]
+
+    def window_counts(self, keys, window, now):
+        index, weight = _bucket(now, window)
+        counts = []
+        with self._lock:
+            for key in keys:
+                counter = self._counters.get((window, key))
+                if counter is None:
+                    counts.append(0.0)
+                    continue
+                self._roll(counter, index)
+                counts.append(counter[1] + counter[2] * weight)
+        return counts
+
+    def window_add(self, amounts, window, now):
+        """Add {key: amount} to the current bucket"""
+        index, _ = _bucket(now, window)
+        with self._lock:
+            for key, amount in amounts.items():
+                counter = self._counters.setdefault((window, key), [index, 0, 0])
+                self._roll(counter, index)
+                counter[1] += amount
+            if now - self._last_prune > window:
+                self._prune(now)
+
+    def _prune(self, now):
+        # Counters whose both buckets are older than the window count for nothing
+        self._counters = {
+            (window, key): counter for (window, key), counter in self._counters.items()
+            if counter[0] >= int(now // window) - 1
+        }
+        self._last_prune = now
+
+    def size(self):
+        return {'dedupe_keys': len(self._dedupe), 'counters': len(self._counters)}
+
+
+class RedisGateStore:
+    """Store shared by every worker process; requires the redis package.
+
+    The same structures as MemoryGateStore, as Redis keys with expiries. Every
+    call is one pipelined round trip. Checking and adding are separate steps, so
+    concurrent workers can overshoot a cap by a few messages.
+    """
+
+    def __init__(self, url, prefix=DEFAULT_KEY_PREFIX):
+        import redis  # Optional dependency, only needed for the shared store
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def claim_dedupe(self, entries, ttl, now):
+        pipe = self.client.pipeline()
+        for key, owner in entries:
+            pipe.set(f'{self.prefix}:dedupe:{key}', owner, nx=True, ex=int(ttl))
+            pipe.get(f'{self.prefix}:dedupe:{key}')
+        replies = pipe.execute()
+        return [bool(replies[2 * i]) or replies[2 * i + 1] == str(owner).encode()
+                for i, (_, owner) in enumerate(entries)]
+
+    def release_dedupe(self, entries):
+        # Unlike the memory store this does not check the owner; callers only release their own keys
+        if entries:
+            self.client.delete(*(f'{self.prefix}:dedupe:{key}' for key, _ in entries))
+
+    def window_counts(self, keys, window, now):
+        index, weight = _bucket(now, window)
+        names = []
+        for key in keys:
+            names += [f'{self.prefix}:rate:{window}:{key}:{index}', f'{self.prefix}:rate:{window}:{key}:{index - 1}']
+        values = self.client.mget(names) if names else []
+        return [int(values[2 * i] or 0) + int(values[2 * i + 1] or 0) * weight for i in range(len(keys))]
+
+    def window_add(self, amounts, window, now):
+        index, _ = _bucket(now, window)
+        pipe = self.client.pipeline()
+        for key, amount in amounts.items():
+            name = f'{self.prefix}:rate:{window}:{key}:{index}'
+            pipe.incrby(name, amount)
+            pipe.expire(name, int(window * 2))
+        pipe.execute()
+
+    def size(self):
+        return None
+
+
+def create_store(config):
+    """Build the store selected by NOTIFICATION_GATE_BACKEND ('memory' or 'redis')"""
+    if config.get('NOTIFICATION_GATE_BACKEND', 'memory') == 'redis':
+        return RedisGateStore(config['NOTIFICATION_GATE_URL'],
+                              config.get('NOTIFICATION_GATE_KEY_PREFIX', DEFAULT_KEY_PREFIX))
+    return MemoryGateStore()
+
+
+class NotificationGate:
+    """Decides, just before sending, which claimed notifications may go out.
+
+    - duplicate: the donor already got this template for this request within
+      NOTIFICATION_DEDUPE_SECONDS (the outbox suppresses it)
+    - throttled: the donor's or the global sliding-window cap is reached (the
+      outbox defers it by the returned number of seconds)
+    - admit: counted against both caps and sent
+
+    A notification keeps its dedupe reservation across retries. When the outbox
+    gives up on it, forget() releases the reservation.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.store = MemoryGateStore()
+        self.dedupe_seconds = DEFAULT_DEDUPE_SECONDS
+        self.donor_max = DEFAULT_DONOR_MAX
+        self.donor_window = DEFAULT_DONOR_WINDOW_SECONDS
+        self.global_max = DEFAULT_GLOBAL_MAX
+        self.global_window = DEFAULT_GLOBAL_WINDOW_SECONDS
+        self.admitted = 0
+        self.suppressed = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config.get('NOTIFICATION_GATE_ENABLED', True)
+        self.store = create_store(config)
+        self.dedupe_seconds = config.get('NOTIFICATION_DEDUPE_SECONDS', DEFAULT_DEDUPE_SECONDS)
+        self.donor_max = config.get('NOTIFICATION_DONOR_MAX', DEFAULT_DONOR_MAX)
+        self.donor_window = config.get('NOTIFICATION_DONOR_WINDOW_SECONDS', DEFAULT_DONOR_WINDOW_SECONDS)
+        self.global_max = config.get('NOTIFICATION_GLOBAL_MAX', DEFAULT_GLOBAL_MAX)
+        self.global_window = config.get('NOTIFICATION_GLOBAL_WINDOW_SECONDS', DEFAULT_GLOBAL_WINDOW_SECONDS)
+
+    def admit_many(self, notifications, now=None):
+        """{notification id: (decision, retry_after_seconds)} for a claimed batch, in batch order"""
+        if not self.enabled or not notifications:
+            return {n.id: (ADMIT, 0) for n in notifications}
+        now = time.time() if now is None else now
+        try:
+            return self._decide(notifications, now)
+        except Exception:
+            # A store outage must not stop emergency SMS; send without the gate
+            logger.exception('Notification gate unavailable; sending without it')
+            self.errors += 1
+            return {n.id: (ADMIT, 0) for n in notifications}
+
+    def _decide(self, notifications, now):
+        decisions = {}
+        entries = [(dedupe_key(n), n.id) for n in notifications]
+        free = self.store.claim_dedupe(entries, self.dedupe_seconds, now)
+
+        candidates = []
+        for notification, entry, is_free in zip(notifications, entries, free):
+            if is_free:
+                candidates.append((notification, entry))
+            else:
+                decisions[notification.id] = (DUPLICATE, 0)
+
+        donor_keys = sorted({f'donor:{n.donor_id}' for n, _ in candidates})
+        donor_counts = dict(zip(donor_keys, self.store.window_counts(donor_keys, self.donor_window, now)))
+        global_count = self.store.window_counts(['global'], self.global_window, now)[0]
+
+        added = {}
+        released = []
+        for notification, entry in candidates:
+            key = f'donor:{notification.donor_id}'
+            if donor_counts[key] + added.get(key, 0) >= self.donor_max:
+                decisions[notification.id] = (THROTTLED, self.donor_window - now % self.donor_window)
+                released.append(entry)
+            elif global_count + sum(added.values()) >= self.global_max:
+                decisions[notification.id] = (THROTTLED, self.global_window - now % self.global_window)
+                released.append(entry)
+            else:
+                decisions[notification.id] = (ADMIT, 0)
+                added[key] = added.get(key, 0) + 1
+
+        if added:
+            self.store.window_add(added, self.donor_window, now)
+            self.store.window_add({'global': sum(added.values())}, self.global_window, now)
+        self.store.release_dedupe(released)  # Deferred messages reserve again on their retry
+
+        self.admitted += sum(added.values())
+        self.suppressed += sum(1 for decision, _ in decisions.values() if decision == DUPLICATE)
+        self.throttled += len(released)
+        return decisions
+
+    def refund(self, notifications, now=None):
+        """Give back the quota of admitted notifications that were not sent after all (preempted)"""
+        if not self.enabled or not notifications:
+            return
+        now = time.time() if now is None else now
+        amounts = {}
+        for notification in notifications:
+            key = f'donor:{notification.donor_id}'
+            amounts[key] = amounts.get(key, 0) - 1
+        try:
+            self.store.window_add(amounts, self.donor_window, now)
+            self.store.window_add({'global': -len(notifications)}, self.global_window, now)
+        except Exception:
+            logger.exception('Notification gate unavailable')
+            self.errors += 1
+        self.admitted -= len(notifications)
+
+    def forget(self, notification):
+        """Release a notification's dedupe reservation (it will never be sent)"""
+        if not self.enabled:
+            return
+        try:
+            self.store.release_dedupe([(dedupe_key(notification), notification.id)])
+        except Exception:
+            logger.exception('Notification gate unavailable')
+            self.errors += 1
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'store': type(self.store).__name__,
+            'size': self.store.size(),
+            'admitted': self.admitted,
+            'suppressed_duplicates': self.suppressed,
+            'throttled': self.throttled,
+            'errors': self.errors
+        }
+
+
+# Process-wide gate, initialized by create_app
+notification_gate = NotificationGate()
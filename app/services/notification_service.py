@@ -0,0 +1,97 @@
+from app.services.priority import NORMAL, urgency_priority
+from app.services.sms_outbox import enqueue_bulk, enqueue_notification, sms_outbox
+
+# SMS templates shared by the match and notification controllers
+MATCH_MESSAGE = "Hello {name}, you have been matched with a blood request. " \
+                "Blood type needed: {blood_type}, " \
+                "Urgency: {urgency}. " \
+                "Please respond if you can donate."
+
+# Same text for every recipient so a fan-out can go out in multi-recipient gateway calls
+BROADCAST_MATCH_MESSAGE = "Hello, you have been matched with a blood request. " \
+                          "Blood type needed: {blood_type}, " \
+                          "Urgency: {urgency}. " \
+                          "Please respond if you can donate."
+
+NO_MATCH_MESSAGE = "We regret to inform you that no matching donors have been found yet for your " \
+                   "blood request (type {blood_type}). We will continue searching " \
+                   "and notify you when a match is found."
+
+STATUS_MESSAGES = {
+    'Accepted': "Thank you for accepting the blood donation request. "
+                "The blood bank will contact you with further details.",
+    'Declined': "You have declined the blood donation request. "
+                "Thank you for your consideration.",
+    'Rejected': "You have declined the blood donation request. "
+                "Thank you for your consideration.",
+    'Completed': "Thank you for your blood donation! "
+                 "Your generosity helps save lives."
+}
+
+REQUESTER_MESSAGES = {
+    'Accepted': "Good news! A donor has accepted to donate for your blood request. "
+                "The blood bank will contact you with further details.",
+    'Completed': "Good news! The blood donation for your request has been completed. "
+                 "Thank you for using our service."
+}
+
+
+# Templates (message kinds) for the notification gate's (donor, request, template) dedupe
+MATCH_TEMPLATE = 'match'
+NO_MATCH_TEMPLATE = 'no_match'
+
+
+def status_template(status):
+    return f'status:{status}'[:32]
+
+
+def requester_template(status):
+    return f'requester:{status}'[:32]
+
+
+def match_message(donor_name, blood_request):
+    """Build the SMS sent to a donor matched with a blood request"""
+    return MATCH_MESSAGE.format(
+        name=donor_name,
+        blood_type=blood_request.blood_type,
+        urgency=blood_request.urgency_level
+    )
+
+
+def status_message(status):
+    """Build the SMS sent to a donor when their match status changes"""
+    return STATUS_MESSAGES.get(status, f"Your blood donation match status has been updated to: {status}.")
+
+
+def queue_notification(donor_id, request_id, message, priority=NORMAL, template=None):
+    """Queue an SMS in the current transaction; call dispatch() after committing"""
+    return enqueue_notification(donor_id, request_id, message, priority, template)
+
+
+def queue_match_notification(donor_id, donor_name, blood_request):
+    return queue_notification(donor_id, blood_request.id, match_message(donor_name, blood_request),
+                              urgency_priority(blood_request.urgency_level), MATCH_TEMPLATE)
+
+
+def queue_broadcast(blood_request, donor_ids):
+    """Queue the shared match message for many donors at once; returns the number queued"""
+    message = BROADCAST_MATCH_MESSAGE.format(
+        blood_type=blood_request.blood_type,
+        urgency=blood_request.urgency_level
+    )
+    return enqueue_bulk(blood_request.id, donor_ids, message, urgency_priority(blood_request.urgency_level),
+                        MATCH_TEMPLATE)
+
+
+def queue_requester_notification(blood_request, message, template=None):
+    """Notify whoever raised the request, when the request records a requester"""
+    requester_id = getattr(blood_request, 'requester_id', None)
+    if requester_id is None:
+        return None
+    return queue_notification(requester_id, blood_request.id, message, urgency_priority(blood_request.urgency_level),
+                              template)
+
+
+def dispatch():
+    """Wake the outbox workers once queued notifications are committed"""
+    sms_outbox.wake()
@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+
+# Dispatch priority per urgency class; lower values are served first
+PRIORITY_CLASSES = ('critical', 'high', 'normal', 'low')
+CRITICAL, HIGH, NORMAL, LOW = range(len(PRIORITY_CLASSES))
+
+# urgency_level is free text; these spellings map onto the classes above and
+# anything else is treated as normal
+URGENCY_ALIASES = {
+    'critical': CRITICAL, 'emergency': CRITICAL, 'immediate': CRITICAL,
+    'high': HIGH, 'urgent': HIGH,
+    'medium': NORMAL, 'moderate': NORMAL, 'normal': NORMAL,
+    'low': LOW, 'routine': LOW,
+}
+
+# Delays kept per class for the percentiles
+DELAY_SAMPLES = 1000
+
+
+def urgency_priority(urgency_level):
+    """Dispatch priority for a blood request's urgency_level"""
+    return URGENCY_ALIASES.get((urgency_level or '').strip().lower(), NORMAL)
+
+
+def priority_class(priority):
+    return PRIORITY_CLASSES[min(max(priority, CRITICAL), LOW)]
+
+
+def order_requests(blood_requests):
+    """Most urgent first; within a class the oldest request first"""
+    return sorted(
+        blood_requests,
+        key=lambda r: (urgency_priority(r.urgency_level), r.created_at is None, r.created_at, r.id)
+    )
+
+
+class QueueDelayStats:
+    """Time between queueing a notification and handing it to the gateway, per urgency class"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classes = {name: self._empty() for name in PRIORITY_CLASSES}
+
+    @staticmethod
+    def _empty():
+        return {'count': 0, 'seconds': 0.0, 'max': 0.0, 'recent': deque(maxlen=DELAY_SAMPLES)}
+
+    def record(self, priority, seconds):
+        seconds = max(seconds, 0.0)
+        with self._lock:
+            stats = self._classes[priority_class(priority)]
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['recent'].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._classes = {name: self._empty() for name in PRIORITY_CLASSES}
+
+    def to_dict(self):
+        result = {}
+        with self._lock:
+            for name, stats in self._classes.items():
+                recent = sorted(stats['recent'])
+
+                def percentile(p):
+                    return round(recent[min(len(recent) - 1, int(p * len(recent)))], 4) if recent else None
+
+                result[name] = {
+                    'sent': stats['count'],
+                    'mean_seconds': round(stats['seconds'] / stats['count'], 4) if stats['count'] else None,
+                    'p50_seconds': percentile(0.5),
+                    'p95_seconds': percentile(0.95),
+                    'max_seconds': round(stats['max'], 4)
+                }
+        return result
+
+
+# Process-wide delay statistics, filled in by the SMS outbox
+queue_delay = QueueDelayStats()
@@ -0,0 +1,265 @@
+import logging
+import random
+import threading
+import time
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from app.extensions import db
+from app.services.db_pool import pool_status
+from app.services.priority import queue_delay
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the PROFILING_* config values
+DEFAULT_SLOW_MS = 500
+DEFAULT_SLOW_SAMPLE_RATE = 1.0  # Fraction of slow requests that are logged
+DEFAULT_MAX_STATEMENTS = 50  # SQL statements kept per request for the slow log
+STATEMENT_PREVIEW_CHARS = 500
+
+# Request duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointStats:
+    """Running totals for one endpoint"""
+
+    def __init__(self):
+        self.statuses = {}  # (method, status) -> count
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.sms_seconds = 0.0
+        self.sms_calls = 0
+
+    def add(self, method, status, profile, seconds):
+        key = (method, status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+        self.count += 1
+        self.seconds += seconds
+        self.db_seconds += profile['db_seconds']
+        self.queries += profile['queries']
+        self.rows += profile['rows']
+        self.sms_seconds += profile['sms_seconds']
+        self.sms_calls += profile['sms_calls']
+
+
+class TimedGateway:
+    """Wraps the SMS gateway so every send() is timed"""
+
+    def __init__(self, gateway, profiler):
+        self._gateway = gateway
+        self._profiler = profiler
+
+    def send(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._gateway.send(*args, **kwargs)
+        finally:
+            self._profiler.record_sms(time.perf_counter() - started)
+
+    def send_many(self, calls):
+        # Concurrent calls overlap, so the batch is recorded as one call's worth of wall time
+        started = time.perf_counter()
+        try:
+            return self._gateway.send_many(calls)
+        finally:
+            self._profiler.record_sms(time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._gateway, name)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class RequestProfiler:
+    """Opt-in per-request instrumentation (PROFILING_ENABLED).
+
+    Records wall time, DB time, query count, rows and SMS call time for every
+    request, aggregates them per endpoint for ``GET /metrics`` (Prometheus text
+    format) and logs a sample of slow requests together with their SQL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._sms_calls = 0
+        self._sms_seconds = 0.0
+
+    def init_app(self, app):
+        self.slow_seconds = app.config.get('PROFILING_SLOW_MS', DEFAULT_SLOW_MS) / 1000.0
+        self.sample_rate = app.config.get('PROFILING_SLOW_SAMPLE_RATE', DEFAULT_SLOW_SAMPLE_RATE)
+        self.max_statements = app.config.get('PROFILING_MAX_STATEMENTS', DEFAULT_MAX_STATEMENTS)
+        app.extensions['profiler'] = self
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+        with app.app_context():
+            engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.sms = TimedGateway(app.sms, self)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    # Request hooks
+
+    def _start(self):
+        g._profile = {
+            'started': time.perf_counter(),
+            'db_seconds': 0.0,
+            'queries': 0,
+            'rows': 0,
+            'sms_seconds': 0.0,
+            'sms_calls': 0,
+            'statements': [],
+            'recorded': False
+        }
+
+    def _finish(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown(self, error):
+        # after_request is skipped when a view raises, so record the failure here
+        if error is not None:
+            self._record(500)
+
+    def _record(self, status):
+        profile = g.get('_profile')
+        if profile is None or profile['recorded']:
+            return
+        profile['recorded'] = True
+        seconds = time.perf_counter() - profile['started']
+        endpoint = request.endpoint or '<unmatched>'
+        if endpoint == 'metrics':
+            return
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.add(request.method, status, profile, seconds)
+        if seconds >= self.slow_seconds and random.random() < self.sample_rate:
+            self._log_slow(endpoint, status, profile, seconds)
+
+    def _log_slow(self, endpoint, status, profile, seconds):
+        lines = [
+            f'Slow request {request.method} {request.full_path.rstrip("?")} ({endpoint}) -> {status}: '
+            f'{seconds * 1000:.1f} ms total, {profile["db_seconds"] * 1000:.1f} ms in {profile["queries"]} queries, '
+            f'{profile["rows"]} rows, {profile["sms_seconds"] * 1000:.1f} ms in {profile["sms_calls"]} SMS calls'
+        ]
+        for statement, elapsed in profile['statements']:
+            lines.append(f'  [{elapsed * 1000:.1f} ms] {statement}')
+        if profile['queries'] > len(profile['statements']):
+            lines.append(f'  ... {profile["queries"] - len(profile["statements"])} more statements')
+        logger.warning('\n'.join(lines))
+
+    # Engine and gateway hooks
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profile_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_profile_started'].pop()
+        # Only queries issued while serving a request are attributed (not outbox workers or jobs)
+        if not has_request_context():
+            return
+        profile = g.get('_profile')
+        if profile is None:
+            return
+        elapsed = time.perf_counter() - started
+        profile['db_seconds'] += elapsed
+        profile['queries'] += 1
+        if cursor.rowcount > 0:  # Drivers report -1 when the count is unknown
+            profile['rows'] += cursor.rowcount
+        if len(profile['statements']) < self.max_statements:
+            profile['statements'].append((' '.join(statement.split())[:STATEMENT_PREVIEW_CHARS], elapsed))
+
+    def record_sms(self, seconds):
+        with self._lock:
+            self._sms_calls += 1
+            self._sms_seconds += seconds
+        if has_request_context():
+            profile = g.get('_profile')
+            if profile is not None:
+                profile['sms_seconds'] += seconds
+                profile['sms_calls'] += 1
+
+    # Export
+
+    def metrics_view(self):
+        return Response(self.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    def render_metrics(self):
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+            family('reachout_http_requests_total', 'counter', 'Requests served, by endpoint, method and status')
+            for endpoint, stats in endpoints:
+                for (method, status), count in sorted(stats.statuses.items()):
+                    lines.append(f'reachout_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            family('reachout_http_request_duration_seconds', 'histogram', 'Wall time per request')
+            for endpoint, stats in endpoints:
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(f'reachout_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} {count}')
+                lines.append(f'reachout_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le="+Inf")} {stats.count}')
+                lines.append(f'reachout_http_request_duration_seconds_sum{_labels(endpoint=endpoint)} {stats.seconds:.6f}')
+                lines.append(f'reachout_http_request_duration_seconds_count{_labels(endpoint=endpoint)} {stats.count}')
+
+            for name, attribute, help_text in (
+                ('reachout_db_query_seconds_total', 'db_seconds', 'Time spent executing SQL while serving requests'),
+                ('reachout_db_queries_total', 'queries', 'SQL statements executed while serving requests'),
+                ('reachout_db_rows_total', 'rows', 'Rows reported by the driver for those statements'),
+                ('reachout_request_sms_seconds_total', 'sms_seconds', 'Time spent in SMS gateway calls made by requests'),
+                ('reachout_request_sms_calls_total', 'sms_calls', 'SMS gateway calls made by requests'),
+            ):
+                family(name, 'counter', help_text)
+                for endpoint, stats in endpoints:
+                    value = getattr(stats, attribute)
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{_labels(endpoint=endpoint)} {value}')
+
+            family('reachout_sms_calls_total', 'counter', 'SMS gateway calls from any source, including the outbox')
+            lines.append(f'reachout_sms_calls_total {self._sms_calls}')
+            family('reachout_sms_call_seconds_total', 'counter', 'Time spent in SMS gateway calls from any source')
+            lines.append(f'reachout_sms_call_seconds_total {self._sms_seconds:.6f}')
+
+        delays = queue_delay.to_dict()
+        for name, key, help_text in (
+            ('reachout_sms_queue_delay_seconds_mean', 'mean_seconds', 'Mean time from queueing to sending, by urgency class'),
+            ('reachout_sms_queue_delay_seconds_p95', 'p95_seconds', '95th percentile of recent queueing delays, by urgency class'),
+        ):
+            family(name, 'gauge', help_text)
+            for urgency, stats in delays.items():
+                if stats[key] is not None:
+                    lines.append(f'{name}{_labels(urgency=urgency)} {stats[key]}')
+
+        pool = pool_status(db.engine)
+        for key in ('size', 'checked_out', 'overflow', 'checkouts', 'timeouts', 'wait_ms_total'):
+            if key in pool:
+                name = f'reachout_db_pool_{key}'
+                family(name, 'counter' if key in ('checkouts', 'timeouts', 'wait_ms_total') else 'gauge', f'Connection pool {key.replace("_", " ")}')
+                lines.append(f'{name} {pool[key]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide profiler, initialized by create_app when PROFILING_ENABLED is set
+profiler = RequestProfiler()
@@ -0,0 +1,62 @@
+import threading
+import time
+import africastalking
+
+
+def to_msisdn(phone):
+    """Convert a local number to international format ('0771234567' -> '+256771234567')"""
+    phone = (phone or '').strip()
+    if phone.startswith('0'):
+        return f'+256{phone[1:]}'
+    return phone
+
+
+class FakeSmsGateway:
+    """Local stand-in for the Africa's Talking SMS service.
+
+    Mirrors the ``send(message, recipients)`` call and response shape of
+    ``africastalking.SMS`` with an optional injected latency, and records every
+    call so tests and benchmarks can inspect what would have been sent.
+    """
+
+    def __init__(self, latency=0.0, failing_numbers=()):
+        self.latency = latency
+        self.failing_numbers = set(failing_numbers)
+        self.sent = []
+        self._lock = threading.Lock()
+        self._message_seq = 0
+
+    def send(self, message, recipients, sender_id=None, enqueue=False):
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        with self._lock:
+            self.sent.append((message, list(recipients)))
+            for number in recipients:
+                self._message_seq += 1
+                failed = number in self.failing_numbers
+                results.append({
+                    'number': number,
+                    'status': 'Failed' if failed else 'Success',
+                    'statusCode': 403 if failed else 101,
+                    'messageId': 'None' if failed else f'FAKE{self._message_seq}',
+                    'cost': '0' if failed else 'UGX 0.0000'
+                })
+        return {'SMSMessageData': {'Message': f'Sent to {len(recipients)}', 'Recipients': results}}
+
+
+def create_gateway(config):
+    """Build the SMS gateway selected by the SMS_GATEWAY config value"""
+    name = config.get('SMS_GATEWAY', 'africastalking')
+    if name == 'fake':
+        return FakeSmsGateway(latency=config.get('SMS_FAKE_LATENCY', 0.0))
+    if name in ('africastalking_async', 'fake_async'):
+        from app.services.async_sms import create_async_gateway  # Imports this module
+        return create_async_gateway(config, fake=name == 'fake_async')
+
+    # Initialize Africa's Talking SDK
+    africastalking.initialize(
+        username=config['AFRICASTALKING_USERNAME'],
+        api_key=config['AFRICASTALKING_API_KEY']
+    )
+    return africastalking.SMS
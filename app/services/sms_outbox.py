@@ -0,0 +1,414 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import exists, select
+from sqlalchemy.pool import StaticPool
+from app.extensions import db
+from app.models.donor_model import Donor
+from app.models.donor_match_model import DonorMatch
+from app.models.notification_model import Notification
+from app.services import change_feed
+from app.services.notification_gate import DUPLICATE, THROTTLED, notification_gate
+from app.services.priority import CRITICAL, NORMAL, queue_delay
+from app.services.sms_gateway import to_msisdn
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the SMS_OUTBOX_* config values
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_RECIPIENTS = 1000  # Recipients per gateway call (provider limit)
+DEFAULT_RATE_PER_SECOND = 20.0  # Gateway calls per second
+DEFAULT_INSERT_CHUNK_SIZE = 1000
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 5.0
+DEFAULT_MAX_BACKOFF_SECONDS = 600.0
+DEFAULT_CLAIM_SECONDS = 120.0
+DEFAULT_POLL_SECONDS = 2.0
+
+
+def enqueue_notification(donor_id, request_id, message, priority=NORMAL, template=None):
+    """Add a queued notification to the session; the caller commits and wakes the outbox"""
+    now = datetime.utcnow()
+    notification = Notification(
+        donor_id=donor_id,
+        request_id=request_id,
+        message=message,
+        status='Queued',
+        attempts=0,
+        priority=priority,
+        template=template,
+        queued_at=now,
+        next_attempt_at=now
+    )
+    db.session.add(notification)
+    return notification
+
+
+def enqueue_bulk(request_id, donor_ids, message, priority=NORMAL, template=None, chunk_size=DEFAULT_INSERT_CHUNK_SIZE):
+    """Queue the same message for many donors with multi-row INSERTs; the caller commits"""
+    now = datetime.utcnow()
+    donor_ids = list(donor_ids)
+    for start in range(0, len(donor_ids), chunk_size):
+        db.session.execute(Notification.__table__.insert(), [
+            {
+                'donor_id': donor_id,
+                'request_id': request_id,
+                'message': message,
+                'status': 'Queued',
+                'attempts': 0,
+                'priority': priority,
+                'template': template,
+                'queued_at': now,
+                'next_attempt_at': now,
+                'sent_at': now
+            }
+            for donor_id in donor_ids[start:start + chunk_size]
+        ])
+    return len(donor_ids)
+
+
+class RateLimiter:
+    """Token bucket shared by all outbox workers in the process"""
+
+    def __init__(self, rate_per_second):
+        self.rate = rate_per_second
+        self.tokens = rate_per_second
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count=1):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                needed = min(count, self.rate)
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SmsOutbox:
+    """Drains queued Notification rows to the SMS gateway from a pool of threads.
+
+    Rows are claimed by pushing ``next_attempt_at`` forward by a lease, so several
+    processes can share the table; a crashed worker's rows are retried once the
+    lease expires. Failed sends are retried with exponential backoff until
+    ``SMS_OUTBOX_MAX_ATTEMPTS`` is reached.
+
+    Work is claimed and sent most urgent first (see app.services.priority). A
+    worker sending a less urgent batch checks for due, more urgent notifications
+    before each gateway call and hands the rest of its batch back if there are any.
+
+    Outcomes are committed after every gateway round, and the lease on the rows
+    still to send is renewed once half of it has passed, so a slow batch is never
+    re-claimed (and sent twice) by another worker.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._claim_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self.limiter = None
+        self.preemptions = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('SMS_OUTBOX_WORKERS', DEFAULT_WORKERS)
+        self.batch_size = app.config.get('SMS_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.max_recipients = app.config.get('SMS_MAX_RECIPIENTS', DEFAULT_MAX_RECIPIENTS)
+        self.max_attempts = app.config.get('SMS_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.backoff = app.config.get('SMS_OUTBOX_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS)
+        self.max_backoff = app.config.get('SMS_OUTBOX_MAX_BACKOFF_SECONDS', DEFAULT_MAX_BACKOFF_SECONDS)
+        self.claim_seconds = app.config.get('SMS_OUTBOX_CLAIM_SECONDS', DEFAULT_CLAIM_SECONDS)
+        self.poll_seconds = app.config.get('SMS_OUTBOX_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        self.limiter = RateLimiter(app.config.get('SMS_OUTBOX_RATE_PER_SECOND', DEFAULT_RATE_PER_SECOND))
+        app.extensions['sms_outbox'] = self
+
+        # Workers start with the first request so CLI commands (flask db ...) never poll
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        if self._threads or not self.workers:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'sms-outbox-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        """Signal idle workers that new notifications were committed"""
+        self.ensure_started()
+        self._wakeup.set()
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    processed = self.drain_once()
+            except Exception:
+                logger.exception('SMS outbox worker failed')
+                processed = 0
+            if not processed:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def drain(self):
+        """Send everything that is due now (used when no worker threads run, e.g. in tests)"""
+        total = 0
+        while True:
+            processed = self.drain_once()
+            if not processed:
+                return total
+            total += processed
+
+    def drain_once(self):
+        """Claim one batch of due notifications, send them and record the outcome.
+
+        Notifications carrying the same text are sent together in multi-recipient
+        gateway calls of up to ``SMS_MAX_RECIPIENTS`` numbers, and the per-recipient
+        status in each response is mapped back onto its notification. The
+        notification gate drops duplicates and defers what is over a rate cap first.
+        """
+        session = db.session()
+        expire_on_commit = session.expire_on_commit
+        # The claimed rows are leased to this worker: keep them loaded across the
+        # per-round commits instead of reloading each one afterwards
+        session.expire_on_commit = False
+        try:
+            return self._drain_batch()
+        finally:
+            session.expire_on_commit = expire_on_commit
+            session.expire_all()
+
+    def _drain_batch(self):
+        leased_at = time.monotonic()
+        claimed = self._claim()
+        if not claimed:
+            return 0
+        admitted = self._apply_gate(claimed)
+        donors = {
+            donor.id: donor
+            for donor in Donor.query.filter(Donor.id.in_({n.donor_id for n in admitted})).all()
+        } if admitted else {}
+
+        groups = {}  # (priority, message) -> [(notification, msisdn)]
+        for notification in admitted:
+            donor = donors.get(notification.donor_id)
+            if donor is None:
+                self._record_failure(notification, 'Donor not found', retry=False)
+                continue
+            groups.setdefault((notification.priority, notification.message), []).append(
+                (notification, to_msisdn(donor.phone))
+            )
+
+        calls = [
+            (priority, message, entries[start:start + self.max_recipients])
+            for (priority, message), entries in sorted(groups.items(), key=lambda item: item[0][0])
+            for start in range(0, len(entries), self.max_recipients)
+        ]
+        # Concurrent gateways take every call of one priority at once; others one call at a time
+        concurrent = getattr(self.app.sms, 'concurrent', False)
+        db.session.commit()  # Failures recorded above
+        index = 0
+        while index < len(calls):
+            priority = calls[index][0]
+            if index and self._more_urgent_waiting(priority):
+                self._release([notification for _, _, rest in calls[index:] for notification, _ in rest])
+                break
+            if time.monotonic() - leased_at > self.claim_seconds / 2:
+                self._renew_lease([notification for _, _, rest in calls[index:] for notification, _ in rest])
+                leased_at = time.monotonic()
+            end = index + 1
+            while concurrent and end < len(calls) and calls[end][0] == priority:
+                end += 1
+            delivered = self._send_calls([(message, entries) for _, message, entries in calls[index:end]])
+            self._mark_matches_notified(delivered)
+            db.session.commit()  # Record this round before the next one starts
+            index = end
+
+        db.session.commit()
+        return len(claimed)
+
+    def _claim(self):
+        now = datetime.utcnow()
+        with self._claim_lock:
+            ids = [
+                row.id for row in
+                db.session.query(Notification.id)
+                .filter(Notification.status == 'Queued', Notification.next_attempt_at <= now)
+                .order_by(Notification.priority, Notification.next_attempt_at, Notification.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            ]
+            if not ids:
+                db.session.rollback()
+                return []
+            Notification.query.filter(Notification.id.in_(ids)).update(
+                {'next_attempt_at': now + timedelta(seconds=self.claim_seconds)},
+                synchronize_session=False
+            )
+            db.session.commit()
+        # populate_existing: rows left in the identity map by an earlier batch are not expired
+        return (Notification.query.filter(Notification.id.in_(ids))
+                .order_by(Notification.priority, Notification.id).populate_existing().all())
+
+    def _renew_lease(self, notifications):
+        """Push the lease on notifications not sent yet forward by another SMS_OUTBOX_CLAIM_SECONDS"""
+        until = datetime.utcnow() + timedelta(seconds=self.claim_seconds)
+        Notification.query.filter(
+            Notification.id.in_([n.id for n in notifications]),
+            Notification.status == 'Queued'
+        ).update({'next_attempt_at': until}, synchronize_session=False)
+        db.session.commit()
+
+    def _apply_gate(self, claimed):
+        """Suppress duplicates and defer rate-limited notifications; returns the rest"""
+        decisions = notification_gate.admit_many(claimed)
+        now = datetime.utcnow()
+        admitted = []
+        for notification in claimed:
+            decision, retry_after = decisions[notification.id]
+            if decision == DUPLICATE:
+                notification.status = 'Suppressed'
+                notification.next_attempt_at = None
+                notification.last_error = 'Duplicate of a recent notification'
+            elif decision == THROTTLED:
+                # Not a failed attempt: try again once the window has room
+                notification.next_attempt_at = now + timedelta(seconds=retry_after)
+                notification.last_error = 'Rate limited'
+            else:
+                admitted.append(notification)
+        if len(admitted) < len(claimed):
+            db.session.commit()  # Don't hold the write open across the gateway calls
+        return admitted
+
+    def _more_urgent_waiting(self, priority):
+        """True when a notification more urgent than ``priority`` is due and unclaimed"""
+        if priority <= CRITICAL:
+            return False
+        table = Notification.__table__
+        query = select(
+            exists().where(
+                table.c.status == 'Queued',
+                table.c.priority < priority,
+                table.c.next_attempt_at <= datetime.utcnow()
+            )
+        )
+        if isinstance(db.engine.pool, StaticPool):
+            # In-memory SQLite shares one connection; closing a second handle would roll back this session
+            return db.session.execute(query).scalar()
+        # Own connection: this worker's transaction may not see rows committed since it began
+        with db.engine.connect() as connection:
+            return connection.execute(query).scalar()
+
+    def _release(self, notifications):
+        """Hand claimed notifications back to the queue without counting an attempt"""
+        now = datetime.utcnow()
+        for notification in notifications:
+            notification.next_attempt_at = now
+        notification_gate.refund(notifications)  # They were admitted, but not sent
+        self.preemptions += 1
+        logger.info(f'Preempted {len(notifications)} notifications for more urgent work')
+
+    def _send_calls(self, calls):
+        """Send [(message, entries)] as multi-recipient calls, concurrently when the
+        gateway supports it; returns the notifications that were accepted"""
+        requests = [(message, list(dict.fromkeys(number for _, number in entries))) for message, entries in calls]
+        for _ in requests:
+            self.limiter.acquire()
+        if len(requests) == 1:
+            try:
+                responses = [self.app.sms.send(*requests[0])]
+            except Exception as e:
+                responses = [e]
+        else:
+            try:
+                responses = self.app.sms.send_many(requests)
+            except Exception as e:
+                responses = [e] * len(requests)  # e.g. the batch as a whole timed out
+
+        delivered = []
+        for (_, entries), response in zip(calls, responses):
+            delivered.extend(self._apply_response(entries, response))
+        return delivered
+
+    def _apply_response(self, entries, response):
+        """Map one call's per-recipient statuses (or its exception) back onto its notifications"""
+        try:
+            if isinstance(response, Exception):
+                raise response
+            results = {r['number']: r for r in response['SMSMessageData']['Recipients']}
+        except Exception as e:
+            for notification, _ in entries:
+                self._record_failure(notification, str(e) or type(e).__name__)
+            return []
+
+        delivered = []
+        now = datetime.utcnow()
+        for notification, number in entries:
+            result = results.get(number)
+            if result is not None and result['status'] == 'Success':
+                if notification.queued_at is not None:
+                    queue_delay.record(notification.priority, (now - notification.queued_at).total_seconds())
+                notification.status = 'Sent'
+                notification.sent_at = now
+                notification.provider_message_id = result.get('messageId')
+                notification.next_attempt_at = None
+                notification.last_error = None
+                delivered.append(notification)
+            else:
+                self._record_failure(notification, result['status'] if result else 'No status returned for recipient')
+        return delivered
+
+    def _mark_matches_notified(self, delivered):
+        """Move the pending matches behind delivered notifications to 'Notified', one UPDATE per request"""
+        donors_by_request = {}
+        for notification in delivered:
+            donors_by_request.setdefault(notification.request_id, set()).add(notification.donor_id)
+        now = datetime.utcnow()
+        for request_id, donor_ids in donors_by_request.items():
+            DonorMatch.query.filter(
+                DonorMatch.request_id == request_id,
+                DonorMatch.donor_id.in_(donor_ids),
+                DonorMatch.status == 'Pending'
+            ).update({'status': 'Notified', 'notified_at': now}, synchronize_session=False)
+            change_feed.record_bulk_update('donor_match', {'status': 'Notified', 'notified_at': now},
+                                           {'request_id': request_id, 'donor_ids': sorted(donor_ids)})
+
+    def _record_failure(self, notification, error, retry=True):
+        notification.attempts = (notification.attempts or 0) + 1
+        notification.last_error = error[:255]
+        if retry and notification.attempts < self.max_attempts:
+            delay = min(self.max_backoff, self.backoff * 2 ** (notification.attempts - 1))
+            notification.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            notification.status = 'Failed'
+            notification.next_attempt_at = None
+            notification_gate.forget(notification)  # Let a later notification of this kind through
+            logger.warning(f'Giving up on notification {notification.id}: {error}')
+
+
+# Process-wide outbox, initialized by create_app
+sms_outbox = SmsOutbox()
@@ -0,0 +1,198 @@
+import logging
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_match_model import DonorMatch
+from app.services import notification_service
+from app.services.donor_index import donor_index
+from app.services.match_service import rank_candidates
+from app.services.priority import order_requests, priority_class, urgency_priority
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_ALL = 'all'
+NOTIFY_WAVES = 'waves'
+
+# Defaults, overridable through the WAVE_* config values
+DEFAULT_DONORS_PER_UNIT = 3  # First wave: this many donors for every unit still needed
+DEFAULT_GROWTH_FACTOR = 2  # Each later wave is this much larger than the one before
+DEFAULT_MAX_WAVE_SIZE = 100
+DEFAULT_MAX_REQUESTS_PER_RUN = 200
+# Seconds to wait for answers before widening, per urgency class
+DEFAULT_INTERVALS = {'critical': 120, 'high': 300, 'normal': 900, 'low': 1800}
+
+# Match statuses that count towards units_needed / are still awaiting an answer
+ACCEPTED_STATUSES = ('Accepted', 'Completed')
+AWAITING_STATUSES = ('Pending', 'Notified')
+# Request statuses that end the waves
+CLOSED_REQUEST_STATUSES = ('Completed', 'Fulfilled', 'Cancelled', 'Closed')
+
+
+class WaveSettings:
+    def __init__(self, config=None):
+        config = config or {}
+        self.donors_per_unit = config.get('WAVE_DONORS_PER_UNIT', DEFAULT_DONORS_PER_UNIT)
+        self.growth_factor = config.get('WAVE_GROWTH_FACTOR', DEFAULT_GROWTH_FACTOR)
+        self.max_wave_size = config.get('WAVE_MAX_SIZE', DEFAULT_MAX_WAVE_SIZE)
+        self.max_requests = config.get('WAVE_MAX_REQUESTS_PER_RUN', DEFAULT_MAX_REQUESTS_PER_RUN)
+        self.intervals = dict(DEFAULT_INTERVALS, **config.get('WAVE_INTERVAL_SECONDS', {}))
+
+    def wave_size(self, wave_number, units_remaining):
+        size = max(units_remaining, 1) * self.donors_per_unit * self.growth_factor ** wave_number
+        return int(min(size, self.max_wave_size))
+
+    def interval(self, blood_request):
+        return timedelta(seconds=self.intervals[priority_class(urgency_priority(blood_request.urgency_level))])
+
+
+def _match_counts(request_id):
+    """(accepted, awaiting) donor answers for a request"""
+    rows = dict(
+        db.session.query(DonorMatch.status, db.func.count(DonorMatch.id))
+        .filter(DonorMatch.request_id == request_id,
+                DonorMatch.status.in_(ACCEPTED_STATUSES + AWAITING_STATUSES))
+        .group_by(DonorMatch.status)
+        .all()
+    )
+    return (sum(rows.get(s, 0) for s in ACCEPTED_STATUSES),
+            sum(rows.get(s, 0) for s in AWAITING_STATUSES))
+
+
+def is_filled(blood_request):
+    accepted, _ = _match_counts(blood_request.id)
+    return accepted >= (blood_request.units_needed or 1)
+
+
+def _send_wave(blood_request, settings, now):
+    """Match and queue the next best-ranked donors not contacted yet; returns how many"""
+    accepted, _ = _match_counts(blood_request.id)
+    units_remaining = (blood_request.units_needed or 1) - accepted
+    # wave_count is the number of waves sent before this one (advance_waves bumps
+    # the column with a Core UPDATE, which leaves the loaded attribute as it was)
+    size = settings.wave_size(blood_request.wave_count or 0, units_remaining)
+
+    contacted = {
+        row.donor_id for row in
+        db.session.query(DonorMatch.donor_id).filter(DonorMatch.request_id == blood_request.id).all()
+    }
+    candidates = donor_index.candidates(blood_request.blood_type, exclude_ids=contacted)
+    donors = rank_candidates(blood_request, candidates, size)
+    if not donors:
+        return 0
+
+    db.session.execute(DonorMatch.__table__.insert(), [
+        {'request_id': blood_request.id, 'donor_id': donor['id'], 'status': 'Pending', 'notified_at': now}
+        for donor in donors
+    ])
+    notification_service.queue_broadcast(blood_request, [donor['id'] for donor in donors])
+    return len(donors)
+
+
+def start_waves(blood_request, settings=None, now=None):
+    """Switch a request to wave mode and send its first wave; the caller commits and dispatches.
+
+    Returns the number of donors contacted.
+    """
+    settings = settings or WaveSettings()
+    now = now or datetime.utcnow()
+    blood_request.notify_mode = NOTIFY_WAVES
+    sent = _send_wave(blood_request, settings, now)
+    blood_request.wave_count = (blood_request.wave_count or 0) + 1
+    blood_request.next_wave_at = now + settings.interval(blood_request) if sent else None
+    if not sent:
+        notification_service.queue_requester_notification(
+            blood_request, notification_service.NO_MATCH_MESSAGE.format(blood_type=blood_request.blood_type),
+            notification_service.NO_MATCH_TEMPLATE
+        )
+    return sent
+
+
+def stop_waves(blood_request):
+    blood_request.next_wave_at = None
+
+
+def expedite(blood_request, now=None):
+    """Bring the next wave forward after a decline, if too few donors are left to answer"""
+    if blood_request.notify_mode != NOTIFY_WAVES or blood_request.next_wave_at is None:
+        return
+    accepted, awaiting = _match_counts(blood_request.id)
+    if awaiting < (blood_request.units_needed or 1) - accepted:
+        blood_request.next_wave_at = min(blood_request.next_wave_at, now or datetime.utcnow())
+
+
+def _claim(blood_request, seen_at, now, **values):
+    """Take this request's due wave with a conditional UPDATE, so one worker acts on it"""
+    table = BloodRequest.__table__
+    return db.session.execute(
+        table.update()
+        # A timer another worker already moved forward is never due, whatever seen_at says
+        .where(table.c.id == blood_request.id, table.c.next_wave_at == seen_at, table.c.next_wave_at <= now)
+        # Wave bookkeeping is not a change to the request; keep updated_at as it is
+        .values(updated_at=table.c.updated_at, **values)
+    ).rowcount == 1
+
+
+def advance_waves(settings=None, now=None):
+    """Send the next wave for every wave-mode request whose timer expired.
+
+    Requests that are filled, closed or out of candidates stop. Each request is
+    committed on its own; returns a summary dict.
+    """
+    settings = settings or WaveSettings()
+    now = now or datetime.utcnow()
+    # Plain (id, next_wave_at) values: every commit below expires loaded rows, and a
+    # reloaded row would show the timer another worker has just moved forward
+    due = order_requests(
+        db.session.query(BloodRequest.id, BloodRequest.next_wave_at, BloodRequest.urgency_level,
+                         BloodRequest.created_at)
+        .filter(BloodRequest.next_wave_at.isnot(None), BloodRequest.next_wave_at <= now)
+        .limit(settings.max_requests)
+        .all()
+    )
+    summary = {'requests_due': len(due), 'waves_sent': 0, 'donors_contacted': 0, 'stopped': 0}
+
+    for request_id, seen_at, _, _ in due:
+        blood_request = db.session.get(BloodRequest, request_id, populate_existing=True)
+        if blood_request is None:
+            continue
+        if blood_request.status in CLOSED_REQUEST_STATUSES or is_filled(blood_request):
+            if _claim(blood_request, seen_at, now, next_wave_at=None):
+                summary['stopped'] += 1
+            db.session.commit()
+            continue
+
+        table = BloodRequest.__table__
+        if not _claim(blood_request, seen_at, now, next_wave_at=now + settings.interval(blood_request),
+                      wave_count=table.c.wave_count + 1):
+            db.session.rollback()  # Another worker sent this wave
+            continue
+        try:
+            sent = _send_wave(blood_request, settings, now)
+            if not sent:
+                # Every compatible donor has been asked; stop (the claim is undone with it)
+                db.session.rollback()
+                _claim(blood_request, seen_at, now, next_wave_at=None)
+                summary['stopped'] += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception(f'Wave for blood request {blood_request.id} failed')
+            continue
+        if sent:
+            summary['waves_sent'] += 1
+            summary['donors_contacted'] += sent
+    return summary
+
+
+def wave_status(blood_request):
+    accepted, awaiting = _match_counts(blood_request.id)
+    return {
+        'request_id': blood_request.id,
+        'notify_mode': blood_request.notify_mode,
+        'waves_sent': blood_request.wave_count or 0,
+        'next_wave_at': blood_request.next_wave_at.isoformat() if blood_request.next_wave_at else None,
+        'units_needed': blood_request.units_needed,
+        'accepted': accepted,
+        'awaiting_answer': awaiting,
+        'filled': accepted >= (blood_request.units_needed or 1)
+    }
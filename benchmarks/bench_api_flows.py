@@ -0,0 +1,269 @@
+"""Throughput, latency percentiles and query counts for the core API flows.
+
+Seeds a synthetic dataset (hospitals, donors, blood requests and donation
+history) and drives the endpoints in-process through the Flask test client
+with the fake SMS gateway, so no network access is needed:
+
+    python -m benchmarks.bench_api_flows --donors 20000 --iterations 200
+
+By default the data lives in a temporary SQLite file; pass ``--database`` to
+run against a local MySQL instead (the schema is created and dropped). The
+notification gate is switched off so ``--drain`` measures sending, not the
+rate caps. The same ``--seed`` always produces the same dataset and call
+sequence, so two runs of different commits can be compared directly.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donation_record_model import DonationRecord
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.models.notification_model import Notification
+from app.services.donation_service import MIN_DAYS_BETWEEN_DONATIONS
+from app.services.donor_index import donor_index
+from app.services.sms_outbox import sms_outbox
+
+BLOOD_TYPES = ['O+', 'O-', 'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-']
+BLOOD_TYPE_WEIGHTS = [38, 7, 27, 6, 15, 3, 3, 1]
+CITIES = {  # name -> (lat, lng)
+    'Kampala': (0.3476, 32.5825),
+    'Entebbe': (0.0512, 32.4637),
+    'Jinja': (0.4479, 33.2026),
+    'Mbarara': (-0.6072, 30.6545),
+    'Gulu': (2.7724, 32.2881),
+}
+URGENCY_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+INSERT_CHUNK_SIZE = 1000
+
+
+class QueryCounter:
+    """Counts statements executed on the engine between reset() calls"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+class FlowResult:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.queries = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def percentile(self, fraction):
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+    def row(self):
+        calls = len(self.latencies)
+        return (
+            f'{self.name:<24} {calls:>6} {self.errors:>6} {calls / self.elapsed if self.elapsed else 0:>9.1f} '
+            f'{self.percentile(0.5):>9.2f} {self.percentile(0.95):>9.2f} {self.percentile(0.99):>9.2f} '
+            f'{self.queries / calls if calls else 0:>9.1f}'
+        )
+
+
+def _jitter(rng, lat, lng, km=15):
+    spread = km / 111.0
+    return round(lat + rng.uniform(-spread, spread), 5), round(lng + rng.uniform(-spread, spread), 5)
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(table.insert(), rows[start:start + INSERT_CHUNK_SIZE])
+
+
+def seed(rng, hospitals, donors, requests, history):
+    """Insert the synthetic dataset with multi-row INSERTs; returns (hospital_ids, donor_ids, request_ids)"""
+    now = datetime.utcnow()
+    cities = list(CITIES)
+
+    hospital_rows = []
+    for number in range(hospitals):
+        city = cities[number % len(cities)]
+        lat, lng = _jitter(rng, *CITIES[city])
+        hospital_rows.append({
+            'name': f'Hospital {number}', 'city': city, 'location': f'{lat},{lng}',
+            'latitude': lat, 'longitude': lng, 'contact_number': f'0414{number:06d}'
+        })
+    _insert(Hospital.__table__, hospital_rows)
+    hospital_ids = [row.id for row in db.session.query(Hospital.id).order_by(Hospital.id)]
+
+    donor_rows = []
+    for number in range(donors):
+        city = rng.choice(cities)
+        lat, lng = _jitter(rng, *CITIES[city], km=30)
+        donor_rows.append({
+            'name': f'Donor {number}', 'age': rng.randint(18, 60),
+            'blood_type': rng.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0],
+            'phone': f'07{number:08d}', 'email': f'donor{number}@example.org',
+            'city': city, 'location': f'{lat},{lng}', 'latitude': lat, 'longitude': lng,
+            'availability_status': True, 'next_eligible_at': None
+        })
+    _insert(Donor.__table__, donor_rows)
+    donors_by_id = {
+        row.id: row for row in db.session.query(Donor.id, Donor.blood_type).order_by(Donor.id)
+    }
+    donor_ids = list(donors_by_id)
+
+    # Donation history: a fraction of donors gave blood recently and are still resting
+    record_rows = []
+    resting = {}
+    for donor_id in rng.sample(donor_ids, min(history, len(donor_ids))):
+        donated_at = now - timedelta(days=rng.randint(1, 180))
+        next_eligible = donated_at + timedelta(days=MIN_DAYS_BETWEEN_DONATIONS)
+        record_rows.append({
+            'donor_id': donor_id, 'hospital_id': rng.choice(hospital_ids),
+            'blood_type': donors_by_id[donor_id].blood_type,
+            'donated_at': donated_at, 'next_eligible_donation': next_eligible
+        })
+        if next_eligible > now:
+            resting[donor_id] = next_eligible
+    _insert(DonationRecord.__table__, record_rows)
+    for donor_id, next_eligible in resting.items():
+        db.session.query(Donor).filter(Donor.id == donor_id).update(
+            {'availability_status': False, 'next_eligible_at': next_eligible}, synchronize_session=False
+        )
+
+    request_rows = []
+    for number in range(requests):
+        city = rng.choice(cities)
+        request_rows.append({
+            'name': f'Patient {number}', 'city': city, 'contact_number': f'0700{number:06d}',
+            'hospital_id': rng.choice(hospital_ids), 'blood_type': rng.choices(BLOOD_TYPES, BLOOD_TYPE_WEIGHTS)[0],
+            'units_needed': rng.randint(1, 4), 'urgency_level': rng.choice(URGENCY_LEVELS),
+            'status': 'Pending', 'created_at': now
+        })
+    _insert(BloodRequest.__table__, request_rows)
+    db.session.commit()
+    request_ids = [row.id for row in db.session.query(BloodRequest.id).order_by(BloodRequest.id)]
+    donor_index.invalidate()
+    return hospital_ids, donor_ids, request_ids
+
+
+def drive(client, counter, name, calls):
+    """Run each (method, url, json) call once, timing it and counting its queries"""
+    result = FlowResult(name)
+    started = time.perf_counter()
+    for method, url, body in calls:
+        counter.reset()
+        call_started = time.perf_counter()
+        response = client.open(url, method=method, json=body)
+        result.latencies.append(time.perf_counter() - call_started)
+        result.queries += counter.count
+        if response.status_code >= 400:
+            result.errors += 1
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run(app, args):
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        seed_started = time.perf_counter()
+        hospital_ids, donor_ids, request_ids = seed(rng, args.hospitals, args.donors, args.requests, args.history)
+        print(f'Seeded {len(hospital_ids)} hospitals, {len(donor_ids)} donors, {len(request_ids)} requests '
+              f'and {args.history} donations in {time.perf_counter() - seed_started:.1f}s\n')
+
+    results = []
+    results.append(drive(client, counter, 'create_blood_request', [
+        ('POST', '/api/v1/blood_requests/create_blood_request', {
+            'name': f'Bench {number}', 'city': rng.choice(list(CITIES)), 'contact_number': '0700000000',
+            'hospital_id': rng.choice(hospital_ids), 'blood_type': rng.choice(BLOOD_TYPES),
+            'units_needed': 1, 'urgency_level': rng.choice(URGENCY_LEVELS), 'status': 'Pending'
+        })
+        for number in range(args.iterations)
+    ]))
+    for label, query in (('find-matches', ''), ('find-matches ranked', '?mode=ranked&limit=10'),
+                         ('find-matches nearest', '?mode=nearest&k=10')):
+        results.append(drive(client, counter, label, [
+            ('GET', f'/api/v1/donor_matches/find-matches/{rng.choice(request_ids)}{query}', None)
+            for _ in range(args.iterations)
+        ]))
+    results.append(drive(client, counter, 'batch-match', [
+        ('POST', '/api/v1/donor_matches/batch-match', None) for _ in range(args.batch_rounds)
+    ]))
+    results.append(drive(client, counter, 'batch-notify-request', [
+        ('POST', f'/api/v1/notifications/batch-notify-request/{request_id}', None)
+        for request_id in rng.sample(request_ids, min(args.iterations, len(request_ids)))
+    ]))
+    results.append(drive(client, counter, 'create_record', [
+        ('POST', '/api/v1/donor_records/create_record', {
+            'donor_id': donor_id, 'hospital_id': rng.choice(hospital_ids), 'blood_type': blood_type
+        })
+        for donor_id, blood_type in _sample_donors(app, rng, donor_ids, args.iterations)
+    ]))
+
+    print(f'{"flow":<24} {"calls":>6} {"errors":>6} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>9}')
+    for result in results:
+        print(result.row())
+
+    if args.drain:
+        with app.app_context():
+            started = time.perf_counter()
+            processed = sms_outbox.drain()
+            elapsed = time.perf_counter() - started
+            # drain() counts every claimed row; report what actually went out separately
+            statuses = dict(
+                db.session.query(Notification.status, db.func.count(Notification.id)).group_by(Notification.status).all()
+            )
+        sent = statuses.get('Sent', 0)
+        print(f'\nOutbox processed {processed} notifications in {elapsed:.2f}s: {sent} sent '
+              f'({sent / elapsed if elapsed else 0:.0f}/s), {statuses.get("Queued", 0)} still queued, '
+              f'{len(app.sms.sent)} gateway calls')
+
+
+def _sample_donors(app, rng, donor_ids, count):
+    with app.app_context():
+        chosen = rng.sample(donor_ids, min(count, len(donor_ids)))
+        blood_types = dict(db.session.query(Donor.id, Donor.blood_type).filter(Donor.id.in_(chosen)).all())
+    return [(donor_id, blood_types[donor_id]) for donor_id in chosen]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URL (default: a temporary SQLite file)')
+    parser.add_argument('--hospitals', type=int, default=20)
+    parser.add_argument('--donors', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--history', type=int, default=2000, help='donation records to seed')
+    parser.add_argument('--iterations', type=int, default=100, help='calls per flow')
+    parser.add_argument('--batch-rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--drain', action='store_true', help='also time draining the SMS outbox')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.database or f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': database, 'NOTIFICATION_GATE_ENABLED': False})
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+        try:
+            run(app, args)
+        finally:
+            with app.app_context():
+                db.session.remove()
+                db.drop_all()
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Matches per second: in-process notification vs. the old HTTP self-call.
+
+Runs the app on a local werkzeug server backed by a temporary SQLite file and
+the fake SMS gateway, so no network access or MySQL is needed:
+
+    python -m benchmarks.bench_match_creation --matches 500
+
+``self-call`` reproduces the previous create_match flow, where every match cost
+an extra POST to /api/v1/notifications/ on the app's own server.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import requests
+from werkzeug.serving import make_server
+from app import create_app
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+
+
+def build_app(database_path):
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}'})
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, matches):
+    with app.app_context():
+        hospital = Hospital(name='Mulago', city='Kampala', contact_number='0414000000')
+        db.session.add(hospital)
+        db.session.flush()
+        blood_request = BloodRequest(
+            name='Benchmark', city='Kampala', contact_number='0700000000', hospital_id=hospital.id,
+            blood_type='AB+', units_needed=1, urgency_level='High', status='Pending'
+        )
+        db.session.add(blood_request)
+        db.session.execute(Donor.__table__.insert(), [
+            {'name': f'Donor {i}', 'age': 30, 'blood_type': 'O-', 'phone': f'07{i:08d}',
+             'city': 'Kampala', 'availability_status': True}
+            for i in range(matches)
+        ])
+        db.session.commit()
+        return blood_request.id, [d.id for d in Donor.query.order_by(Donor.id).all()]
+
+
+def run(base_url, request_id, donor_ids, mode):
+    session = requests.Session()
+    started = time.perf_counter()
+    for donor_id in donor_ids:
+        response = session.post(f'{base_url}/api/v1/donor_matches/create_match',
+                                json={'request_id': request_id, 'donor_id': donor_id})
+        response.raise_for_status()
+        if mode == 'self-call':
+            # The old handler made this call to its own server while holding the worker
+            requests.post(f'{base_url}/api/v1/notifications/',
+                          json={'donor_id': donor_id, 'request_id': request_id, 'message': 'match'})
+    return len(donor_ids) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--matches', type=int, default=300)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ('self-call', 'in-process'):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = build_app(os.path.join(tmp, 'bench.db'))
+            request_id, donor_ids = seed(app, args.matches)
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                results[mode] = run(f'http://127.0.0.1:{server.server_port}', request_id, donor_ids, mode)
+            finally:
+                server.shutdown()
+
+    for mode, rate in results.items():
+        print(f'{mode:>10}: {rate:8.1f} matches/s')
+    print(f'   speedup: {results["in-process"] / results["self-call"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Notification request latency: sending inside the request vs. queueing to the outbox.
+
+Drives POST /api/v1/notifications/ in-process against a temporary SQLite file,
+with the fake SMS gateway answering after an injected round-trip time:
+
+    python -m benchmarks.bench_notify_latency --requests 200 --gateway-latency 0.25
+
+``inline`` times each request together with its delivery, which is what a
+handler calling the gateway synchronously costs. ``outbox`` times the request
+alone while the outbox workers deliver in the background, and also reports how
+long notifications waited in the queue before the gateway accepted them.
+"""
+import argparse
+import os
+import tempfile
+import time
+from app import create_app
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.models.notification_model import Notification
+from app.services.priority import queue_delay
+from app.services.sms_outbox import sms_outbox
+from benchmarks.bench_api_flows import FlowResult
+
+
+def build_app(database, args, workers):
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': database,
+        'SMS_FAKE_LATENCY': args.gateway_latency,
+        'SMS_OUTBOX_WORKERS': workers,
+        'SMS_OUTBOX_RATE_PER_SECOND': 0,
+        'NOTIFICATION_GATE_ENABLED': False
+    })
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(Hospital(id=1, name='Mulago', city='Kampala', contact_number='0414000000'))
+        db.session.add(BloodRequest(id=1, name='Benchmark', city='Kampala', contact_number='0700000000',
+                                    hospital_id=1, blood_type='O+', units_needed=1, urgency_level='High'))
+        db.session.execute(Donor.__table__.insert(), [
+            {'name': f'Donor {i}', 'age': 30, 'blood_type': 'O+', 'phone': f'07{i:08d}',
+             'city': 'Kampala', 'availability_status': True}
+            for i in range(args.requests)
+        ])
+        db.session.commit()
+    return app
+
+
+def run(app, args, mode):
+    client = app.test_client()
+    result = FlowResult(mode)
+    started = time.perf_counter()
+    for donor_id in range(1, args.requests + 1):
+        call_started = time.perf_counter()
+        response = client.post('/api/v1/notifications/', json={'donor_id': donor_id, 'request_id': 1,
+                                                               'message': f'Hello {donor_id}'})
+        if mode == 'inline':
+            with app.app_context():
+                sms_outbox.drain()  # Deliver before answering, as a synchronous handler would
+        result.latencies.append(time.perf_counter() - call_started)
+        if response.status_code != 201:
+            result.errors += 1
+    result.elapsed = time.perf_counter() - started
+
+    if mode == 'outbox':
+        with app.app_context():
+            deadline = time.monotonic() + args.requests * args.gateway_latency + 30
+            while Notification.query.filter_by(status='Queued').count() and time.monotonic() < deadline:
+                db.session.rollback()
+                time.sleep(0.05)
+        sms_outbox.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--gateway-latency', type=float, default=0.25, help='injected gateway RTT in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='outbox worker threads in outbox mode')
+    args = parser.parse_args()
+
+    print(f'{"mode":<24} {"calls":>6} {"errors":>6} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+    for mode, workers in (('inline', 0), ('outbox', args.workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            database = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+            app = build_app(database, args, workers)
+            queue_delay.reset()
+            result = run(app, args, mode)
+            calls = len(result.latencies)
+            print(f'{mode:<24} {calls:>6} {result.errors:>6} {calls / result.elapsed:>9.1f} '
+                  f'{result.percentile(0.5):>9.2f} {result.percentile(0.95):>9.2f} {result.percentile(0.99):>9.2f}')
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+    delay = queue_delay.to_dict()['normal']
+    print(f'\nOutbox queue delay: {delay["sent"]} sent, p50 {delay["p50_seconds"]} s, p95 {delay["p95_seconds"]} s')
+
+
+if __name__ == '__main__':
+    main()
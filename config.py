@@ -1,7 +1,130 @@
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
 class Config:
+    """Settings shared by every environment; values can be overridden through environment variables"""
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://root:@localhost/reachout'  # Example database URI
-    SECRET_KEY = 'your-secret-key'
-    
-    # 'mysql+pymysql://root:@localhost/reachout' 
-    # You can add more configurations here as required
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'mysql+pymysql://root:@localhost/reachout')
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your_secret_key')
+
+    # Africa's Talking credentials
+    AFRICASTALKING_USERNAME = os.environ.get('AFRICASTALKING_USERNAME', 'livewell_medical_app')
+    AFRICASTALKING_API_KEY = os.environ.get(
+        'AFRICASTALKING_API_KEY',
+        'atsk_c6f2d52c6f637e9ff0183d8d802dc7b9771902b4009ed1dfdba398c1b4370c6e8565eece'
+    )
+    # 'fake' uses a local stand-in gateway; the '_async' variants ('africastalking_async',
+    # 'fake_async') send concurrently over one pooled HTTP session (needs aiohttp)
+    SMS_GATEWAY = os.environ.get('SMS_GATEWAY', 'africastalking')
+    AFRICASTALKING_SENDER_ID = os.environ.get('AFRICASTALKING_SENDER_ID')
+    SMS_ASYNC_CONCURRENCY = _env_int('SMS_ASYNC_CONCURRENCY', 32)  # Gateway calls in flight at once
+    SMS_TIMEOUT_SECONDS = float(os.environ.get('SMS_TIMEOUT_SECONDS', 10))
+    SMS_OUTBOX_WORKERS = _env_int('SMS_OUTBOX_WORKERS', 4)  # Background threads draining queued notifications
+    SCHEDULER_ENABLED = _env_bool('SCHEDULER_ENABLED', True)  # Run the periodic jobs in app/jobs.py
+
+    # Connection pool. Every request thread, outbox worker and scheduled job holds a
+    # connection while it works, so the pool must cover the peak of all three.
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 10)  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)  # Stay below MySQL's wait_timeout
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+    DB_STATEMENT_TIMEOUT_MS = _env_int('DB_STATEMENT_TIMEOUT_MS', 10000)  # 0 disables the limit
+
+    # Notification gate: drop repeats of (donor, request, template) and cap SMS per donor
+    # and overall with sliding windows ('memory' per process or shared 'redis')
+    NOTIFICATION_GATE_ENABLED = _env_bool('NOTIFICATION_GATE_ENABLED', True)
+    NOTIFICATION_GATE_BACKEND = os.environ.get('NOTIFICATION_GATE_BACKEND', 'memory')
+    NOTIFICATION_GATE_URL = os.environ.get('NOTIFICATION_GATE_URL', 'redis://localhost:6379/0')
+    NOTIFICATION_DEDUPE_SECONDS = _env_int('NOTIFICATION_DEDUPE_SECONDS', 86400)
+    NOTIFICATION_DONOR_MAX = _env_int('NOTIFICATION_DONOR_MAX', 3)
+    NOTIFICATION_DONOR_WINDOW_SECONDS = _env_int('NOTIFICATION_DONOR_WINDOW_SECONDS', 3600)
+    NOTIFICATION_GLOBAL_MAX = _env_int('NOTIFICATION_GLOBAL_MAX', 6000)
+    NOTIFICATION_GLOBAL_WINDOW_SECONDS = _env_int('NOTIFICATION_GLOBAL_WINDOW_SECONDS', 60)
+
+    # Gateway delivery-report callbacks (POST /api/v1/notifications/delivery-reports?token=...)
+    DELIVERY_REPORT_TOKEN = os.environ.get('DELIVERY_REPORT_TOKEN')  # Required on callbacks when set
+    DELIVERY_REPORT_FLUSH_SECONDS = float(os.environ.get('DELIVERY_REPORT_FLUSH_SECONDS', 2))
+
+    # Scheduled incremental matcher (app/jobs.py)
+    INCREMENTAL_MATCH_SECONDS = _env_int('INCREMENTAL_MATCH_SECONDS', 30)
+    INCREMENTAL_MATCH_BATCH_SIZE = _env_int('INCREMENTAL_MATCH_BATCH_SIZE', 500)
+
+    # Wave notification (POST /api/v1/donor_matches/waves/<id>): first wave of
+    # WAVE_DONORS_PER_UNIT donors per unit needed, growing by WAVE_GROWTH_FACTOR
+    WAVE_CHECK_SECONDS = _env_int('WAVE_CHECK_SECONDS', 30)
+    WAVE_DONORS_PER_UNIT = _env_int('WAVE_DONORS_PER_UNIT', 3)
+    WAVE_GROWTH_FACTOR = _env_int('WAVE_GROWTH_FACTOR', 2)
+    WAVE_MAX_SIZE = _env_int('WAVE_MAX_SIZE', 100)
+
+    # Opt-in request profiling: GET /metrics plus sampled slow-request logs with their SQL
+    PROFILING_ENABLED = _env_bool('PROFILING_ENABLED', False)
+    PROFILING_SLOW_MS = _env_int('PROFILING_SLOW_MS', 500)
+    PROFILING_SLOW_SAMPLE_RATE = float(os.environ.get('PROFILING_SLOW_SAMPLE_RATE', 1.0))
+
+    # Read-through cache of hospital and blood request rows ('memory' LRU or shared 'redis')
+    ENTITY_CACHE_ENABLED = _env_bool('ENTITY_CACHE_ENABLED', True)
+    ENTITY_CACHE_BACKEND = os.environ.get('ENTITY_CACHE_BACKEND', 'memory')
+    ENTITY_CACHE_URL = os.environ.get('ENTITY_CACHE_URL', 'redis://localhost:6379/0')
+    ENTITY_CACHE_MAX_ENTRIES = _env_int('ENTITY_CACHE_MAX_ENTRIES', 10000)
+    ENTITY_CACHE_HOSPITAL_TTL_SECONDS = _env_int('ENTITY_CACHE_HOSPITAL_TTL_SECONDS', 3600)
+    ENTITY_CACHE_BLOOD_REQUEST_TTL_SECONDS = _env_int('ENTITY_CACHE_BLOOD_REQUEST_TTL_SECONDS', 60)
+
+    # Conditional GETs (ETag/Last-Modified, 304) and the optional rendered-response cache
+    HTTP_CACHE_ENABLED = _env_bool('HTTP_CACHE_ENABLED', True)
+    HTTP_RESPONSE_CACHE_ENABLED = _env_bool('HTTP_RESPONSE_CACHE_ENABLED', False)
+    HTTP_RESPONSE_CACHE_ENTRIES = _env_int('HTTP_RESPONSE_CACHE_ENTRIES', 256)
+
+    # Change feed (GET /api/v1/changes): long-poll and SSE limits, change log retention
+    CHANGE_FEED_MAX_WAIT_SECONDS = _env_int('CHANGE_FEED_MAX_WAIT_SECONDS', 30)
+    CHANGE_FEED_HEARTBEAT_SECONDS = _env_int('CHANGE_FEED_HEARTBEAT_SECONDS', 15)
+    CHANGE_FEED_SSE_MAX_SECONDS = _env_int('CHANGE_FEED_SSE_MAX_SECONDS', 300)
+    CHANGE_LOG_RETENTION_DAYS = _env_int('CHANGE_LOG_RETENTION_DAYS', 7)
+
+    # Internal endpoints (pool and cache statistics) are only served when enabled; they
+    # have no authentication, so only development and testing turn them on by default
+    INTERNAL_ENDPOINTS_ENABLED = _env_bool('INTERNAL_ENDPOINTS_ENABLED', False)
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 5)
+    INTERNAL_ENDPOINTS_ENABLED = _env_bool('INTERNAL_ENDPOINTS_ENABLED', True)
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+    # Sized for bursts of emergency requests on top of the outbox workers
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 20)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 30)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 5)
+    DB_STATEMENT_TIMEOUT_MS = _env_int('DB_STATEMENT_TIMEOUT_MS', 5000)
+    PROFILING_SLOW_SAMPLE_RATE = float(os.environ.get('PROFILING_SLOW_SAMPLE_RATE', 0.1))
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    SMS_GATEWAY = 'fake'
+    SMS_OUTBOX_WORKERS = 0
+    SCHEDULER_ENABLED = False
+    INTERNAL_ENDPOINTS_ENABLED = True
+
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
@@ -0,0 +1,33 @@
+"""add pending match status
+
+Revision ID: 3b8e2d41c7a9
+Revises: 679f08075afe
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e2d41c7a9'
+down_revision = '679f08075afe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Batch matching inserts matches as 'Pending' before they are notified
+    with op.batch_alter_table('donor_match', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Notified', 'Accepted', 'Rejected', 'Completed', name='match_status'),
+               type_=sa.Enum('Pending', 'Notified', 'Accepted', 'Rejected', 'Completed', name='match_status'),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('donor_match', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Pending', 'Notified', 'Accepted', 'Rejected', 'Completed', name='match_status'),
+               type_=sa.Enum('Notified', 'Accepted', 'Rejected', 'Completed', name='match_status'),
+               existing_nullable=True)
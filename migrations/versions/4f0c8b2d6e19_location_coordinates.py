@@ -0,0 +1,44 @@
+"""location coordinates
+
+Revision ID: 4f0c8b2d6e19
+Revises: e71b6c3f90a4
+Create Date: 2026-10-17 14:05:33.482170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.services.geo import parse_location
+
+
+# revision identifiers, used by Alembic.
+revision = '4f0c8b2d6e19'
+down_revision = 'e71b6c3f90a4'
+branch_labels = None
+depends_on = None
+
+TABLES = ('donor', 'hospital', 'blood_request')
+
+
+def upgrade():
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+    # Backfill the numeric coordinates from the existing free-text GPS strings
+    bind = op.get_bind()
+    for table_name in TABLES:
+        table = sa.table(table_name, sa.column('id'), sa.column('location'),
+                         sa.column('latitude'), sa.column('longitude'))
+        rows = bind.execute(sa.select(table.c.id, table.c.location).where(table.c.location.isnot(None))).all()
+        for row in rows:
+            lat, lng = parse_location(row.location)
+            if lat is not None:
+                bind.execute(table.update().where(table.c.id == row.id).values(latitude=lat, longitude=lng))
+
+
+def downgrade():
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
@@ -0,0 +1,30 @@
+"""notification priority
+
+Revision ID: 5c1f7e3a9b62
+Revises: 7b5e0c2a91d4
+Create Date: 2026-10-17 22:41:09.318452
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1f7e3a9b62'
+down_revision = '7b5e0c2a91d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.SmallInteger(), nullable=False, server_default='2'))
+        batch_op.add_column(sa.Column('queued_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_notification_status_priority', ['status', 'priority', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_status_priority')
+        batch_op.drop_column('queued_at')
+        batch_op.drop_column('priority')
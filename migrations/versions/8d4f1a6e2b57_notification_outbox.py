@@ -0,0 +1,38 @@
+"""notification outbox
+
+Revision ID: 8d4f1a6e2b57
+Revises: 3b8e2d41c7a9
+Create Date: 2026-10-17 10:03:27.904511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f1a6e2b57'
+down_revision = '3b8e2d41c7a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_error', sa.String(length=255), nullable=True))
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Sent', 'Delivered', 'Failed', name='notification_status'),
+               type_=sa.Enum('Queued', 'Sent', 'Delivered', 'Failed', name='notification_status'),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Queued', 'Sent', 'Delivered', 'Failed', name='notification_status'),
+               type_=sa.Enum('Sent', 'Delivered', 'Failed', name='notification_status'),
+               existing_nullable=True)
+        batch_op.drop_column('last_error')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
@@ -0,0 +1,36 @@
+"""change log sequence
+
+Revision ID: a9c3e5f7b214
+Revises: f41c8e2b7d90
+Create Date: 2026-10-17 22:36:12.301576
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e5f7b214'
+down_revision = 'f41c8e2b7d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=True))
+        batch_op.create_index('ix_change_log_seq', ['seq'], unique=True)
+
+    # Existing entries keep their IDs as cursors, so consumers resume where they were
+    op.execute('UPDATE change_log SET seq = id')
+    op.execute(
+        "INSERT INTO table_version (table_name, version, updated_at) "
+        "SELECT 'change_log', COALESCE(MAX(id), 0), CURRENT_TIMESTAMP FROM change_log"
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM table_version WHERE table_name = 'change_log'")
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_seq')
+        batch_op.drop_column('seq')
@@ -0,0 +1,36 @@
+"""table versions
+
+Revision ID: a9d3e5f17c28
+Revises: 4f0c8b2d6e19
+Create Date: 2026-10-17 16:20:11.903514
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3e5f17c28'
+down_revision = '4f0c8b2d6e19'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ('hospital', 'donor', 'blood_request', 'donation_record')
+
+
+def upgrade():
+    table_version = op.create_table('table_version',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(table_version, [
+        {'table_name': table_name, 'version': 1, 'updated_at': now} for table_name in TRACKED_TABLES
+    ])
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -0,0 +1,30 @@
+"""notification delivery reports
+
+Revision ID: b3d7f9a1c254
+Revises: e8a2c4d6f013
+Create Date: 2026-10-18 00:12:51.226870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d7f9a1c254'
+down_revision = 'e8a2c4d6f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('provider_message_id', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('delivered_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_notification_provider_message_id', ['provider_message_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_provider_message_id')
+        batch_op.drop_column('delivered_at')
+        batch_op.drop_column('provider_message_id')
@@ -0,0 +1,51 @@
+"""add hot path indexes
+
+Revision ID: c52a9e07d1f3
+Revises: 8d4f1a6e2b57
+Create Date: 2026-10-17 11:26:05.127934
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52a9e07d1f3'
+down_revision = '8d4f1a6e2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donor', schema=None) as batch_op:
+        batch_op.create_index('ix_donor_blood_type_availability_city', ['blood_type', 'availability_status', 'city'], unique=False)
+
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.create_index('ix_blood_request_status', ['status'], unique=False)
+
+    with op.batch_alter_table('donor_match', schema=None) as batch_op:
+        batch_op.create_index('ix_donor_match_request_donor_status', ['request_id', 'donor_id', 'status'], unique=False)
+
+    with op.batch_alter_table('donation_record', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_record_donor_donated_at', ['donor_id', 'donated_at'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_request_status', ['request_id', 'status'], unique=False)
+        batch_op.create_index('ix_notification_status_next_attempt', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_status_next_attempt')
+        batch_op.drop_index('ix_notification_request_status')
+
+    with op.batch_alter_table('donation_record', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_record_donor_donated_at')
+
+    with op.batch_alter_table('donor_match', schema=None) as batch_op:
+        batch_op.drop_index('ix_donor_match_request_donor_status')
+
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_blood_request_status')
+
+    with op.batch_alter_table('donor', schema=None) as batch_op:
+        batch_op.drop_index('ix_donor_blood_type_availability_city')
@@ -0,0 +1,46 @@
+"""incremental matcher
+
+Revision ID: d46b1f8a0c35
+Revises: a9d3e5f17c28
+Create Date: 2026-10-17 17:42:06.115093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd46b1f8a0c35'
+down_revision = 'a9d3e5f17c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_blood_request_updated_at_id', ['updated_at', 'id'], unique=False)
+
+    # Existing requests were last changed, as far as we know, when they were created
+    blood_request = sa.table('blood_request', sa.column('created_at'), sa.column('updated_at'))
+    op.execute(blood_request.update().values(updated_at=blood_request.c.created_at))
+
+    op.create_table('job_state',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('watermark_at', sa.DateTime(), nullable=True),
+    sa.Column('watermark_id', sa.Integer(), nullable=True),
+    sa.Column('locked_by', sa.String(length=128), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_duration_seconds', sa.Float(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('job_state')
+
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_blood_request_updated_at_id')
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,36 @@
+"""donor next_eligible_at
+
+Revision ID: e71b6c3f90a4
+Revises: c52a9e07d1f3
+Create Date: 2026-10-17 12:40:51.663019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71b6c3f90a4'
+down_revision = 'c52a9e07d1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donor', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_eligible_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_donor_availability_next_eligible', ['availability_status', 'next_eligible_at'], unique=False)
+
+    # Backfill from donation history for donors still inside their waiting period
+    op.execute(
+        "UPDATE donor SET next_eligible_at = ("
+        "SELECT MAX(donation_record.next_eligible_donation) FROM donation_record "
+        "WHERE donation_record.donor_id = donor.id) "
+        "WHERE availability_status = 0"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('donor', schema=None) as batch_op:
+        batch_op.drop_index('ix_donor_availability_next_eligible')
+        batch_op.drop_column('next_eligible_at')
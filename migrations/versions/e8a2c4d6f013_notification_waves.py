@@ -0,0 +1,32 @@
+"""notification waves
+
+Revision ID: e8a2c4d6f013
+Revises: 5c1f7e3a9b62
+Create Date: 2026-10-17 23:20:44.507193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a2c4d6f013'
+down_revision = '5c1f7e3a9b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('notify_mode', sa.String(length=10), nullable=False, server_default='all'))
+        batch_op.add_column(sa.Column('wave_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('next_wave_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_blood_request_next_wave_at', ['next_wave_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_blood_request_next_wave_at')
+        batch_op.drop_column('next_wave_at')
+        batch_op.drop_column('wave_count')
+        batch_op.drop_column('notify_mode')
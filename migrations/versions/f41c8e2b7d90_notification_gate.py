@@ -0,0 +1,35 @@
+"""notification gate
+
+Revision ID: f41c8e2b7d90
+Revises: b3d7f9a1c254
+Create Date: 2026-10-18 00:58:16.772403
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41c8e2b7d90'
+down_revision = 'b3d7f9a1c254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template', sa.String(length=32), nullable=True))
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Queued', 'Sent', 'Delivered', 'Failed', name='notification_status'),
+               type_=sa.Enum('Queued', 'Sent', 'Delivered', 'Failed', 'Suppressed', name='notification_status'),
+               existing_nullable=True)
+
+
+def downgrade():
+    op.execute("UPDATE notification SET status = 'Failed' WHERE status = 'Suppressed'")
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Queued', 'Sent', 'Delivered', 'Failed', 'Suppressed', name='notification_status'),
+               type_=sa.Enum('Queued', 'Sent', 'Delivered', 'Failed', name='notification_status'),
+               existing_nullable=True)
+        batch_op.drop_column('template')
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import event
+from app import create_app
+from app.extensions import db
+from app.services.donor_index import donor_index
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        donor_index.invalidate()  # Process-wide; don't carry donors over from another test's database
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """SQL statements executed while the test runs; clear() it to start counting afresh"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
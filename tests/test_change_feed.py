@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.change_log_model import ChangeLog
+from app.models.donor_match_model import DonorMatch
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.services import change_feed
+
+
+def seed_request():
+    db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+    db.session.add_all([
+        Donor(name=f'Donor {i}', age=30, blood_type='O+', phone=f'+2547{i:08d}', city='Nairobi') for i in range(3)
+    ])
+    db.session.add(BloodRequest(id=1, name='Patient', city='Nairobi', contact_number='0711111111',
+                                hospital_id=1, blood_type='O+', urgency_level='High'))
+    db.session.commit()
+
+
+def log_entry(id, created_at):
+    return ChangeLog(id=id, table_name='blood_request', row_id=1, operation='update',
+                     payload='{}', created_at=created_at)
+
+
+def test_orm_changes_are_published_in_order(app):
+    seed_request()
+    db.session.get(BloodRequest, 1).status = 'Pending'
+    db.session.commit()
+
+    entries, cursor = change_feed.read_changes(0)
+    assert [(e['table'], e['operation']) for e in entries] == [('blood_request', 'insert'), ('blood_request', 'update')]
+    assert entries[1]['data']['status'] == 'Pending'
+    assert cursor == entries[-1]['id']
+    assert change_feed.read_changes(cursor) == ([], cursor)
+
+
+def test_entry_committed_after_a_consumer_passed_its_id_is_still_delivered(app):
+    old = datetime.utcnow() - timedelta(seconds=60)
+    db.session.add_all([log_entry(1, old), log_entry(3, old)])  # ID 2 belongs to a transaction still running
+    db.session.commit()
+    entries, cursor = change_feed.read_changes(0)
+    assert len(entries) == 2
+
+    # The long transaction finally commits its older ID
+    db.session.add(log_entry(2, old))
+    db.session.commit()
+    entries, next_cursor = change_feed.read_changes(cursor)
+    assert [db.session.get(ChangeLog, 2).seq] == [e['id'] for e in entries]
+    assert next_cursor > cursor
+
+
+def test_bulk_inserts_are_logged_with_their_row_ids(app):
+    seed_request()
+    since = change_feed.latest_cursor()
+    db.session.execute(DonorMatch.__table__.insert(), [
+        {'request_id': 1, 'donor_id': donor_id, 'status': 'Pending'} for donor_id in (1, 2, 3)
+    ])
+    db.session.commit()
+
+    entries, _ = change_feed.read_changes(since, tables={'donor_match'})
+    ids = [match.id for match in DonorMatch.query.order_by(DonorMatch.id)]
+    assert [e['row_id'] for e in entries] == ids
+    assert [e['data']['donor_id'] for e in entries] == [1, 2, 3]
+
+
+def test_tables_filter_still_moves_the_cursor(client):
+    seed_request()
+    response = client.get('/api/v1/changes/?tables=donor_match')
+    body = response.get_json()
+    assert body['changes'] == []
+    assert body['next_cursor'] == change_feed.latest_cursor()
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.donation_record_model import DonationRecord
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.services import donation_service
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+def seed_donors(count, start=0, **fields):
+    if db.session.get(Hospital, 1) is None:
+        db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+    donors = [Donor(name=f'Donor {i}', age=30, blood_type='O+', phone=f'+2547{i:08d}', city='Nairobi', **fields)
+              for i in range(start, start + count)]
+    db.session.add_all(donors)
+    db.session.commit()
+    return [donor.id for donor in donors]
+
+
+def record(donor_id, **fields):
+    return {'donor_id': donor_id, 'hospital_id': 1, 'blood_type': 'O+', **fields}
+
+
+def test_batch_size_does_not_change_the_query_count(app, count_queries):
+    warm_up = seed_donors(1)  # The first write creates the table_version rows
+    donation_service.ingest_donations([record(donor_id) for donor_id in warm_up], now=NOW)
+
+    small = seed_donors(2, start=1)
+    count_queries.clear()
+    donation_service.ingest_donations([record(donor_id) for donor_id in small], now=NOW)
+    few = len(count_queries)
+
+    large = seed_donors(40, start=3)
+    count_queries.clear()
+    donation_service.ingest_donations([record(donor_id) for donor_id in large], now=NOW)
+    assert len(count_queries) == few
+    assert DonationRecord.query.count() == 43
+
+
+def test_results_follow_input_order(app):
+    donor_id, = seed_donors(1)
+    results, touched = donation_service.ingest_donations([
+        record(donor_id),
+        record(donor_id),  # Same donor again in the same batch
+        record(999),
+        record(donor_id, blood_type='A+'),
+        'not an object'
+    ], now=NOW)
+
+    assert [result['index'] for result in results] == [0, 1, 2, 3, 4]
+    assert [result['status'] for result in results] == [
+        'created', 'medical_restriction', 'error', 'error', 'error']
+    assert touched == {donor_id}
+
+    donor = db.session.get(Donor, donor_id)
+    assert donor.availability_status is False
+    assert donor.next_eligible_at == NOW + timedelta(days=donation_service.MIN_DAYS_BETWEEN_DONATIONS)
+
+
+def test_back_dated_donation_never_re_enables_a_donor(app):
+    # An admin switched this donor off; a donation whose rest period is long over must not switch them back on
+    donor_id, = seed_donors(1, availability_status=False)
+    results, _ = donation_service.ingest_donations(
+        [record(donor_id, donated_at=(NOW - timedelta(days=365)).isoformat())], now=NOW)
+
+    assert results[0]['status'] == 'created'
+    db.session.expire_all()
+    donor = db.session.get(Donor, donor_id)
+    assert donor.availability_status is False
+    assert donor.next_eligible_at is None
@@ -0,0 +1,51 @@
+import io
+from app.extensions import db
+from app.models.donor_model import Donor
+from app.services.donor_import import DonorImport, iter_rows, open_text
+from app.services.donor_index import donor_index
+
+HEADER = 'name,age,blood_type,phone,city\n'
+
+
+def csv_upload(count, start=0):
+    return HEADER + ''.join(f'Donor {i},30,O+,+2547{i:08d},Nairobi\n' for i in range(start, start + count))
+
+
+def post_csv(client, body):
+    return client.post('/api/v1/donors/import', data=body, content_type='text/csv')
+
+
+def test_rows_are_inserted_in_batches(app, count_queries):
+    body = csv_upload(5) + 'Bad row,abc,O+,+254700000099,Nairobi\n' + 'Duplicate,30,O+,+254700000001,Nairobi\n'
+    count_queries.clear()
+    report = DonorImport(batch_size=2).run(iter_rows(open_text(io.BytesIO(body.encode())), 'csv'))
+
+    inserts = [statement for statement in count_queries if statement.startswith('INSERT INTO donor ')]
+    assert len(inserts) == 3  # 2 + 2 + 1
+    assert report['received'] == 7
+    assert report['imported'] == 5
+    assert [error['line'] for error in report['errors']] == [7, 8]
+    assert Donor.query.count() == 5
+
+
+def test_unreadable_line_reports_what_was_imported(client):
+    assert donor_index.candidates('O+') == []  # Builds the index before the upload
+    body = csv_upload(3).encode() + b'Caf\xe9,30,O+,+254799999999,Nairobi\n' + csv_upload(2, start=3).encode()
+
+    response = post_csv(client, body)
+    assert response.status_code == 400
+    report = response.get_json()
+    assert report['error'].startswith('Could not read upload')
+    assert report['line'] == 5
+    assert report['imported'] == 3
+
+    # Rows before the broken line are kept, and the match index sees them
+    db.session.remove()
+    assert Donor.query.count() == 3
+    assert len(donor_index.candidates('O+')) == 3
+
+
+def test_clean_upload_is_created(client):
+    response = post_csv(client, csv_upload(4).encode())
+    assert response.status_code == 201
+    assert response.get_json()['imported'] == 4
@@ -0,0 +1,45 @@
+import random
+import time
+from app.extensions import db
+from app.models.donor_model import Donor
+from app.services.donor_index import donor_index
+from app.services.geo import haversine_km
+
+
+def seed_donors(points, blood_type='O+'):
+    db.session.add_all([
+        Donor(name=f'Donor {i}', age=30, blood_type=blood_type, phone=f'+2547{i:08d}', city='Nairobi',
+              latitude=lat, longitude=lng)
+        for i, (lat, lng) in enumerate(points)
+    ])
+    db.session.commit()
+    donor_index.load()
+
+
+def brute_force(points, lat, lng, k, max_km):
+    distances = sorted((float(d), i + 1) for i, d in enumerate(haversine_km(lat, lng, *zip(*points))))
+    return [donor_id for distance, donor_id in distances if distance <= max_km][:k]
+
+
+def test_nearest_matches_brute_force_on_a_dense_grid(app):
+    rng = random.Random(7)
+    points = [(-1.28 + rng.uniform(-1, 1), 36.8 + rng.uniform(-1, 1)) for _ in range(400)]
+    seed_donors(points)
+    for max_km in (15, 60, 200):  # Ring scan for the small radii, full scan for the large one
+        found = donor_index.nearest('O+', -1.28, 36.8, k=10, max_km=max_km)
+        assert [d['id'] for d in found] == brute_force(points, -1.28, 36.8, 10, max_km)
+        assert [d['distance_km'] for d in found] == sorted(d['distance_km'] for d in found)
+
+
+def test_nearest_respects_blood_type_and_exclusions(app):
+    seed_donors([(-1.28, 36.8), (-1.29, 36.8)])
+    assert donor_index.nearest('O-', -1.28, 36.8) == []  # O- patients can't take O+ donors
+    assert [d['id'] for d in donor_index.nearest('O+', -1.28, 36.8, exclude_ids=[1])] == [2]
+
+
+def test_nearest_near_the_pole_is_fast(app):
+    seed_donors([(85.0, 10.0), (84.9, 10.5), (-1.28, 36.8)])
+    started = time.perf_counter()
+    found = donor_index.nearest('O+', 85.0, 10.0, k=5, max_km=1000)
+    assert time.perf_counter() - started < 0.5
+    assert [d['id'] for d in found] == [1, 2]
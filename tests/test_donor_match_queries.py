@@ -0,0 +1,60 @@
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_match_model import DonorMatch
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.services.donor_index import MAX_K
+
+
+def seed_matches(count, start=0):
+    """count matches, each with its own donor and blood request"""
+    if db.session.get(Hospital, 1) is None:
+        db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+    for i in range(start, start + count):
+        donor = Donor(name=f'Donor {i}', age=30, blood_type='O+', phone=f'+2547{i:08d}',
+                      email=f'donor{i}@example.com', city='Nairobi')
+        blood_request = BloodRequest(name=f'Patient {i}', city='Nairobi', contact_number='0711111111',
+                                     hospital_id=1, blood_type='O+', urgency_level='High')
+        db.session.add_all([donor, blood_request])
+        db.session.flush()
+        db.session.add(DonorMatch(request_id=blood_request.id, donor_id=donor.id, status='Notified'))
+    db.session.commit()
+
+
+def statements_for(client, count_queries, url):
+    db.session.expunge_all()  # Nothing may come from the identity map
+    count_queries.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(count_queries), response.get_json()
+
+
+def test_list_is_one_query_however_many_matches(client, count_queries):
+    seed_matches(3)
+    few, body = statements_for(client, count_queries, '/api/v1/donor_matches/')
+    assert len(body) == 3
+
+    seed_matches(20, start=3)
+    many, body = statements_for(client, count_queries, '/api/v1/donor_matches/')
+    assert len(body) == 23
+    assert few == many == 1
+    assert body[0]['donor']['name'] == 'Donor 0'
+    assert body[0]['request']['urgency_level'] == 'High'
+
+
+def test_detail_is_one_query(client, count_queries):
+    seed_matches(5)
+    statements, body = statements_for(client, count_queries, '/api/v1/donor_matches/4')
+    assert statements == 1
+    assert body['donor']['email'] == 'donor3@example.com'
+    assert body['request']['id'] == 4
+
+
+def test_ranked_limit_is_capped(client):
+    seed_matches(3)
+    url = '/api/v1/donor_matches/find-matches/1?mode=ranked&limit='
+    assert client.get(url + str(MAX_K)).status_code == 200
+    for limit in (0, MAX_K + 1, 10 ** 9):
+        response = client.get(url + str(limit))
+        assert response.status_code == 400
+        assert str(MAX_K) in response.get_json()['error']
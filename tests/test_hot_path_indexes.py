@@ -0,0 +1,48 @@
+import os
+import pytest
+from flask_migrate import upgrade
+from app import create_app
+from app.extensions import db
+from app.models.donation_record_model import DonationRecord
+from app.models.donor_match_model import DonorMatch
+from app.models.donor_model import Donor
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture
+def migrated_app(tmp_path):
+    """App on a SQLite file built by the migrations, not by create_all()"""
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "plan.db"}'})
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def query_plan(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+
+
+def test_compatible_donor_lookup_uses_index(migrated_app):
+    plan = query_plan(Donor.query.filter(
+        Donor.blood_type.in_(['O-', 'O+']),
+        Donor.availability_status == True,
+        Donor.city == 'Nairobi'
+    ))
+    assert 'ix_donor_blood_type_availability_city' in plan
+
+
+def test_eligibility_lookup_uses_index(migrated_app):
+    plan = query_plan(
+        DonationRecord.query.filter_by(donor_id=1).order_by(DonationRecord.donated_at.desc()).limit(1)
+    )
+    assert 'ix_donation_record_donor_donated_at' in plan
+    assert 'TEMP B-TREE' not in plan  # The index also provides the order
+
+
+def test_existing_match_lookup_uses_index(migrated_app):
+    plan = query_plan(DonorMatch.query.filter_by(request_id=1, donor_id=2))
+    assert 'ix_donor_match_request_donor_status' in plan
@@ -0,0 +1,38 @@
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.hospital_model import Hospital
+
+
+def seed():
+    db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+    db.session.add(BloodRequest(id=1, name='Patient', city='Nairobi', contact_number='0711111111',
+                                hospital_id=1, blood_type='O+', urgency_level='High'))
+    db.session.commit()
+
+
+def test_unchanged_resource_is_not_modified(client):
+    seed()
+    first = client.get('/api/v1/hospitals/hospitals/1')
+    assert first.status_code == 200
+    again = client.get('/api/v1/hospitals/hospitals/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_write_by_another_worker_is_served_under_the_new_etag(client):
+    seed()
+    hospital = client.get('/api/v1/hospitals/hospitals/1')
+    blood_request = client.get('/api/v1/blood_requests/1')
+    assert hospital.get_json()['name'] == 'Kenyatta'  # Both now sit in this process's entity cache
+
+    # Another worker's writes: they bump the table versions but never touch this process's cache
+    db.session.get(Hospital, 1).name = 'Aga Khan'
+    db.session.get(BloodRequest, 1).status = 'Fulfilled'
+    db.session.commit()
+    db.session.expunge_all()
+
+    hospital = client.get('/api/v1/hospitals/hospitals/1', headers={'If-None-Match': hospital.headers['ETag']})
+    assert hospital.status_code == 200
+    assert hospital.get_json()['name'] == 'Aga Khan'
+    blood_request = client.get('/api/v1/blood_requests/1', headers={'If-None-Match': blood_request.headers['ETag']})
+    assert blood_request.status_code == 200
+    assert blood_request.get_json()['status'] == 'Fulfilled'
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_match_model import DonorMatch
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.models.job_state_model import JobState
+from app.services import incremental_matcher
+from app.services.incremental_matcher import JOB_NAME, run_incremental_match
+
+
+def seed_requests(count, changed_at, status='Pending'):
+    if db.session.get(Hospital, 1) is None:
+        db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+        db.session.add(Donor(name='Donor', age=30, blood_type='O+', phone='+254700000001', city='Nairobi'))
+    requests = [
+        BloodRequest(name=f'Patient {i}', city='Nairobi', contact_number='0711111111', hospital_id=1,
+                     blood_type='O+', urgency_level='High', status=status, updated_at=changed_at)
+        for i in range(count)
+    ]
+    db.session.add_all(requests)
+    db.session.commit()
+    return [r.id for r in requests]
+
+
+def matched_requests():
+    return sorted(request_id for request_id, in db.session.query(DonorMatch.request_id))
+
+
+def watermark():
+    db.session.expire_all()
+    state = db.session.get(JobState, JOB_NAME)
+    return state.watermark_at, state.watermark_id
+
+
+def test_batches_advance_the_watermark_through_ties(app):
+    changed_at = datetime.utcnow() - timedelta(minutes=5)
+    ids = seed_requests(5, changed_at)  # Same updated_at: only the id orders them
+    filled = seed_requests(1, changed_at, status='Fulfilled')
+
+    summary = run_incremental_match(batch_size=2, settle_seconds=0)
+    assert summary['requests_processed'] == 5
+    assert summary['backlog'] == 0
+    assert matched_requests() == ids
+    assert watermark() == (changed_at, filled[0])
+
+    # Nothing changed since: the next run reads no requests at all
+    assert run_incremental_match(batch_size=2, settle_seconds=0)['requests_processed'] == 0
+
+
+def test_only_changed_requests_are_rescanned(app):
+    ids = seed_requests(3, datetime.utcnow() - timedelta(minutes=5))
+    run_incremental_match(settle_seconds=0)
+    db.session.query(DonorMatch).delete()
+    db.session.commit()
+
+    db.session.get(BloodRequest, ids[1]).units_needed = 4  # onupdate moves updated_at
+    db.session.commit()
+    assert run_incremental_match(settle_seconds=0)['requests_processed'] == 1
+    assert matched_requests() == [ids[1]]
+
+
+def test_recent_changes_wait_for_the_settle_delay(app):
+    seed_requests(1, datetime.utcnow())
+    assert run_incremental_match(settle_seconds=60)['requests_processed'] == 0
+    assert watermark() == (None, None)
+
+
+def test_lease_held_elsewhere_skips_the_run(app):
+    seed_requests(1, datetime.utcnow() - timedelta(minutes=5))
+    db.session.add(JobState(name=JOB_NAME, locked_by='other:1', locked_until=datetime.utcnow() + timedelta(minutes=1)))
+    db.session.commit()
+
+    skipped = incremental_matcher.stats.skipped
+    assert run_incremental_match(settle_seconds=0) is None
+    assert incremental_matcher.stats.skipped == skipped + 1
+    assert matched_requests() == []
+
+    # An expired lease is taken over
+    db.session.get(JobState, JOB_NAME).locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert run_incremental_match(settle_seconds=0)['requests_processed'] == 1
+    db.session.expire_all()
+    assert db.session.get(JobState, JOB_NAME).locked_by is None  # Released after the run
+
+
+def test_lost_lease_discards_the_batch(app, monkeypatch):
+    seed_requests(2, datetime.utcnow() - timedelta(minutes=5))
+    match_and_queue = incremental_matcher.match_and_queue
+
+    def slow_match(requests):
+        stats = match_and_queue(requests)
+        # Meanwhile the lease expired and another worker took it over
+        table = JobState.__table__
+        db.session.execute(table.update().where(table.c.name == JOB_NAME).values(locked_by='other:1'))
+        return stats
+
+    monkeypatch.setattr(incremental_matcher, 'match_and_queue', slow_match)
+    summary = run_incremental_match(settle_seconds=0)
+    assert summary['requests_processed'] == summary['matches_created'] == 0
+    assert matched_requests() == []
+    assert watermark() == (None, None)
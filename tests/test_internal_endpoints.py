@@ -0,0 +1,11 @@
+from app import create_app
+
+
+def test_production_does_not_serve_internal_endpoints():
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SCHEDULER_ENABLED': False,
+                                    'SMS_GATEWAY': 'fake', 'SMS_OUTBOX_WORKERS': 0})
+    assert app.test_client().get('/internal/pool').status_code == 404
+
+
+def test_testing_serves_internal_endpoints(client):
+    assert client.get('/internal/pool').status_code == 200
@@ -0,0 +1,48 @@
+from datetime import datetime
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.models.notification_model import Notification
+from app.services.listing import DEFAULT_PAGE_SIZE
+
+
+def seed_hospitals(count):
+    db.session.add_all([
+        Hospital(name=f'Hospital {i}', city='Nairobi', contact_number='0700000000') for i in range(count)
+    ])
+    db.session.commit()
+
+
+def test_bare_list_returns_every_row(client):
+    seed_hospitals(DEFAULT_PAGE_SIZE + 50)
+    response = client.get('/api/v1/hospitals/get_hospitals')
+    assert response.status_code == 200
+    assert len(response.get_json()) == DEFAULT_PAGE_SIZE + 50
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_limit_and_cursor_page_through_rows(client):
+    seed_hospitals(25)
+    first = client.get('/api/v1/hospitals/get_hospitals?limit=10')
+    assert [h['id'] for h in first.get_json()] == list(range(1, 11))
+    assert first.headers['X-Next-Cursor'] == '10'
+
+    rest = client.get('/api/v1/hospitals/get_hospitals?cursor=10')
+    assert [h['id'] for h in rest.get_json()] == list(range(11, 26))
+    assert 'X-Next-Cursor' not in rest.headers
+
+
+def test_projected_timestamps_match_the_detail_view(client):
+    seed_hospitals(1)
+    db.session.add(Donor(id=1, name='Donor', age=30, blood_type='O+', phone='+254700000001', city='Nairobi'))
+    db.session.add(BloodRequest(id=1, name='Patient', city='Nairobi', contact_number='0711111111',
+                                hospital_id=1, blood_type='O+', urgency_level='High'))
+    db.session.add(Notification(id=1, donor_id=1, request_id=1, message='Hello', status='Delivered',
+                                sent_at=datetime(2026, 5, 1, 8, 0, 0), delivered_at=datetime(2026, 5, 1, 8, 0, 7)))
+    db.session.commit()
+
+    detail = client.get('/api/v1/notifications/1').get_json()
+    projected = client.get('/api/v1/notifications/?fields=sent_at,delivered_at').get_json()
+    assert projected == [{key: detail[key] for key in ('sent_at', 'delivered_at')}]
+    assert detail['delivered_at'] == '2026-05-01 08:00:07'
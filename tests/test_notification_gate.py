@@ -0,0 +1,174 @@
+import sys
+import types
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from app.extensions import db
+from app.models.notification_model import Notification
+from app.services.notification_gate import ADMIT, DUPLICATE, THROTTLED, NotificationGate, notification_gate
+from app.services.sms_outbox import sms_outbox
+from test_sms_outbox import queue, seed, statuses
+
+NOW = 1_800_000_000.0  # On a window boundary for every window used below
+WINDOW = 3600
+
+
+class FakeRedis:
+    """Just the commands RedisGateStore uses; expiries are accepted and ignored"""
+
+    def __init__(self):
+        self.data = {}
+
+    @classmethod
+    def from_url(cls, url):
+        return cls()
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def set(self, name, value, nx=False, ex=None):
+        if nx and name in self.data:
+            return None
+        self.data[name] = str(value).encode()
+        return True
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+    def mget(self, names):
+        return [self.data.get(name) for name in names]
+
+    def incrby(self, name, amount):
+        value = int(self.data.get(name, 0)) + amount
+        self.data[name] = str(value).encode()
+        return value
+
+    def expire(self, name, seconds):
+        return True
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: self.calls.append((command, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, command)(*args, **kwargs) for command, args, kwargs in self.calls]
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def gate(request, app, monkeypatch):
+    if request.param == 'redis':
+        monkeypatch.setitem(sys.modules, 'redis', types.SimpleNamespace(Redis=FakeRedis))
+    app.config.update({
+        'NOTIFICATION_GATE_BACKEND': request.param,
+        'NOTIFICATION_DONOR_MAX': 3,
+        'NOTIFICATION_DONOR_WINDOW_SECONDS': WINDOW,
+        'NOTIFICATION_GLOBAL_MAX': 5,
+        'NOTIFICATION_GLOBAL_WINDOW_SECONDS': 60
+    })
+    gate = NotificationGate()
+    gate.init_app(app)
+    assert gate.stats()['store'] == {'memory': 'MemoryGateStore', 'redis': 'RedisGateStore'}[request.param]
+    return gate
+
+
+def note(id, donor_id=1, template=None, message='Please come in', request_id=1):
+    return SimpleNamespace(id=id, donor_id=donor_id, request_id=request_id, template=template, message=message)
+
+
+def decisions(gate, notifications, now=NOW):
+    result = gate.admit_many(notifications, now=now)
+    return [result[notification.id][0] for notification in notifications]
+
+
+def test_same_message_to_same_donor_is_a_duplicate(gate):
+    assert decisions(gate, [note(1), note(2), note(3, donor_id=2), note(4, request_id=2)]) == [
+        ADMIT, DUPLICATE, ADMIT, ADMIT]
+    # A later notification with the same key is suppressed; the reservation holder may retry
+    assert decisions(gate, [note(5), note(1)], now=NOW + 60) == [DUPLICATE, ADMIT]
+    assert gate.stats()['suppressed_duplicates'] == 2
+
+
+def test_templates_dedupe_regardless_of_text(gate):
+    assert decisions(gate, [note(1, template='wave'), note(2, template='wave', message='Different text')]) == [
+        ADMIT, DUPLICATE]
+
+
+def test_donor_cap_throttles_until_the_window_has_room(gate):
+    batch = [note(i, message=f'Message {i}') for i in range(1, 5)]
+    result = gate.admit_many(batch, now=NOW + 600)
+    assert [result[i][0] for i in range(1, 5)] == [ADMIT, ADMIT, ADMIT, THROTTLED]
+    assert result[4][1] == WINDOW - 600  # Deferred to the end of the window
+
+    # The throttled message released its dedupe key, so its retry is not a duplicate
+    assert decisions(gate, [note(4, message='Message 4')], now=NOW + WINDOW + WINDOW / 2) == [ADMIT]
+    # Half of the previous window still counts: 1.5 + 1 sent so far leaves room for one more
+    assert decisions(gate, [note(5, message='Message 5'), note(6, message='Message 6')],
+                     now=NOW + WINDOW + WINDOW / 2) == [ADMIT, THROTTLED]
+
+
+def test_sliding_window_forgets_old_buckets(gate):
+    decisions(gate, [note(i, message=f'Message {i}') for i in range(1, 4)])
+    assert decisions(gate, [note(4, message='Message 4')], now=NOW + 2 * WINDOW) == [ADMIT]
+
+
+def test_global_cap_applies_across_donors(gate):
+    result = gate.admit_many([note(i, donor_id=i) for i in range(1, 8)], now=NOW + 15)
+    assert [result[i][0] for i in range(1, 8)] == [ADMIT] * 5 + [THROTTLED] * 2
+    assert result[6][1] == 60 - 15
+    assert gate.stats()['throttled'] == 2
+
+
+def test_refund_gives_quota_back(gate):
+    batch = [note(i, message=f'Message {i}') for i in range(1, 4)]
+    decisions(gate, batch)
+    assert decisions(gate, [note(4, message='Message 4')]) == [THROTTLED]
+
+    gate.refund(batch[:1], now=NOW)
+    assert decisions(gate, [note(4, message='Message 4')]) == [ADMIT]
+    assert gate.stats()['admitted'] == 3
+
+
+def test_forget_releases_the_reservation(gate):
+    decisions(gate, [note(1)])
+    gate.forget(note(1))
+    assert decisions(gate, [note(2)]) == [ADMIT]
+
+
+def test_store_outage_admits_everything(gate, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise ConnectionError('store down')
+
+    monkeypatch.setattr(gate.store, 'claim_dedupe', unavailable)
+    assert decisions(gate, [note(1), note(2)]) == [ADMIT, ADMIT]
+    assert gate.stats()['errors'] == 1
+
+
+def test_memory_dedupe_keys_expire(app):
+    gate = NotificationGate()
+    gate.init_app(app)
+    decisions(gate, [note(1)])
+    assert decisions(gate, [note(2)], now=NOW + gate.dedupe_seconds - 1) == [DUPLICATE]
+    assert decisions(gate, [note(2)], now=NOW + gate.dedupe_seconds) == [ADMIT]
+    assert gate.store.size()['dedupe_keys'] == 1
+
+
+def test_outbox_suppresses_duplicates_and_defers_throttled(app):
+    seed(donors=2)
+    notification_gate.donor_max = 1
+    queue([(1, 'Please come in'), (1, 'Please come in'), (1, 'Second message'), (2, 'Please come in')])
+
+    sms_outbox.drain()
+    assert statuses() == ['Sent', 'Suppressed', 'Queued', 'Sent']
+    deferred = db.session.get(Notification, 3)
+    assert deferred.attempts == 0  # Throttling is not a failed attempt
+    assert deferred.last_error == 'Rate limited'
+    assert deferred.next_attempt_at > datetime.utcnow()
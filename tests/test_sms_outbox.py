@@ -0,0 +1,90 @@
+import time
+from datetime import datetime
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_match_model import DonorMatch
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.models.notification_model import Notification
+from app.services import sms_outbox as outbox_module
+from app.services.sms_outbox import sms_outbox
+
+
+def seed(donors=3):
+    db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+    db.session.add(BloodRequest(id=1, name='Patient', city='Nairobi', contact_number='0711111111',
+                                hospital_id=1, blood_type='O+', urgency_level='High'))
+    db.session.add_all([
+        Donor(name=f'Donor {i}', age=30, blood_type='O+', phone=f'+2547{i:08d}', city='Nairobi')
+        for i in range(donors)
+    ])
+    db.session.flush()
+    db.session.add_all([DonorMatch(request_id=1, donor_id=i, status='Pending') for i in range(1, donors + 1)])
+    db.session.commit()
+
+
+def queue(messages):
+    for donor_id, message in messages:
+        outbox_module.enqueue_notification(donor_id, 1, message)
+    db.session.commit()
+
+
+def statuses():
+    db.session.expire_all()
+    return [n.status for n in Notification.query.order_by(Notification.id)]
+
+
+def test_shared_message_goes_out_in_one_call_and_marks_matches(app):
+    seed()
+    queue([(donor_id, 'Please come in') for donor_id in (1, 2, 3)])
+
+    assert sms_outbox.drain() == 3
+    assert statuses() == ['Sent'] * 3
+    assert len(app.sms.sent) == 1
+    assert sorted(app.sms.sent[0][1]) == ['+254700000000', '+254700000001', '+254700000002']
+    assert all(n.provider_message_id.startswith('FAKE') for n in Notification.query)
+    assert {m.status for m in DonorMatch.query} == {'Notified'}
+
+
+def test_failed_recipient_is_retried_with_backoff_then_given_up(app):
+    seed(donors=2)
+    app.sms.failing_numbers = {'+254700000001'}
+    sms_outbox.max_attempts = 2
+    queue([(1, 'Please come in'), (2, 'Please come in')])
+
+    sms_outbox.drain()
+    failed = db.session.get(Notification, 2)
+    assert statuses() == ['Sent', 'Queued']
+    assert failed.attempts == 1
+    assert failed.next_attempt_at > datetime.utcnow()
+
+    failed.next_attempt_at = datetime.utcnow()  # Skip the backoff
+    db.session.commit()
+    sms_outbox.drain()
+    assert statuses() == ['Sent', 'Failed']
+    assert db.session.get(Notification, 2).attempts == 2
+    assert db.session.get(DonorMatch, 2).status == 'Pending'
+
+
+def test_slow_batch_keeps_its_lease(app, monkeypatch):
+    seed()
+    # Personalised messages: one gateway call per donor, each slower than half the lease
+    queue([(donor_id, f'Hello Donor {donor_id}') for donor_id in (1, 2, 3)])
+    monkeypatch.setattr(sms_outbox, 'claim_seconds', 0.3)
+    send = app.sms.send
+    claimable = []
+
+    def slow_send(message, recipients):
+        time.sleep(0.2)
+        # What another worker's claim query would pick up right now
+        claimable.append(Notification.query.filter(
+            Notification.status == 'Queued',
+            Notification.next_attempt_at <= datetime.utcnow()
+        ).count())
+        return send(message, recipients)
+
+    monkeypatch.setattr(app.sms, 'send', slow_send)
+    assert sms_outbox.drain_once() == 3
+    assert len(claimable) == 3
+    assert claimable == [0, 0, 0]
+    assert statuses() == ['Sent'] * 3
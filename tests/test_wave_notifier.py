@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.blood_request_model import BloodRequest
+from app.models.donor_model import Donor
+from app.models.hospital_model import Hospital
+from app.services import wave_notifier
+
+
+def seed_wave_requests(count, donors=20):
+    db.session.add(Hospital(id=1, name='Kenyatta', city='Nairobi', contact_number='0700000000'))
+    db.session.add_all([
+        Donor(name=f'Donor {i}', age=30, blood_type='O+', phone=f'+2547{i:08d}', city='Nairobi')
+        for i in range(donors)
+    ])
+    requests = [
+        BloodRequest(name=f'Patient {i}', city='Nairobi', contact_number='0711111111', hospital_id=1,
+                     blood_type='O+', urgency_level='High', units_needed=1, status='Pending')
+        for i in range(count)
+    ]
+    db.session.add_all(requests)
+    db.session.flush()
+    settings = wave_notifier.WaveSettings({'WAVE_DONORS_PER_UNIT': 1, 'WAVE_GROWTH_FACTOR': 1})
+    for blood_request in requests:
+        wave_notifier.start_waves(blood_request, settings)
+    db.session.commit()
+    return [r.id for r in requests], settings
+
+
+def make_due(request_ids, when):
+    table = BloodRequest.__table__
+    db.session.execute(table.update().where(table.c.id.in_(request_ids)).values(next_wave_at=when))
+    db.session.commit()
+
+
+def test_due_waves_are_sent_and_rescheduled(app):
+    request_ids, settings = seed_wave_requests(2)
+    now = datetime.utcnow()
+    make_due(request_ids, now - timedelta(seconds=1))
+
+    summary = wave_notifier.advance_waves(settings, now)
+    assert summary['waves_sent'] == 2
+    for request_id in request_ids:
+        blood_request = db.session.get(BloodRequest, request_id)
+        assert blood_request.wave_count == 2
+        assert blood_request.next_wave_at > now
+
+    # Nothing is due any more
+    assert wave_notifier.advance_waves(settings, now)['waves_sent'] == 0
+
+
+def test_wave_claimed_by_another_worker_is_not_sent_again(app, monkeypatch):
+    first_id, second_id = seed_wave_requests(2)[0]
+    settings = wave_notifier.WaveSettings({'WAVE_DONORS_PER_UNIT': 1, 'WAVE_GROWTH_FACTOR': 1})
+    now = datetime.utcnow()
+    make_due([first_id, second_id], now - timedelta(seconds=1))
+
+    send_wave = wave_notifier._send_wave
+    sent_for = []
+
+    def racing_send_wave(blood_request, settings, now):
+        # While this worker sends the first wave, another one claims the second request
+        if not sent_for:
+            table = BloodRequest.__table__
+            db.session.execute(table.update().where(table.c.id == second_id).values(
+                next_wave_at=now + timedelta(minutes=5), wave_count=table.c.wave_count + 1))
+        sent_for.append(blood_request.id)
+        return send_wave(blood_request, settings, now)
+
+    monkeypatch.setattr(wave_notifier, '_send_wave', racing_send_wave)
+    summary = wave_notifier.advance_waves(settings, now)
+
+    assert sent_for == [first_id]
+    assert summary['waves_sent'] == 1
+    assert db.session.get(BloodRequest, second_id).wave_count == 2  # Only the other worker's wave
+
+
+def test_filled_request_stops_its_waves(app):
+    (request_id,), settings = seed_wave_requests(1)
+    db.session.execute(db.text("UPDATE donor_match SET status = 'Accepted' WHERE request_id = :id"),
+                       {'id': request_id})
+    now = datetime.utcnow()
+    make_due([request_id], now - timedelta(seconds=1))
+
+    summary = wave_notifier.advance_waves(settings, now)
+    assert summary == {'requests_due': 1, 'waves_sent': 0, 'donors_contacted': 0, 'stopped': 1}
+    assert db.session.get(BloodRequest, request_id).next_wave_at is None